@@ -0,0 +1,101 @@
+"""API token authentication with cached verification.
+
+Clients send ``Authorization: Token <key>``. Once a key is verified, its token
+(found by the key's hash) and its user are cached under separate keys for
+``AUTHAPI_TOKEN_CACHE_TIMEOUT`` seconds, so authenticated calls on the hot path
+make no database query: no session row, no user row.
+
+Revoking or deleting a token drops its entry, and saving or deleting a user
+(deactivation included) drops the user's, so the next call verifies them
+against the database again. Queryset ``update()`` calls send no signals and
+must call ``forget_user()`` themselves.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+
+from authapi.models import ApiToken, hash_key
+
+User = get_user_model()
+
+TOKEN_CACHE_KEY = "authapi:token:{key_hash}"
+USER_CACHE_KEY = "authapi:user:{user_id}"
+
+
+def forget(key: str) -> None:
+    # Again at commit, in case a request cached the old row in between.
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def forget_token(token: ApiToken) -> None:
+    forget(TOKEN_CACHE_KEY.format(key_hash=token.key_hash))
+
+
+def forget_user(user_id: int) -> None:
+    forget(USER_CACHE_KEY.format(user_id=user_id))
+
+
+class ApiTokenAuthentication(BaseAuthentication):
+    keyword = "Token"
+
+    def authenticate(self, request: Request) -> tuple[User, ApiToken] | None:
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed("Invalid token header.")
+
+        return self.authenticate_key(key)
+
+    def authenticate_key(self, key: str) -> tuple[User, ApiToken]:
+        timeout = settings.AUTHAPI_TOKEN_CACHE_TIMEOUT
+        key_hash = hash_key(key)
+        token_cache_key = TOKEN_CACHE_KEY.format(key_hash=key_hash)
+
+        token: ApiToken | None = cache.get(token_cache_key)
+        if token is None:
+            try:
+                token = (
+                    ApiToken.objects.active()
+                    .select_related("user")
+                    .get(key_hash=key_hash)
+                )
+            except ApiToken.DoesNotExist:
+                raise AuthenticationFailed("Invalid token.")
+
+            user = token.user
+            # The user is cached under its own key, invalidated separately.
+            ApiToken.user.field.delete_cached_value(token)
+            cache.set(token_cache_key, token, timeout)
+        else:
+            user = self.get_user(token.user_id)
+
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+
+        cache.add(USER_CACHE_KEY.format(user_id=user.pk), user, timeout)
+        token.user = user
+
+        return user, token
+
+    def get_user(self, user_id: int) -> User | None:
+        user = cache.get(USER_CACHE_KEY.format(user_id=user_id))
+        if user is None:
+            user = User.objects.filter(pk=user_id).first()
+
+        return user
+
+    def authenticate_header(self, request: Request) -> str:
+        return self.keyword
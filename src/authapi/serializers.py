@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from authapi.models import ApiToken
+
 User = get_user_model()
 
 
@@ -14,3 +16,10 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ["id", "username", "email"]
         read_only_fields = ["id", "username", "email"]
+
+
+class ApiTokenSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ApiToken
+        fields = ["id", "name", "prefix", "created_at", "revoked_at"]
+        read_only_fields = ["id", "prefix", "created_at", "revoked_at"]
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authapi.authentication import forget_token, forget_user
+from authapi.models import ApiToken
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=ApiToken)
+@receiver(post_delete, sender=ApiToken)
+def forget_changed_token(sender, instance: ApiToken, **kwargs):
+    forget_token(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_changed_user(sender, instance: User, **kwargs):
+    # Deactivated users must fail their next call, not the one after the TTL.
+    forget_user(instance.pk)
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
+from authapi.models import ApiToken
+
 User = get_user_model()
 
 
@@ -80,3 +83,187 @@ class AuthApiTests(APITestCase):
         # --- Assert
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("logged out", response.json()["message"].lower())
+
+
+class ApiTokenTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient(enforce_csrf_checks=True)
+        self.whoami_url = reverse("auth-whoami")
+
+    def token_client(self, key: str) -> APIClient:
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+        return client
+
+    def test_issue_and_list_tokens(self):
+        # --- Arrange
+        self.client.force_authenticate(self.user)
+        url = reverse("auth-tokens")
+
+        # --- Act
+        created = self.client.post(url, {"name": "scanner"})
+        listed = self.client.get(url)
+
+        # --- Assert
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        data = created.json()
+        self.assertTrue(data["key"].startswith(data["prefix"]))
+        self.assertEqual(listed.json(), [{k: v for k, v in data.items() if k != "key"}])
+
+        token = ApiToken.objects.get()
+        self.assertNotEqual(token.key_hash, data["key"])
+
+    def test_token_authenticates_without_session_or_csrf(self):
+        # --- Arrange
+        _, key = ApiToken.issue(self.user, "scanner")
+        client = self.token_client(key)
+
+        # --- Act
+        whoami = client.get(self.whoami_url)
+        created = client.post(reverse("document-list"), {"title": "Invoice"})
+
+        # --- Assert
+        self.assertEqual(whoami.json()["username"], "alice")
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("sessionid", whoami.cookies)
+
+    def test_token_cannot_issue_tokens(self):
+        # --- Arrange
+        _, key = ApiToken.issue(self.user, "scanner")
+        client = self.token_client(key)
+        url = reverse("auth-tokens")
+
+        # --- Act
+        created = client.post(url, {"name": "backdoor"})
+        listed = client.get(url)
+
+        # --- Assert
+        self.assertEqual(created.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(listed.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(ApiToken.objects.count(), 1)
+
+    def test_invalid_token(self):
+        # --- Act
+        response = self.token_client("nope").get(reverse("document-list"))
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+
+    def test_revoked_token_stops_working_despite_the_cache(self):
+        # --- Arrange
+        token, key = ApiToken.issue(self.user, "scanner")
+        client = self.token_client(key)
+        client.get(self.whoami_url)
+        self.client.force_authenticate(self.user)
+
+        # --- Act
+        revoked = self.client.delete(
+            reverse("auth-token-revoke", kwargs={"pk": token.pk})
+        )
+        response = client.get(reverse("document-list"))
+
+        # --- Assert
+        self.assertEqual(revoked.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        token.refresh_from_db()
+        self.assertFalse(token.is_active)
+
+    def test_deactivated_user_is_rejected_despite_the_cache(self):
+        # --- Arrange
+        _, key = ApiToken.issue(self.user, "scanner")
+        client = self.token_client(key)
+        client.get(self.whoami_url)
+
+        # --- Act
+        self.user.is_active = False
+        self.user.save()
+        response = client.get(reverse("document-list"))
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cannot_revoke_another_users_token(self):
+        # --- Arrange
+        other_user = User.objects.create_user(username="bob", password="pass1234")
+        token, _ = ApiToken.issue(other_user, "scanner")
+        self.client.force_authenticate(self.user)
+
+        # --- Act
+        response = self.client.delete(
+            reverse("auth-token-revoke", kwargs={"pk": token.pk})
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        token.refresh_from_db()
+        self.assertTrue(token.is_active)
+
+
+class AuthApiQueryBudgetTests(APITestCase):
+    """Fixed query counts for every auth route (see document query budgets)."""
+
+    def setUp(self):
+        self.username = "TestUser"
+        self.password = "TestPass123"
+        self.user = User.objects.create_user(
+            username=self.username, password=self.password
+        )
+        self.client = APIClient()
+
+    def test_login_query_budget(self):
+        # --- Arrange
+        url = reverse("auth-login")
+
+        # --- Act / Assert
+        # User lookup, last_login update and session creation (with savepoints).
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                url, {"username": self.username, "password": self.password}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_query_budget(self):
+        # --- Arrange
+        self.client.login(username=self.username, password=self.password)
+        url = reverse("auth-logout")
+
+        # --- Act / Assert
+        # Session and user lookups, then the session is flushed.
+        with self.assertNumQueries(4):
+            response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_whoami_query_budget(self):
+        # --- Arrange
+        self.client.login(username=self.username, password=self.password)
+        url = reverse("auth-whoami")
+
+        # --- Act / Assert
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_whoami_query_budget(self):
+        # --- Arrange
+        cache.clear()
+        _, key = ApiToken.issue(self.user, "scanner")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        url = reverse("auth-whoami")
+
+        # --- Act / Assert
+        # The first call loads the token with its user; later ones hit the cache.
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
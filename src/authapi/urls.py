@@ -1,9 +1,17 @@
 from django.urls import path
 
-from authapi.views import login_view, logout_view, whoami_view
+from authapi.views import (
+    login_view,
+    logout_view,
+    revoke_token_view,
+    tokens_view,
+    whoami_view,
+)
 
 urlpatterns = [
     path("login/", login_view, name="auth-login"),
     path("logout/", logout_view, name="auth-logout"),
     path("whoami/", whoami_view, name="auth-whoami"),
+    path("tokens/", tokens_view, name="auth-tokens"),
+    path("tokens/<int:pk>/", revoke_token_view, name="auth-token-revoke"),
 ]
@@ -1,8 +1,16 @@
 from django.contrib.auth import authenticate, login, logout
-from rest_framework.decorators import api_view, permission_classes
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
 from rest_framework.response import Response
 
-from authapi.serializers import LoginSerializer, UserSerializer
+from authapi.models import ApiToken
+from authapi.serializers import ApiTokenSerializer, LoginSerializer, UserSerializer
 
 
 @api_view(["POST"])
@@ -40,3 +48,32 @@ def whoami_view(request):
     if not request.user.is_authenticated:
         return Response({"error": "Not authenticated"}, status=401)
     return Response(UserSerializer(request.user).data)
+
+
+@api_view(["GET", "POST"])
+@authentication_classes([SessionAuthentication])
+def tokens_view(request):
+    """List the user's API tokens, or issue a new one.
+
+    The key of a new token is only ever returned in this response. Only a
+    logged-in session may do either, so a leaked token cannot mint others.
+    """
+    if request.method == "GET":
+        tokens = ApiToken.objects.filter(user=request.user)
+        return Response(ApiTokenSerializer(tokens, many=True).data)
+
+    serializer = ApiTokenSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    token, key = ApiToken.issue(request.user, serializer.validated_data["name"])
+    return Response(
+        {**ApiTokenSerializer(token).data, "key": key}, status=status.HTTP_201_CREATED
+    )
+
+
+@api_view(["DELETE"])
+def revoke_token_view(request, pk: int):
+    """Revoke one of the user's API tokens; it stops working immediately."""
+    token = get_object_or_404(ApiToken, pk=pk, user=request.user)
+    token.revoke()
+    return Response(status=status.HTTP_204_NO_CONTENT)
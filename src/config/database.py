@@ -0,0 +1,277 @@
+"""Database configuration from the environment, and primary/replica routing.
+
+``database_settings()`` builds ``DATABASES`` from ``DB_*`` environment
+variables: SQLite by default, tuned for concurrent writers, or PostgreSQL with
+persistent health-checked connections (or a psycopg pool) and an optional read
+replica.
+
+When a replica is configured, ``ReplicaRoutingMiddleware`` marks requests to
+read-only viewset actions and ``PrimaryReplicaRouter`` sends their reads to
+it. A client that has just written keeps its reads on the primary for a few
+seconds, so it always sees its own writes despite replication lag: through a
+short-lived cookie, and for clients that drop cookies (API token clients,
+say) through a cache entry of the authenticated user.
+"""
+
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest, HttpResponse
+from django.utils.functional import SimpleLazyObject, empty
+
+REPLICA_ALIAS = "replica"
+
+# Set by clients right after a write; its presence keeps reads on the primary.
+STICKY_COOKIE = "db_primary"
+# The same for the user, whatever the client does with cookies.
+STICKY_USER_KEY = "db:primary:user:{user_id}"
+
+SQLITE_INIT_COMMAND = (
+    # Readers no longer block the writer nor the other way round.
+    "PRAGMA journal_mode=WAL;"
+    # Durable at checkpoints instead of at every commit, which is safe in WAL.
+    "PRAGMA synchronous=NORMAL;"
+)
+
+_read_from_replica: ContextVar[bool] = ContextVar("read_from_replica", default=False)
+_replica_request: ContextVar[HttpRequest | None] = ContextVar(
+    "replica_request", default=None
+)
+
+
+def env_bool(environ: Mapping[str, str], name: str, default: bool = False) -> bool:
+    value = environ.get(name)
+    if value is None:
+        return default
+
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def database_settings(environ: Mapping[str, str], base_dir: Path) -> dict:
+    """Return ``DATABASES`` for the ``DB_*`` variables of ``environ``.
+
+    Variables:
+        DB_ENGINE: "sqlite" (default) or "postgres".
+        DB_NAME: Database name, or SQLite file path.
+        DB_USER, DB_PASSWORD, DB_HOST, DB_PORT: PostgreSQL connection.
+        DB_CONN_MAX_AGE: Seconds a connection is kept open (default 60).
+        DB_POOL: Use a psycopg connection pool instead (PostgreSQL).
+        DB_TIMEOUT: Seconds SQLite waits on a locked database (default 20).
+        DB_REPLICA_HOST, DB_REPLICA_PORT: Read replica (PostgreSQL).
+    """
+    engine = environ.get("DB_ENGINE", "sqlite")
+    conn_max_age = int(environ.get("DB_CONN_MAX_AGE", 60))
+
+    if engine == "sqlite":
+        return {
+            DEFAULT_DB_ALIAS: {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": environ.get("DB_NAME", base_dir / "db.sqlite3"),
+                "CONN_MAX_AGE": conn_max_age,
+                "CONN_HEALTH_CHECKS": True,
+                "OPTIONS": {
+                    "init_command": SQLITE_INIT_COMMAND,
+                    # Busy timeout: wait for the writer instead of failing
+                    # with "database is locked".
+                    "timeout": int(environ.get("DB_TIMEOUT", 20)),
+                    # Take the write lock when the transaction starts, so it
+                    # cannot fail halfway when a read lock has to be upgraded.
+                    "transaction_mode": "IMMEDIATE",
+                },
+            }
+        }
+
+    if engine != "postgres":
+        raise ValueError(f"Unsupported DB_ENGINE {engine!r}.")
+
+    primary = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": environ.get("DB_NAME", "docvault"),
+        "USER": environ.get("DB_USER", "docvault"),
+        "PASSWORD": environ.get("DB_PASSWORD", ""),
+        "HOST": environ.get("DB_HOST", "localhost"),
+        "PORT": environ.get("DB_PORT", "5432"),
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if env_bool(environ, "DB_POOL"):
+        # The pool keeps the connections; Django must close (return) them.
+        primary["CONN_MAX_AGE"] = 0
+        primary["OPTIONS"]["pool"] = True
+
+    databases = {DEFAULT_DB_ALIAS: primary}
+
+    if "DB_REPLICA_HOST" in environ:
+        databases[REPLICA_ALIAS] = {
+            **primary,
+            "OPTIONS": dict(primary["OPTIONS"]),
+            "HOST": environ["DB_REPLICA_HOST"],
+            "PORT": environ.get("DB_REPLICA_PORT", primary["PORT"]),
+            # Tests run against the primary only.
+            "TEST": {"MIRROR": DEFAULT_DB_ALIAS},
+        }
+
+    return databases
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in connections.databases
+
+
+@contextmanager
+def read_from_primary() -> Iterator[None]:
+    """Send the reads of the block to the primary, even in a replica request."""
+    token = _read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def sticky_user_key(user_id: int) -> str:
+    return STICKY_USER_KEY.format(user_id=user_id)
+
+
+def authenticated_user_id(request: HttpRequest) -> int | None:
+    """The id of the request's user if it is authenticated, without loading it.
+
+    The session user is loaded lazily and DRF authenticates in the view:
+    until either happened, this is None rather than a query.
+    """
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    if user is None or not user.is_authenticated:
+        return None
+
+    return user.pk
+
+
+def user_wrote_recently(request: HttpRequest) -> bool:
+    """Whether the request's user wrote within the sticky window.
+
+    Looked up once per request and user, from the first read that knows
+    the user.
+    """
+    user_id = authenticated_user_id(request)
+    if user_id is None:
+        return False
+
+    checked = getattr(request, "_db_primary_user", None)
+    if checked is None or checked[0] != user_id:
+        checked = (user_id, cache.get(sticky_user_key(user_id)) is not None)
+        request._db_primary_user = checked
+
+    return checked[1]
+
+
+class PrimaryReplicaRouter:
+    """Send the reads of requests marked by the middleware to the replica."""
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if not _read_from_replica.get() or not replica_configured():
+            return None
+
+        # Inside a transaction, read what the transaction sees.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        request = _replica_request.get()
+        if request is not None and user_wrote_recently(request):
+            return DEFAULT_DB_ALIAS
+
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Route read-only viewset actions to the replica, except right after a write.
+
+    The actions are those in ``DATABASE_REPLICA_ACTIONS``, read from the
+    ``actions`` mapping DRF attaches to viewset views.
+    """
+
+    sync_capable = True
+    # So ASGI requests to async views do not need a thread for this one.
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _read_from_replica.set(False)
+        request_token = _replica_request.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+            _replica_request.reset(request_token)
+
+        return self.stick_to_primary(request, response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        token = _read_from_replica.set(False)
+        request_token = _replica_request.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+            _replica_request.reset(request_token)
+
+        return self.stick_to_primary(request, response)
+
+    def stick_to_primary(
+        self, request: HttpRequest, response: HttpResponse
+    ) -> HttpResponse:
+        """After a successful write, keep the reads of its author on the primary."""
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+        ):
+            seconds = settings.DATABASE_REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax"
+            )
+
+            user_id = authenticated_user_id(request)
+            if user_id is not None:
+                cache.set(sticky_user_key(user_id), True, seconds)
+
+        return response
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, "actions", None) or {}
+        action = actions.get(request.method.lower())
+
+        if (
+            action in settings.DATABASE_REPLICA_ACTIONS
+            and STICKY_COOKIE not in request.COOKIES
+        ):
+            _read_from_replica.set(True)
+            # The user is only known once the view authenticated the request.
+            _replica_request.set(request)
@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from config.database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Files written at runtime (caches, indexes, reports), outside the source tree.
+# Each directory below can be moved on its own with its environment variable.
+VAR_DIR = Path(os.environ.get("VAR_DIR", BASE_DIR.parent / "var"))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -44,17 +51,23 @@ THIRD_PARTY_APPS = [
 ]
 
 CUSTOM_APPS = [
+    "authapi",
     "document",
+    "monitoring",
 ]
 
 INSTALLED_APPS = [*DJANGO_APPS, *THIRD_PARTY_APPS, *CUSTOM_APPS]
 
 MIDDLEWARE = [
+    # First, to time the whole request.
+    "monitoring.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "monitoring.middleware.ProfilingMiddleware",
+    "config.database.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,12 +95,18 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# Built from the DB_* environment variables (see config.database): SQLite in
+# WAL mode by default, PostgreSQL with persistent connections and an optional
+# read replica otherwise.
+DATABASES = database_settings(os.environ, BASE_DIR)
+
+# With a replica, these viewset actions read from it unless the client wrote
+# within the last DATABASE_REPLICA_STICKY_SECONDS (read-your-writes).
+DATABASE_ROUTERS = ["config.database.PrimaryReplicaRouter"]
+
+DATABASE_REPLICA_ACTIONS = {"list", "retrieve"}
+
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
 
 
 # Password validation
@@ -132,9 +151,153 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Also holds the version tokens that tell every process when to rebuild its
+# in-memory tag autocomplete index, and the document response cache with its
+# generation counters. The local-memory backend is only shared within one
+# process: set REDIS_URL when running several workers.
+if "REDIS_URL" in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# File uploads
+# https://docs.djangoproject.com/en/5.2/topics/http/file-uploads/
+
+# Same as Django's defaults, but uploads are SHA-256 hashed as they stream in
+# so they can be deduplicated without being read again.
+FILE_UPLOAD_HANDLERS = [
+    "document.uploadhandlers.HashingMemoryFileUploadHandler",
+    "document.uploadhandlers.HashingTemporaryFileUploadHandler",
+]
+
+
+# Document processing
+
+# Dotted path of the document.extraction.BaseExtractor used by the extraction
+# workers (see `manage.py run_extraction_workers`).
+DOCUMENT_TEXT_EXTRACTOR = "document.extraction.CommandLineExtractor"
+
+# Resumable uploads: idle sessions expire after this many seconds and are
+# removed by `manage.py purge_upload_sessions`. Chunks larger than the maximum
+# are rejected.
+DOCUMENT_UPLOAD_SESSION_TTL = 60 * 60 * 24
+
+DOCUMENT_UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# How downloads are transferred once ownership is checked: None serves them
+# from Django with FileResponse (sendfile(2) under gunicorn), "x-accel-redirect"
+# hands them to nginx and "x-sendfile" to Apache mod_xsendfile / lighttpd.
+DOCUMENT_SENDFILE_BACKEND = None
+
+# Internal nginx location aliased to MEDIA_ROOT, for "x-accel-redirect".
+DOCUMENT_SENDFILE_URL_PREFIX = "/protected-media/"
+
+# Previews: dotted path of the document.previews.BasePreviewRenderer, allowed
+# sizes (longest side, in pixels) and the size the extraction workers render
+# right after upload. Renders are kept in an LRU disk cache, in PREVIEW_CACHE_DIR,
+# evicted down once it grows past DOCUMENT_PREVIEW_CACHE_MAX_BYTES.
+DOCUMENT_PREVIEW_RENDERER = "document.previews.DefaultPreviewRenderer"
+
+DOCUMENT_PREVIEW_SIZES = [128, 256, 512]
+
+DOCUMENT_PREVIEW_DEFAULT_SIZE = 256
+
+DOCUMENT_PREVIEW_CACHE_DIR = Path(
+    os.environ.get("PREVIEW_CACHE_DIR", VAR_DIR / "preview-cache")
+)
+
+DOCUMENT_PREVIEW_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Seconds document list and detail responses stay in the cache (see
+# document.responsecache). Writes invalidate them long before that; the timeout
+# only bounds how long superseded entries occupy memory.
+DOCUMENT_RESPONSE_CACHE_TIMEOUT = 60 * 10
+
+# Admission control of file ingestion (see document.admission), with state in
+# the cache. Each user may create DOCUMENT_UPLOAD_RATE files ("<count>/<s|min|
+# h>", None for no limit) with bursts of up to DOCUMENT_UPLOAD_BURST, and keep
+# DOCUMENT_MAX_PENDING_EXTRACTIONS files waiting for text extraction.
+DOCUMENT_UPLOAD_RATE = "120/min"
+
+DOCUMENT_UPLOAD_BURST = 30
+
+DOCUMENT_MAX_PENDING_EXTRACTIONS = 500
+
+# Ingestion requests (uploads, chunks) served at once, per user and in total.
+# Keep the global limit below the number of worker threads so interactive
+# requests always find one.
+DOCUMENT_INGEST_USER_CONCURRENCY = 4
+
+DOCUMENT_INGEST_GLOBAL_CONCURRENCY = 32
+
+# Retry-After seconds sent when a concurrency or backlog limit is reached.
+DOCUMENT_ADMISSION_RETRY_AFTER = 5
+
+# Memory-mapped embedding matrices of /documents/<id>/similar/, one per user, in
+# SIMILARITY_DIR (see document.similarity). Shared by the processes of a host;
+# fill it for existing documents with `manage.py rebuild_similarity_index`.
+DOCUMENT_SIMILARITY_DIR = Path(os.environ.get("SIMILARITY_DIR", VAR_DIR / "similarity"))
+
+
+# API tokens
+
+# Seconds a verified token and its user stay cached. Revoking the token or
+# saving the user (e.g. deactivating it) drops the entries right away.
+AUTHAPI_TOKEN_CACHE_TIMEOUT = 60
+
+
+# Monitoring
+
+# Directory of the per-process metric files summed by /metrics, shared by the
+# worker processes of a host and emptied before they start. Unset, /metrics
+# only reports the process that answers it.
+MONITORING_METRICS_DIR = os.environ.get("METRICS_DIR") or None
+
+# Clients allowed to read /metrics without a staff session, comma-separated in
+# METRICS_ALLOWED_IPS; none by default. Matched against REMOTE_ADDR: behind a
+# reverse proxy every client comes from the proxy's address, so list the
+# scraper's address only if it reaches the app directly, and keep /metrics
+# off the proxy.
+MONITORING_METRICS_ALLOWED_IPS = [
+    address.strip()
+    for address in os.environ.get("METRICS_ALLOWED_IPS", "").split(",")
+    if address.strip()
+]
+
+# Per-request profiling (see monitoring.profiling), off unless PROFILING_ENABLED
+# is 1. Staff users and API tokens with these prefixes can then send
+# "X-Profile: 1"; the last MONITORING_PROFILING_MAX_REPORTS reports are kept in
+# PROFILING_DIR.
+MONITORING_PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED") == "1"
+
+MONITORING_PROFILING_TOKEN_PREFIXES = []
+
+MONITORING_PROFILING_DIR = Path(os.environ.get("PROFILING_DIR", VAR_DIR / "profiles"))
+
+MONITORING_PROFILING_MAX_REPORTS = 50
+
+# Slowest SELECTs of a report shown with their EXPLAIN plan.
+MONITORING_PROFILING_EXPLAIN_QUERIES = 5
+
+
 # REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        # First, so token clients never touch the session table nor need CSRF.
+        "authapi.authentication.ApiTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -0,0 +1,170 @@
+import asyncio
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.functional import SimpleLazyObject
+
+from config.database import (
+    REPLICA_ALIAS,
+    STICKY_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+    database_settings,
+)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_sqlite_defaults(self):
+        # --- Act
+        databases = database_settings({}, Path("/app"))
+
+        # --- Assert
+        default = databases["default"]
+        self.assertEqual(list(databases), ["default"])
+        self.assertEqual(default["NAME"], Path("/app/db.sqlite3"))
+        self.assertTrue(default["CONN_HEALTH_CHECKS"])
+        self.assertIn("journal_mode=WAL", default["OPTIONS"]["init_command"])
+        self.assertEqual(default["OPTIONS"]["timeout"], 20)
+        self.assertEqual(default["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+    def test_postgres_with_replica(self):
+        # --- Act
+        databases = database_settings(
+            {
+                "DB_ENGINE": "postgres",
+                "DB_HOST": "primary.internal",
+                "DB_CONN_MAX_AGE": "300",
+                "DB_REPLICA_HOST": "replica.internal",
+            },
+            Path("/app"),
+        )
+
+        # --- Assert
+        primary, replica = databases["default"], databases[REPLICA_ALIAS]
+        self.assertEqual(primary["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(primary["CONN_MAX_AGE"], 300)
+        self.assertTrue(primary["CONN_HEALTH_CHECKS"])
+        self.assertEqual(replica["HOST"], "replica.internal")
+        self.assertEqual(replica["NAME"], primary["NAME"])
+        self.assertEqual(replica["TEST"], {"MIRROR": "default"})
+
+    def test_postgres_pool_disables_persistent_connections(self):
+        # --- Act
+        databases = database_settings(
+            {"DB_ENGINE": "postgres", "DB_POOL": "true"}, Path("/app")
+        )
+
+        # --- Assert
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 0)
+        self.assertTrue(databases["default"]["OPTIONS"]["pool"])
+
+    def test_unknown_engine(self):
+        # --- Act / Assert
+        with self.assertRaises(ValueError):
+            database_settings({"DB_ENGINE": "oracle"}, Path("/app"))
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        replica = mock.patch.dict(
+            connections.databases, {REPLICA_ALIAS: connections.databases["default"]}
+        )
+        replica.start()
+        self.addCleanup(replica.stop)
+
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+        self.read_aliases = []
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request) -> HttpResponse:
+        # What Django's handler does inside the middleware chain.
+        self.middleware.process_view(request, self.view_func, (), {})
+
+        return self.view_func(request)
+
+    def view(self, request) -> HttpResponse:
+        self.read_aliases.append(self.router.db_for_read(None) or "default")
+
+        return HttpResponse()
+
+    def request(
+        self, method: str, action: str, cookies=None, user=None
+    ) -> HttpResponse:
+        # DRF viewset views carry their method to action mapping.
+        self.view_func = partial(self.view)
+        self.view_func.actions = {method: action}
+        request = getattr(self.factory, method)("/")
+        request.COOKIES.update(cookies or {})
+        if user is not None:
+            request.user = user
+
+        return self.middleware(request)
+
+    def test_read_only_actions_read_from_replica(self):
+        # --- Act
+        self.request("get", "list")
+        self.request("get", "retrieve")
+        self.request("get", "search")
+
+        # --- Assert
+        self.assertEqual(self.read_aliases, [REPLICA_ALIAS, REPLICA_ALIAS, "default"])
+        self.assertIsNone(self.router.db_for_read(None))
+
+    def test_writes_make_reads_sticky(self):
+        # --- Act
+        response = self.request("post", "create")
+        self.request("get", "list", cookies={STICKY_COOKIE: "1"})
+
+        # --- Assert
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.read_aliases, ["default", "default"])
+        self.assertEqual(self.router.db_for_write(None), "default")
+
+    def test_writes_make_the_users_reads_sticky_without_cookies(self):
+        # --- Arrange
+        alice = SimpleNamespace(pk=1, is_authenticated=True)
+        bob = SimpleNamespace(pk=2, is_authenticated=True)
+
+        # --- Act
+        self.request("post", "create", user=alice)
+        self.request("get", "list", user=alice)
+        self.request("get", "list", user=bob)
+        self.request("get", "list", user=SimpleLazyObject(lambda: alice))
+
+        # --- Assert
+        self.assertEqual(
+            self.read_aliases, ["default", "default", REPLICA_ALIAS, REPLICA_ALIAS]
+        )
+
+    def test_async_chain_keeps_the_middleware_async(self):
+        # --- Arrange
+        async def get_response(request) -> HttpResponse:
+            self.middleware.process_view(request, self.view_func, (), {})
+            return self.view_func(request)
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+        self.view_func = partial(self.view)
+        self.view_func.actions = {"get": "list"}
+
+        # --- Act
+        asyncio.run(self.middleware(self.factory.get("/")))
+
+        # --- Assert
+        self.assertTrue(asyncio.iscoroutinefunction(self.middleware))
+        self.assertEqual(self.read_aliases, [REPLICA_ALIAS])
+        self.assertIsNone(self.router.db_for_read(None))
+
+    def test_middleware_unused_without_replica(self):
+        # --- Arrange
+        del connections.databases[REPLICA_ALIAS]
+
+        # --- Act / Assert
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(self.view)
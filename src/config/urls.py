@@ -20,6 +20,7 @@ from django.urls import include, path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("", include("monitoring.urls")),
     #
     # API V1
     path("api/v1/", include("document.urls")),
@@ -0,0 +1,19 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache.
+
+    Rate limits, concurrency counters and cached responses are keyed by ids
+    that the next test's rows may reuse.
+    """
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def similarity_dir(settings, tmp_path):
+    """Keep the similarity matrices written by a test out of the project."""
+    settings.DOCUMENT_SIMILARITY_DIR = tmp_path / "similarity"
@@ -0,0 +1,203 @@
+"""Admission control for file ingestion.
+
+Bulk clients such as batch scanners could otherwise fill every worker with
+uploads and leave interactive requests queueing behind them. Ingestion
+requests are admitted before their body is read, or rejected right away with
+``Retry-After``:
+
+- each user has a token bucket of file creations, refilled at
+  ``DOCUMENT_UPLOAD_RATE`` up to ``DOCUMENT_UPLOAD_BURST`` (429);
+- each user may hold ``DOCUMENT_INGEST_USER_CONCURRENCY`` ingestion requests
+  at once (429), and all users together ``DOCUMENT_INGEST_GLOBAL_CONCURRENCY``
+  (503), which leaves the remaining workers to everything else;
+- a user with ``DOCUMENT_MAX_PENDING_EXTRACTIONS`` files still waiting for
+  text extraction cannot create more until the workers catch up (429).
+
+Bucket and concurrency state lives in the shared cache, so the limits hold
+across workers. Updates are plain reads and writes, not transactions: under
+a burst of simultaneous requests the bucket may admit a few more than its
+size, never fewer.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from document.exceptions import ServiceUnavailable
+from document.models import DocumentFile
+
+BUCKET_KEY = "document:admission:bucket:{user_id}"
+USER_SLOTS_KEY = "document:admission:slots:{user_id}"
+GLOBAL_SLOTS_KEY = "document:admission:slots"
+
+# Seconds without any request after which a concurrency counter expires, which
+# also reclaims slots leaked by a worker that died mid-request.
+SLOTS_IDLE_TIMEOUT = 15 * 60
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600}
+
+
+def parse_rate(rate: str) -> float:
+    """Requests per second of a ``"<count>/<period>"`` rate such as ``"60/min"``."""
+    count, period = rate.split("/")
+
+    return int(count) / PERIODS[period]
+
+
+def take_token(key: str, rate: float, burst: int, now: float | None = None) -> float:
+    """Take one token from a bucket; return 0, or the seconds until one is free.
+
+    The bucket is kept as a single timestamp with the generic cell rate
+    algorithm: the "theoretical arrival time" at which it will be full again.
+    """
+    now = time.time() if now is None else now
+    interval = 1 / rate
+
+    full_at = max(cache.get(key, now), now)
+    wait = full_at + interval - burst * interval - now
+    if wait > 0:
+        return wait
+
+    full_at += interval
+    cache.set(key, full_at, timeout=math.ceil(full_at - now))
+
+    return 0
+
+
+class ConcurrencyLimit:
+    """At most ``limit`` holders at once, counted in the shared cache."""
+
+    def __init__(self, key: str, limit: int):
+        self.key = key
+        self.limit = limit
+
+    def acquire(self) -> bool:
+        cache.add(self.key, 0, timeout=SLOTS_IDLE_TIMEOUT)
+        try:
+            count = cache.incr(self.key)
+        except ValueError:
+            # Expired in between.
+            cache.add(self.key, 1, timeout=SLOTS_IDLE_TIMEOUT)
+            count = 1
+        cache.touch(self.key, SLOTS_IDLE_TIMEOUT)
+
+        if count > self.limit:
+            self.release()
+            return False
+
+        return True
+
+    def release(self) -> None:
+        try:
+            cache.decr(self.key)
+        except ValueError:
+            # Expired while held: the count started over without us.
+            pass
+
+
+class Admission:
+    """Concurrency slots held by an admitted request."""
+
+    def __init__(self):
+        self.held: list[ConcurrencyLimit] = []
+
+    def release(self) -> None:
+        while self.held:
+            self.held.pop().release()
+
+
+def admit(user_id: int, creates_file: bool) -> Admission:
+    """Admit an ingestion request of ``user_id`` or raise.
+
+    Args:
+        user_id (int): The requesting user.
+        creates_file (bool): Whether the request creates a file, which costs a
+            token and is refused while the user's extraction backlog is full.
+
+    Raises:
+        Throttled: Over one of the user's limits (429).
+        ServiceUnavailable: Over the global concurrency limit (503).
+
+    Returns:
+        Admission: The held slots, to release once the response is ready.
+    """
+    retry_after = settings.DOCUMENT_ADMISSION_RETRY_AFTER
+
+    if creates_file and settings.DOCUMENT_UPLOAD_RATE:
+        wait = take_token(
+            BUCKET_KEY.format(user_id=user_id),
+            parse_rate(settings.DOCUMENT_UPLOAD_RATE),
+            settings.DOCUMENT_UPLOAD_BURST,
+        )
+        if wait:
+            raise exceptions.Throttled(wait)
+
+    admission = Admission()
+    limits = [
+        (
+            ConcurrencyLimit(
+                USER_SLOTS_KEY.format(user_id=user_id),
+                settings.DOCUMENT_INGEST_USER_CONCURRENCY,
+            ),
+            exceptions.Throttled(retry_after, "Too many concurrent uploads."),
+        ),
+        (
+            ConcurrencyLimit(
+                GLOBAL_SLOTS_KEY, settings.DOCUMENT_INGEST_GLOBAL_CONCURRENCY
+            ),
+            ServiceUnavailable(retry_after),
+        ),
+    ]
+    for limit, rejection in limits:
+        if not limit.acquire():
+            admission.release()
+            raise rejection
+        admission.held.append(limit)
+
+    if creates_file and pending_extractions(user_id) >= (
+        settings.DOCUMENT_MAX_PENDING_EXTRACTIONS
+    ):
+        admission.release()
+        raise exceptions.Throttled(
+            retry_after, "Too many files are waiting for text extraction."
+        )
+
+    return admission
+
+
+def pending_extractions(user_id: int) -> int:
+    return DocumentFile.objects.filter(
+        uploaded_by_id=user_id,
+        status__in=[DocumentFile.Status.PENDING, DocumentFile.Status.PROCESSING],
+    ).count()
+
+
+class AdmissionControlMixin:
+    """Run the viewset actions in ``admission_actions`` through ``admit()``.
+
+    ``admission_actions`` maps each action to whether it creates a file. The
+    check runs after authentication and before the request body is parsed;
+    the slots are released once the response is ready.
+    """
+
+    admission_actions: dict[str, bool] = {}
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+
+        if self.action in self.admission_actions:
+            self.admission = admit(
+                request.user.pk, creates_file=self.admission_actions[self.action]
+            )
+
+    def dispatch(self, request, *args, **kwargs):
+        self.admission = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.admission is not None:
+                self.admission.release()
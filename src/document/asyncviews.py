@@ -0,0 +1,173 @@
+"""Async views for file transfers and document reads.
+
+A slow client of a sync view holds a worker thread for as long as it takes to
+send or receive its bytes. Under an ASGI server (``uvicorn
+config.asgi:application``) these coroutine views only cost a suspended task:
+
+- an upload body is received by the server before the view runs, then parsed
+  and stored off the event loop;
+- downloads are streamed from an async iterator reading the file with
+  aiofiles;
+- the database is reached through Django's async ORM, and document reads are
+  answered from the response cache when possible.
+
+They return the same payloads as the DRF views they mirror, under
+``/api/v1/async/``, and accept the same API token or session authentication.
+They are plain Django views because DRF handles requests synchronously.
+"""
+
+import uuid
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import exceptions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.renderers import JSONRenderer
+
+from authapi.authentication import ApiTokenAuthentication
+from document import admission, responsecache
+from document.models import Document, DocumentFile
+from document.sendfile import aserve_file
+from document.serializers import DocumentFileSerializer, DocumentSerializer
+
+
+def async_api_view(*methods: str):
+    """Authenticate like the DRF views and render their errors the same way.
+
+    CSRF is only enforced for session authentication, as DRF does.
+    """
+
+    def decorator(view):
+        @csrf_exempt
+        @require_http_methods(methods)
+        @wraps(view)
+        async def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            try:
+                request.user = await authenticate(request)
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+
+        return wrapper
+
+    return decorator
+
+
+async def authenticate(request: HttpRequest):
+    """The user of the request's API token, or else of its session."""
+    if "Authorization" in request.headers:
+        result = await sync_to_async(ApiTokenAuthentication().authenticate)(request)
+        if result is not None:
+            return result[0]
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        await sync_to_async(SessionAuthentication().enforce_csrf)(request)
+
+    return user
+
+
+def json_response(data, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+    )
+
+
+def error_response(exc: exceptions.APIException) -> HttpResponse:
+    if isinstance(exc.detail, (list, dict)):
+        response = json_response(exc.detail, exc.status_code)
+    else:
+        response = json_response({"detail": exc.detail}, exc.status_code)
+
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response["WWW-Authenticate"] = ApiTokenAuthentication.keyword
+
+    if getattr(exc, "wait", None):
+        response["Retry-After"] = "%d" % exc.wait
+
+    return response
+
+
+async def get_owned_document(request: HttpRequest, pk: int) -> Document:
+    try:
+        return await Document.objects.aget(pk=pk, owner=request.user)
+    except Document.DoesNotExist:
+        raise exceptions.NotFound()
+
+
+@async_api_view("GET", "HEAD")
+async def document_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    """A document with its tags, files and notes (``DocumentViewSet.retrieve``)."""
+    key = await responsecache.aresponse_key(request.user.pk, request.get_full_path())
+
+    data = await cache.aget(key)
+    if data is not None:
+        await responsecache.acount(responsecache.HITS_KEY)
+        response = json_response(data)
+        response[responsecache.CACHE_HEADER] = "HIT"
+        return response
+
+    await responsecache.acount(responsecache.MISSES_KEY)
+    try:
+        document = await Document.objects.with_details().aget(pk=pk, owner=request.user)
+    except Document.DoesNotExist:
+        raise exceptions.NotFound()
+
+    data = DocumentSerializer(document, context={"request": request}).data
+    await cache.aset(key, data, settings.DOCUMENT_RESPONSE_CACHE_TIMEOUT)
+    response = json_response(data)
+    response[responsecache.CACHE_HEADER] = "MISS"
+
+    return response
+
+
+@async_api_view("POST")
+async def upload_file(request: HttpRequest, document_pk: int) -> HttpResponse:
+    """Attach an uploaded file to a document (``DocumentFileViewSet.create``)."""
+    admitted = await sync_to_async(admission.admit)(request.user.pk, creates_file=True)
+    try:
+        document = await get_owned_document(request, document_pk)
+
+        # Parsing reads the spooled body and hashes the files: not on the loop.
+        files = await sync_to_async(lambda: request.FILES, thread_sensitive=False)()
+
+        context = {"request": request}
+        serializer = DocumentFileSerializer(data=files, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        document_file = DocumentFile(
+            document=document, uploaded_by=request.user, **serializer.validated_data
+        )
+        await document_file.asave()
+    finally:
+        await sync_to_async(admitted.release)()
+
+    return json_response(
+        DocumentFileSerializer(document_file, context=context).data,
+        status.HTTP_201_CREATED,
+    )
+
+
+@async_api_view("GET", "HEAD")
+async def download_file(
+    request: HttpRequest, document_pk: int, pk: uuid.UUID
+) -> HttpResponse:
+    """Stream the file bytes (``DocumentFileViewSet.download``)."""
+    try:
+        document_file = await DocumentFile.objects.select_related(
+            "document", "blob"
+        ).aget(pk=pk, document_id=document_pk, document__owner=request.user)
+    except DocumentFile.DoesNotExist:
+        raise exceptions.NotFound()
+
+    return await aserve_file(request, document_file)
@@ -0,0 +1,171 @@
+"""Tag autocomplete served from an in-process prefix index.
+
+Every process keeps the tag names sorted case-insensitively and answers a
+prefix query by bisection, so a lookup costs O(log n) whatever the size of
+the global tag table. Each user's tag usage counts (read from UserTagCount)
+are kept the same way, so tags the user already applies rank first.
+
+Both structures are rebuilt lazily. Version tokens in the shared cache decide
+when a process' copy is stale: writers replace the token (see
+``invalidate_tag_index`` and ``invalidate_tag_usage``) and every process
+rebuilds on its next lookup. Tokens are random rather than counters, so a token
+evicted from the cache and created again can never match an old copy.
+"""
+
+import threading
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+TAG_INDEX_VERSION_KEY = "document:tag-index:version"
+TAG_USAGE_VERSION_KEY = "document:tag-usage:{user_id}:version"
+
+# Sorts after any character a tag name can contain.
+PREFIX_END = "\U0010ffff"
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    name: str
+    count: int
+
+
+class PrefixIndex:
+    """Tag names sorted case-insensitively, searched by bisection."""
+
+    def __init__(self, tags: Iterable[tuple[int, str]]):
+        entries = sorted((name.casefold(), tag_id, name) for tag_id, name in tags)
+        self.keys = [key for key, _, _ in entries]
+        self.tags = [(tag_id, name) for _, tag_id, name in entries]
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def search(self, prefix: str, limit: int | None = None) -> list[tuple[int, str]]:
+        """Return up to ``limit`` ``(id, name)`` pairs starting with ``prefix``."""
+        key = prefix.casefold()
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + PREFIX_END, lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+
+        return self.tags[start:end]
+
+
+@dataclass
+class UsageIndex:
+    version: str | None
+    index: PrefixIndex
+    counts: dict[int, int]
+
+
+class TagAutocomplete:
+    """Per-process tag index plus the usage index of recently active users."""
+
+    max_users = 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version: str | None = None
+        self.index = PrefixIndex([])
+        self.usage: OrderedDict[int, UsageIndex] = OrderedDict()
+
+    def suggest(self, user_id: int, prefix: str, limit: int) -> list[Suggestion]:
+        """Tags starting with ``prefix``: the user's most used first, then A-Z."""
+        usage_key = TAG_USAGE_VERSION_KEY.format(user_id=user_id)
+        versions = get_versions([TAG_INDEX_VERSION_KEY, usage_key])
+
+        index = self.get_index(versions[TAG_INDEX_VERSION_KEY])
+        usage = self.get_usage(user_id, versions[usage_key])
+
+        used = sorted(
+            usage.index.search(prefix),
+            key=lambda tag: (-usage.counts[tag[0]], tag[1].casefold()),
+        )[:limit]
+        suggestions = [
+            Suggestion(tag_id, name, usage.counts[tag_id]) for tag_id, name in used
+        ]
+
+        if len(suggestions) < limit:
+            used_ids = {suggestion.id for suggestion in suggestions}
+            for tag_id, name in index.search(prefix, limit + len(used_ids)):
+                if tag_id not in used_ids:
+                    suggestions.append(Suggestion(tag_id, name, 0))
+                    if len(suggestions) == limit:
+                        break
+
+        return suggestions
+
+    def get_index(self, version: str | None) -> PrefixIndex:
+        # Without a version (e.g. a dummy cache), always rebuild.
+        if version is not None and self.version == version:
+            return self.index
+
+        with self.lock:
+            if version is None or self.version != version:
+                from document.models import Tag
+
+                self.index = PrefixIndex(Tag.objects.values_list("pk", "name"))
+                self.version = version
+                # Usage indexes hold tag names too, which may be stale now.
+                self.usage.clear()
+
+        return self.index
+
+    def get_usage(self, user_id: int, version: str | None) -> UsageIndex:
+        with self.lock:
+            usage = self.usage.get(user_id)
+            if usage is not None and version is not None and usage.version == version:
+                self.usage.move_to_end(user_id)
+                return usage
+
+        from document.models import UserTagCount
+
+        rows = list(
+            UserTagCount.objects.filter(user_id=user_id, count__gt=0).values_list(
+                "tag_id", "tag__name", "count"
+            )
+        )
+        counts = {tag_id: count for tag_id, _, count in rows}
+        usage = UsageIndex(
+            version, PrefixIndex((tag_id, name) for tag_id, name, _ in rows), counts
+        )
+
+        with self.lock:
+            self.usage[user_id] = usage
+            self.usage.move_to_end(user_id)
+            while len(self.usage) > self.max_users:
+                self.usage.popitem(last=False)
+
+        return usage
+
+
+def get_versions(keys: list[str]) -> dict[str, str | None]:
+    """Read version tokens, creating the missing ones."""
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            # add() keeps the token of a process that raced us to it.
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+
+    return versions
+
+
+def invalidate_tag_index() -> None:
+    cache.set(TAG_INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_tag_usage(user_id: int) -> None:
+    cache.set(
+        TAG_USAGE_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, timeout=None
+    )
+
+
+autocomplete = TagAutocomplete()
@@ -0,0 +1,31 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Request body is too large."
+    default_code = "payload_too_large"
+
+
+class RangeNotSatisfiable(APIException):
+    status_code = status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    default_detail = "The requested range does not fit the resource."
+    default_code = "range_not_satisfiable"
+
+
+class PreviewUnavailable(APIException):
+    status_code = status.HTTP_404_NOT_FOUND
+    default_detail = "No preview is available for this file."
+    default_code = "preview_unavailable"
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Service temporarily unavailable, try again later."
+    default_code = "service_unavailable"
+
+    def __init__(self, wait: float | None = None, detail=None, code=None):
+        # Read by DRF's exception handler to send Retry-After.
+        self.wait = wait
+        super().__init__(detail, code)
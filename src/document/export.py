@@ -0,0 +1,223 @@
+"""Streaming zip or tar export of a user's library.
+
+The archive holds ``manifest.ndjson`` (one JSON line per document, with its
+tags, notes and files) followed by the bytes of every file under
+``files/<document id>/``. It is produced as a generator of byte chunks: rows
+are read with ``QuerySet.iterator()`` and files a chunk at a time, and each
+chunk is yielded as soon as it is written, so memory use does not depend on
+the size of the library and no temporary file is needed.
+
+Zip entries are stored uncompressed (documents are mostly PDFs and images,
+which are compressed already) and use data descriptors, so they can be written
+without seeking back. Tar headers need the size of an entry before its data:
+files know theirs, and the manifest is generated twice, once to measure it.
+"""
+
+import json
+import logging
+import tarfile
+import zipfile
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import PurePosixPath
+
+from django.contrib.auth.models import AbstractUser
+from django.core.files import File
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from document.models import Document, DocumentFile
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.ndjson"
+
+CONTENT_TYPES = {"zip": "application/zip", "tar": "application/x-tar"}
+
+# Rows fetched from the database at a time.
+ITERATOR_CHUNK_SIZE = 500
+
+
+@dataclass
+class ArchiveEntry:
+    name: str
+    mtime: datetime
+    # Called for every pass over the content (tar may need two).
+    chunks: Callable[[], Iterable[bytes]]
+    size: int | None = None
+
+
+class StreamBuffer:
+    """Write-only file object collecting what the archive writers produce."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    buffer = StreamBuffer()
+
+    # Without tell(), ZipFile writes data descriptors instead of seeking back.
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(
+                entry.name, date_time=timezone.localtime(entry.mtime).timetuple()[:6]
+            )
+            if entry.size is not None:
+                info.file_size = entry.size
+
+            with archive.open(info, "w", force_zip64=entry.size is None) as member:
+                for chunk in entry.chunks():
+                    member.write(chunk)
+                    yield buffer.pop()
+
+            yield buffer.pop()
+
+    yield buffer.pop()
+
+
+def stream_tar(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    for entry in entries:
+        size = entry.size
+        if size is None:
+            size = sum(len(chunk) for chunk in entry.chunks())
+
+        info = tarfile.TarInfo(entry.name)
+        info.size = size
+        info.mtime = int(entry.mtime.timestamp())
+        info.mode = 0o644
+        yield info.tobuf(tarfile.PAX_FORMAT)
+
+        written = 0
+        for chunk in entry.chunks():
+            written += len(chunk)
+            yield chunk
+        if written != size:
+            raise OSError(f"{entry.name} changed while it was exported.")
+
+        yield tar_padding(size, tarfile.BLOCKSIZE)
+
+    # End-of-archive marker, then padding to a full record like tarfile.
+    end = 2 * tarfile.BLOCKSIZE
+    yield b"\0" * end + tar_padding(end, tarfile.RECORDSIZE)
+
+
+def tar_padding(size: int, block: int) -> bytes:
+    return b"\0" * (-size % block)
+
+
+ARCHIVE_WRITERS = {"zip": stream_zip, "tar": stream_tar}
+
+
+def stream_export(
+    owner: AbstractUser, archive: str, chunk_size: int = ITERATOR_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the ``archive`` ("zip" or "tar") export of ``owner``'s library."""
+    for chunk in ARCHIVE_WRITERS[archive](export_entries(owner, chunk_size)):
+        # Skip the empty chunks left by buffered writes.
+        if chunk:
+            yield chunk
+
+
+def export_entries(owner: AbstractUser, chunk_size: int) -> Iterator[ArchiveEntry]:
+    yield ArchiveEntry(
+        MANIFEST_NAME,
+        timezone.now(),
+        lambda: manifest_lines(owner, chunk_size),
+    )
+
+    files = DocumentFile.objects.filter(document__owner=owner).order_by(
+        "document_id", "uploaded_at", "pk"
+    )
+    for document_file in files.iterator(chunk_size=chunk_size):
+        try:
+            handle = document_file.file.open("rb")
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping file %s in export: %s", document_file.pk, exc)
+            continue
+
+        yield ArchiveEntry(
+            archive_path(document_file),
+            document_file.uploaded_at,
+            lambda handle=handle: read_chunks(handle),
+            file_size(document_file),
+        )
+
+
+def manifest_lines(owner: AbstractUser, chunk_size: int) -> Iterator[bytes]:
+    documents = (
+        Document.objects.filter(owner=owner)
+        .order_by("pk")
+        .prefetch_related(
+            "tags",
+            "notes",
+            Prefetch(
+                "files",
+                queryset=DocumentFile.objects.order_by("uploaded_at", "pk"),
+            ),
+        )
+    )
+
+    for document in documents.iterator(chunk_size=chunk_size):
+        line = {
+            "id": document.pk,
+            "title": document.title,
+            "description": document.description,
+            "created_at": document.created_at.isoformat(),
+            "updated_at": document.updated_at.isoformat(),
+            "tags": [tag.name for tag in document.tags.all()],
+            "notes": [
+                {
+                    "id": note.pk,
+                    "content": note.content,
+                    "created_by": note.created_by_id,
+                    "created_at": note.created_at.isoformat(),
+                    "updated_at": note.updated_at.isoformat(),
+                }
+                for note in document.notes.all()
+            ],
+            "files": [
+                {
+                    "id": str(document_file.pk),
+                    "path": archive_path(document_file),
+                    "sha256": document_file.sha256 or None,
+                    "size": document_file.size,
+                    "mime_type": document_file.mime_type or None,
+                    "page_count": document_file.page_count,
+                    "uploaded_at": document_file.uploaded_at.isoformat(),
+                }
+                for document_file in document.files.all()
+            ],
+        }
+        yield (json.dumps(line) + "\n").encode()
+
+
+def archive_path(document_file: DocumentFile) -> str:
+    suffix = PurePosixPath(document_file.file.name).suffix.lower()
+
+    return f"files/{document_file.document_id}/{document_file.pk}{suffix}"
+
+
+def file_size(document_file: DocumentFile) -> int:
+    if document_file.size is not None:
+        return document_file.size
+
+    return document_file.file.size
+
+
+def read_chunks(handle: File) -> Iterator[bytes]:
+    with handle:
+        yield from handle.chunks()
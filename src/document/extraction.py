@@ -0,0 +1,97 @@
+"""Text extractors for uploaded files.
+
+This module runs inside the extraction process pool, so it must stay free of
+model imports: workers only receive a file path and return the text of each
+page. Everything that touches the database lives in ``document.pipeline``.
+"""
+
+import subprocess
+from pathlib import Path
+
+from django.utils.module_loading import import_string
+
+PAGE_SEPARATOR = "\f"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp"}
+
+
+class ExtractionError(Exception):
+    """Raised when a file's text cannot be extracted."""
+
+
+class BaseExtractor:
+    """Interface for text extractors.
+
+    Subclasses must be importable by dotted path and constructible without
+    arguments, since they are instantiated inside the worker processes.
+    """
+
+    def extract(self, path: str) -> list[str]:
+        """Return the text of every page of the file at ``path``.
+
+        Args:
+            path (str): Absolute path of the file on local storage.
+
+        Returns:
+            list[str]: One entry per page, in page order.
+        """
+        raise NotImplementedError
+
+
+class FakeExtractor(BaseExtractor):
+    """Decode the file as UTF-8 and split pages on form feeds.
+
+    Meant for tests and local development, where running real OCR would be
+    slow and require system packages.
+    """
+
+    def extract(self, path: str) -> list[str]:
+        content = Path(path).read_bytes().decode("utf-8", errors="ignore")
+
+        return content.split(PAGE_SEPARATOR)
+
+
+class CommandLineExtractor(BaseExtractor):
+    """Extract text with poppler's ``pdftotext`` and ``tesseract`` OCR.
+
+    PDFs with a text layer are handled by ``pdftotext``, which separates
+    pages with form feeds; images go through ``tesseract``.
+    """
+
+    timeout = 600
+    language = "spa+eng"
+
+    def extract(self, path: str) -> list[str]:
+        extension = Path(path).suffix.lower()
+
+        if extension == ".pdf":
+            output = self.run(["pdftotext", "-layout", path, "-"])
+
+            # pdftotext terminates the last page with a form feed as well.
+            return output.removesuffix(PAGE_SEPARATOR).split(PAGE_SEPARATOR)
+
+        if extension in IMAGE_EXTENSIONS:
+            return [self.run(["tesseract", path, "stdout", "-l", self.language])]
+
+        raise ExtractionError(f"Unsupported file type: {extension or 'unknown'}")
+
+    def run(self, command: list[str]) -> str:
+        try:
+            result = subprocess.run(
+                command, capture_output=True, check=True, timeout=self.timeout
+            )
+        except FileNotFoundError:
+            raise ExtractionError(f"{command[0]} is not installed.")
+        except subprocess.CalledProcessError as exc:
+            stderr = exc.stderr.decode("utf-8", errors="replace").strip()
+            raise ExtractionError(f"{command[0]} failed: {stderr}")
+        except subprocess.TimeoutExpired:
+            raise ExtractionError(f"{command[0]} timed out.")
+
+        return result.stdout.decode("utf-8", errors="replace")
+
+
+def extract_pages(extractor_path: str, file_path: str) -> list[str]:
+    """Entry point executed in the worker processes."""
+    extractor: BaseExtractor = import_string(extractor_path)()
+
+    return [page.strip() for page in extractor.extract(file_path)]
@@ -0,0 +1,119 @@
+"""Sparse fieldsets and expansion of the document representations.
+
+Clients choose the fields they need with ``?fields=`` and the nested
+relations to add with ``?expand=``, both comma-separated:
+
+- ``GET /documents/?fields=title`` returns ``id``, ``title`` and
+  ``updated_at`` (always included: they identify the document and its
+  version, and the list is paginated on them);
+- ``GET /documents/?expand=tags`` adds the tag objects next to ``tag_ids``;
+- ``GET /documents/1/?fields=title,notes`` leaves out tags and files.
+
+The view builds its queryset from the resulting field names, so unrequested
+columns are deferred and unrequested relations are neither prefetched nor
+counted. Without either parameter the representations are unchanged.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from django.http import QueryDict
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+ALWAYS_INCLUDED = ("id", "updated_at")
+
+
+def parse_names(value: str) -> frozenset[str]:
+    return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+
+@dataclass(frozen=True)
+class Fieldset:
+    """The fields and expansions a request asked for.
+
+    ``fields`` is None when the client did not restrict them.
+    """
+
+    fields: frozenset[str] | None = None
+    expand: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_query_params(
+        cls, query_params: QueryDict, serializer_class: type
+    ) -> "Fieldset":
+        """Parse and validate ``fields`` and ``expand`` for a serializer.
+
+        Raises:
+            ValidationError: A name the serializer does not have.
+        """
+        fieldset = cls(
+            fields=(
+                parse_names(query_params["fields"])
+                if "fields" in query_params
+                else None
+            ),
+            expand=parse_names(query_params.get("expand", "")),
+        )
+
+        expandable = set(serializer_class.expandable_fields)
+        available = [*serializer_class.Meta.fields, *expandable]
+        errors = {}
+        if fieldset.fields is not None and not fieldset.fields <= set(available):
+            errors["fields"] = unknown_names(fieldset.fields, available)
+        if not fieldset.expand <= expandable:
+            errors["expand"] = unknown_names(fieldset.expand, expandable)
+        if errors:
+            raise ValidationError(errors)
+
+        return fieldset
+
+    def names(self, serializer_class: type) -> list[str]:
+        """The fields a serializer outputs for this fieldset, in order."""
+        default = list(serializer_class.Meta.fields)
+        candidates = default + [
+            name for name in serializer_class.expandable_fields if name not in default
+        ]
+
+        if self.fields is None:
+            return [
+                name for name in candidates if name in default or name in self.expand
+            ]
+
+        return [
+            name
+            for name in candidates
+            if name in self.fields or name in self.expand or name in ALWAYS_INCLUDED
+        ]
+
+
+def unknown_names(names: frozenset[str], available) -> str:
+    unknown = ", ".join(sorted(names - set(available)))
+
+    return f"Unknown name(s): {unknown}. Choose from: {', '.join(sorted(available))}."
+
+
+class SparseFieldsetMixin:
+    """Output the fields of the ``fieldset`` in the serializer context.
+
+    ``expandable_fields`` maps the relations ``?expand=`` may add to factories
+    of their (read-only) fields. Without a fieldset in the context, e.g. when
+    the serializer validates input, all the default fields are kept.
+    """
+
+    expandable_fields: dict[str, Callable[[], serializers.Field]] = {}
+
+    def get_fields(self) -> dict[str, serializers.Field]:
+        fields = super().get_fields()
+        fieldset: Fieldset | None = self.context.get("fieldset")
+        if fieldset is None:
+            return fields
+
+        shaped = {}
+        for name in fieldset.names(type(self)):
+            field = fields.get(name)
+            shaped[name] = (
+                field if field is not None else self.expandable_fields[name]()
+            )
+
+        return shaped
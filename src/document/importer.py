@@ -0,0 +1,207 @@
+"""Bulk import of an existing directory tree of documents.
+
+Every file becomes a Document titled after the file, with a single
+DocumentFile, tagged with the names of the folders it sits in. Hashing and
+copying the bytes into the blob storage run on a thread pool (both mostly wait
+on I/O, and hashlib releases the GIL); the rows are written by the calling
+thread in batches, a constant number of statements per batch.
+
+Batches bypass model ``save()``, so everything its signals maintain is done
+here explicitly: blob reference counts, tag counts, the autocomplete index
+the full-text search entries and the similarity embeddings. Text extraction
+needs nothing: files are created PENDING and picked up by the extraction
+workers.
+
+Imported paths are appended to a journal once their batch is committed, and
+skipped when the import is run again, so an interrupted import can simply be
+restarted. A crash between a commit and its journal entry re-imports that one
+batch.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path, PurePosixPath
+
+from django.contrib.auth.models import AbstractUser
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from document import responsecache, search, similarity, tagcounts
+from document.metadata import read_head, sniff_mime_type
+from document.models import Document, DocumentFile, DocumentTag, FileBlob
+from document.storage import blob_path, write_blob
+from document.tagging import resolve_tags
+
+JOURNAL_NAME = ".import-journal"
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    """A source file whose bytes are in the blob storage."""
+
+    path: str
+    sha256: str
+    size: int
+    name: str
+    mime_type: str
+
+
+class ImportJournal:
+    """Append-only list of the source paths already imported, one per line."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> set[str]:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                # A line cut short by a crash is not a complete entry.
+                return {json.loads(line) for line in handle if line.endswith("\n")}
+        except FileNotFoundError:
+            return set()
+
+    def record(self, paths: Iterable[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.writelines(f"{json.dumps(path)}\n" for path in paths)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def scan(root: Path) -> Iterator[str]:
+    """Yield the paths of the files under ``root``, relative to it, in order.
+
+    Hidden files and folders (including the journal) are skipped.
+    """
+    for directory, folders, files in os.walk(root):
+        folders[:] = sorted(name for name in folders if not name.startswith("."))
+        relative = PurePosixPath(Path(directory).relative_to(root))
+
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield str(relative / name)
+
+
+def folder_tags(path: str) -> list[str]:
+    """Tag names for ``path``: the folders it sits in, outermost first."""
+    return list(PurePosixPath(path).parent.parts)
+
+
+def store_file(root: Path, path: str) -> StoredFile:
+    """Hash ``root / path`` and copy it into the blob storage if it is new."""
+    storage = FileBlob._meta.get_field("file").storage
+    hasher = hashlib.sha256()
+
+    with open(root / path, "rb") as handle:
+        file = File(handle, name=PurePosixPath(path).name)
+        mime_type = sniff_mime_type(read_head(file), file.name)
+        for chunk in file.chunks():
+            hasher.update(chunk)
+
+        digest = hasher.hexdigest()
+        name = blob_path(digest, file.name)
+        write_blob(storage, name, file)
+
+        return StoredFile(path, digest, file.size, name, mime_type)
+
+
+def import_batch(files: list[StoredFile], owner: AbstractUser) -> list[Document]:
+    """Create the documents, files, blobs and tags of ``files`` in one transaction."""
+    with transaction.atomic(), tagcounts.batch() as counts:
+        blobs = get_blobs(files)
+
+        titles = [PurePosixPath(file.path).stem for file in files]
+        # bulk_create() skips Document.save(), which folds the title.
+        documents = Document.objects.bulk_create(
+            Document(title=title, title_folded=title.casefold(), owner=owner)
+            for title in titles
+        )
+        DocumentFile.objects.bulk_create(
+            DocumentFile(
+                document=document,
+                uploaded_by=owner,
+                # The blob's copy: ours may sit under another extension.
+                file=blobs[file.sha256].file.name,
+                blob=blobs[file.sha256],
+                size=file.size,
+                mime_type=file.mime_type,
+                sha256=file.sha256,
+            )
+            for document, file in zip(documents, files)
+        )
+        acquire_blobs(Counter(blobs[file.sha256].pk for file in files))
+
+        names = sorted({name for file in files for name in folder_tags(file.path)})
+        tags = resolve_tags(names, create=True)
+        links = [
+            DocumentTag(document=document, tag=tags[name], added_by=owner)
+            for document, file in zip(documents, files)
+            for name in dict.fromkeys(folder_tags(file.path))
+        ]
+        DocumentTag.objects.bulk_create(links)
+        for link in links:
+            counts.add(link.document_id, link.tag_id, 1, owner.pk)
+
+        search.index_documents(document.pk for document in documents)
+        similarity.index_on_commit([document.pk for document in documents])
+        responsecache.invalidate_user(owner.pk)
+        transaction.on_commit(partial(discard_unreferenced, files))
+
+    return documents
+
+
+def get_blobs(files: list[StoredFile]) -> dict[str, FileBlob]:
+    """FileBlob rows for the digests of ``files``, created where missing."""
+    digests = {file.sha256: file for file in files}
+    blobs = FileBlob.objects.in_bulk(list(digests), field_name="sha256")
+
+    missing = [digest for digest in digests if digest not in blobs]
+    if missing:
+        FileBlob.objects.bulk_create(
+            [
+                FileBlob(
+                    sha256=digest,
+                    file=digests[digest].name,
+                    size=digests[digest].size,
+                )
+                for digest in missing
+            ],
+            ignore_conflicts=True,
+        )
+        blobs |= FileBlob.objects.in_bulk(missing, field_name="sha256")
+
+    return blobs
+
+
+def discard_unreferenced(files: list[StoredFile]) -> None:
+    """Delete the stored bytes of ``files`` that no blob row points at.
+
+    For the files of batches that were not committed, and for the copies of
+    committed ones whose content a blob already had under another name. The
+    bytes a blob points at are kept.
+    """
+    storage = FileBlob._meta.get_field("file").storage
+    referenced = set(
+        FileBlob.objects.filter(sha256__in=[file.sha256 for file in files]).values_list(
+            "file", flat=True
+        )
+    )
+    for file in files:
+        if file.name not in referenced:
+            storage.delete(file.name)
+
+
+def acquire_blobs(references: Counter[int]) -> None:
+    """Add ``references`` (by blob id) to the blobs' reference counts at once."""
+    FileBlob.objects.filter(pk__in=references).update(
+        ref_count=F("ref_count")
+        + Case(
+            *(When(pk=pk, then=Value(count)) for pk, count in references.items()),
+            output_field=IntegerField(),
+        )
+    )
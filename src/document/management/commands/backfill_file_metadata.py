@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from document import responsecache
+from document.metadata import FileMetadata, read_metadata
+from document.models import DocumentFile, DocumentFileText
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the size, MIME type, checksum and page count of document files "
+        "stored before those columns existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Threads reading files.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Files read and updated per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+
+        # Files already extracted know their page count from their pages.
+        page_counts = (
+            DocumentFileText.objects.filter(file=OuterRef("pk"))
+            .order_by()
+            .values("file")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        counted = DocumentFile.objects.filter(
+            status=DocumentFile.Status.DONE, page_count__isnull=True
+        ).update(page_count=Subquery(page_counts), updated_at=timezone.now())
+
+        pending = (
+            DocumentFile.objects.filter(
+                Q(size__isnull=True) | Q(mime_type="") | Q(sha256="")
+            )
+            .exclude(file="")
+            .select_related("blob")
+            .order_by("pk")
+        )
+
+        updated = missing = 0
+        last_pk = None
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                # Keyset pagination: rows that fail stay in the filter.
+                batch_queryset = pending
+                if last_pk is not None:
+                    batch_queryset = batch_queryset.filter(pk__gt=last_pk)
+                files = list(batch_queryset[:batch_size])
+                if not files:
+                    break
+                last_pk = files[-1].pk
+
+                results = executor.map(self.read, files)
+                changed = []
+                for document_file, metadata in zip(files, results):
+                    if metadata is None:
+                        missing += 1
+                        continue
+
+                    blob = document_file.blob
+                    document_file.size = blob.size if blob else metadata.size
+                    document_file.sha256 = blob.sha256 if blob else metadata.sha256
+                    document_file.mime_type = metadata.mime_type
+                    document_file.updated_at = timezone.now()
+                    changed.append(document_file)
+
+                DocumentFile.objects.bulk_update(
+                    changed, ["size", "sha256", "mime_type", "updated_at"]
+                )
+                updated += len(changed)
+                self.stdout.write(f"Updated {updated} file(s).")
+
+        if updated or counted:
+            responsecache.invalidate_all()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled {updated} file(s) and {counted} page count(s); "
+                f"{missing} file(s) could not be read."
+            )
+        )
+
+    def read(self, document_file: DocumentFile) -> FileMetadata | None:
+        try:
+            # Files in the blob layout already carry their size and checksum.
+            return read_metadata(
+                document_file.file.path,
+                document_file.file.name,
+                digest=document_file.blob is None,
+            )
+        except (OSError, NotImplementedError) as exc:
+            self.stderr.write(f"Cannot read file {document_file.pk}: {exc}")
+            return None
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from document import responsecache
+from document.models import DocumentFile, FileBlob
+from document.storage import blob_path, sha256_file, write_blob
+
+
+class Command(BaseCommand):
+    help = (
+        "Move document files stored in the legacy per-user layout into the "
+        "content-addressed blob layout and report the disk space reclaimed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be migrated and reclaimed.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows read from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run: bool = options["dry_run"]
+        storage = DocumentFile._meta.get_field("file").storage
+
+        migrated = duplicates = missing = reclaimed = 0
+        # Digests met during this run, so dry runs also count duplicates.
+        seen: set[str] = set()
+
+        legacy_files = (
+            DocumentFile.objects.filter(blob__isnull=True)
+            .exclude(file="")
+            .order_by("uploaded_at")
+        )
+
+        for document_file in legacy_files.iterator(chunk_size=options["chunk_size"]):
+            legacy_name = document_file.file.name
+
+            try:
+                document_file.file.open("rb")
+            except FileNotFoundError:
+                missing += 1
+                self.stderr.write(f"Missing file for {document_file.pk}: {legacy_name}")
+                continue
+
+            with document_file.file:
+                digest = sha256_file(document_file.file)
+                size = document_file.file.size
+                blob = FileBlob.objects.filter(sha256=digest).first()
+                is_duplicate = blob is not None or digest in seen
+
+                if not dry_run:
+                    with transaction.atomic():
+                        if blob is None:
+                            name = blob_path(digest, legacy_name)
+                            write_blob(storage, name, document_file.file)
+                            blob = FileBlob.objects.create(
+                                sha256=digest, file=name, size=size
+                            )
+
+                        DocumentFile.objects.filter(pk=document_file.pk).update(
+                            blob=blob,
+                            file=blob.file.name,
+                            updated_at=timezone.now(),
+                        )
+                        FileBlob.acquire(blob.pk)
+
+            if not dry_run:
+                storage.delete(legacy_name)
+
+            seen.add(digest)
+            migrated += 1
+            if is_duplicate:
+                duplicates += 1
+                reclaimed += size
+
+        if migrated and not dry_run:
+            # File paths changed under every owner's cached responses.
+            responsecache.invalidate_all()
+
+        verb = "Would migrate" if dry_run else "Migrated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {migrated} file(s), {duplicates} duplicate(s); "
+                f"{reclaimed} bytes reclaimed. {missing} file(s) missing."
+            )
+        )
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from document import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a zip or tar archive of every file of a user, with a manifest of "
+        "their documents, tags and notes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--owner",
+            required=True,
+            help="Username of the user whose library is exported.",
+        )
+        parser.add_argument(
+            "--archive",
+            choices=sorted(export.ARCHIVE_WRITERS),
+            default="zip",
+            help="Archive format (default: zip).",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="File to write the archive to (default: standard output).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=export.ITERATOR_CHUNK_SIZE,
+            help="Rows read from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            owner = User.objects.get(username=options["owner"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['owner']!r}.")
+
+        chunks = export.stream_export(
+            owner, options["archive"], chunk_size=options["chunk_size"]
+        )
+
+        if options["output"] is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        size = 0
+        with open(options["output"], "wb") as handle:
+            for chunk in chunks:
+                size += handle.write(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {size} bytes to {options['output']}.")
+        )
@@ -0,0 +1,157 @@
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractUser
+from django.core.management.base import BaseCommand, CommandError
+
+from document import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import every file under a directory as a document of the given user, "
+        "tagged with its folder names. Interrupted imports resume where they "
+        "stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", type=Path, help="Root of the tree to import.")
+        parser.add_argument(
+            "--owner",
+            required=True,
+            help="Username of the user the documents are created for.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Threads hashing and copying files.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Documents created per transaction.",
+        )
+        parser.add_argument(
+            "--journal",
+            type=Path,
+            default=None,
+            help=(
+                "File recording the imported paths "
+                f"(default: <directory>/{importer.JOURNAL_NAME})."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        root: Path = options["directory"].resolve()
+        batch_size: int = options["batch_size"]
+        if not root.is_dir():
+            raise CommandError(f"{root} is not a directory.")
+
+        User = get_user_model()
+        try:
+            owner = User.objects.get(username=options["owner"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['owner']!r}.")
+
+        journal = importer.ImportJournal(
+            options["journal"] or root / importer.JOURNAL_NAME
+        )
+        done = journal.load()
+        paths = [path for path in importer.scan(root) if path not in done]
+        self.stdout.write(
+            f"Importing {len(paths)} file(s), {len(done)} already imported."
+        )
+
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            imported, failed, size = self.import_files(
+                executor, root, paths, owner, journal, batch_size, started
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} file(s), {size / 1e6:.1f} MB "
+                f"({self.throughput(imported, size, started)}); "
+                f"{failed} failed."
+            )
+        )
+
+    def import_files(
+        self,
+        executor: Executor,
+        root: Path,
+        paths: list[str],
+        owner: AbstractUser,
+        journal: importer.ImportJournal,
+        batch_size: int,
+        started: float,
+    ) -> tuple[int, int, int]:
+        """Store and write the files batch by batch, in scan order.
+
+        Files are stored at most two batches ahead of the batch being written,
+        so an import does not copy the whole tree before its first commit.
+        If a batch fails, the copies that no committed blob points at are
+        deleted before the error is raised.
+
+        Returns:
+            tuple[int, int, int]: Files imported, files that could not be read,
+            and bytes imported.
+        """
+        imported = failed = size = 0
+        remaining = iter(paths)
+        pending: deque[Future] = deque()
+
+        def submit(count: int) -> None:
+            for path in islice(remaining, count):
+                pending.append(executor.submit(importer.store_file, root, path))
+
+        batch = []
+        try:
+            submit(2 * batch_size)
+            while pending:
+                batch = []
+                for _ in range(min(batch_size, len(pending))):
+                    try:
+                        batch.append(pending.popleft().result())
+                    except OSError as exc:
+                        # Not journaled: retried by the next run.
+                        failed += 1
+                        self.stderr.write(f"Could not read {exc.filename}: {exc}")
+                submit(batch_size)
+
+                if not batch:
+                    continue
+
+                importer.import_batch(batch, owner)
+                journal.record(file.path for file in batch)
+
+                imported += len(batch)
+                size += sum(file.size for file in batch)
+                self.stdout.write(
+                    f"{imported}/{len(paths)} file(s) imported "
+                    f"({self.throughput(imported, size, started)})."
+                )
+        except BaseException:
+            # Don't keep copying files that will not be imported.
+            executor.shutdown(cancel_futures=True)
+            stored = [
+                future.result()
+                for future in pending
+                if not future.cancelled() and future.exception() is None
+            ]
+            importer.discard_unreferenced(batch + stored)
+            raise
+
+        return imported, failed, size
+
+    def throughput(self, files: int, size: int, started: float) -> str:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+
+        return f"{files / elapsed:.1f} files/s, {size / 1e6 / elapsed:.1f} MB/s"
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from authapi.models import ApiToken
+from document.models import Document, DocumentFile
+
+
+@dataclass
+class TransferStats:
+    """Transfers in flight (response started, body not fully sent) over a run."""
+
+    active: int = 0
+    peak: int = 0
+    completed: int = 0
+    failed: int = 0
+    bytes: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def started(self) -> None:
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def finished(self, received: int, ok: bool) -> None:
+        with self.lock:
+            self.active -= 1
+            self.bytes += received
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how many concurrent downloads by slow clients one process can "
+        "hold: the sync view under a WSGI handler with a fixed pool of worker "
+        "threads (as gunicorn's gthread workers), against the async view under "
+        "the ASGI handler. Requests go through Django's handlers in-process, "
+        "without sockets, using a temporary user and file that are removed "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=200,
+            help="Concurrent clients, each downloading the file once.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=16,
+            help="Worker threads of the sync run.",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=256 * 1024,
+            help="Size of the downloaded file, in bytes.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=int,
+            default=256 * 1024,
+            help="Bytes per second each client reads.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["sync", "async", "both"],
+            default="both",
+        )
+        parser.add_argument(
+            "--host",
+            default="127.0.0.1",
+            help="Host header sent, which must be in ALLOWED_HOSTS.",
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create_user(
+            username=f"loadtest-{uuid.uuid4().hex[:12]}"
+        )
+        try:
+            _, key = ApiToken.issue(user, "loadtest")
+            document = Document.objects.create(title="Load test", owner=user)
+            document_file = DocumentFile.objects.create(
+                document=document,
+                uploaded_by=user,
+                file=ContentFile(os.urandom(options["size"]), name="loadtest.bin"),
+            )
+            kwargs = {"document_pk": document.pk, "pk": document_file.pk}
+            headers = {"Authorization": f"Token {key}", "Host": options["host"]}
+
+            if options["mode"] in ("sync", "both"):
+                path = reverse("document-files-download", kwargs=kwargs)
+                self.report(
+                    f"sync  (WSGI, {options['threads']} threads)",
+                    *self.timed(self.run_sync, path, headers, options),
+                )
+            if options["mode"] in ("async", "both"):
+                path = reverse("async-document-files-download", kwargs=kwargs)
+                self.report(
+                    "async (ASGI)",
+                    *self.timed(
+                        lambda *args: asyncio.run(self.run_async(*args)),
+                        path,
+                        headers,
+                        options,
+                    ),
+                )
+        finally:
+            user.delete()
+
+    def timed(self, run, *args) -> tuple[TransferStats, float]:
+        start = time.perf_counter()
+        stats = run(*args)
+
+        return stats, time.perf_counter() - start
+
+    def report(self, label: str, stats: TransferStats, elapsed: float) -> None:
+        self.stdout.write(
+            f"{label}: {stats.completed} transfer(s) in {elapsed:.2f}s "
+            f"({stats.failed} failed), peak {stats.peak} concurrent, "
+            f"{stats.bytes / elapsed / 1e6:.1f} MB/s"
+        )
+
+    def run_sync(self, path: str, headers: dict, options: dict) -> TransferStats:
+        handler = WSGIHandler()
+        stats = TransferStats()
+        rate: int = options["rate"]
+
+        def transfer(_):
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                **{
+                    f"HTTP_{name.upper().replace('-', '_')}": value
+                    for name, value in headers.items()
+                },
+            }
+            setup_testing_defaults(environ)
+            statuses = []
+
+            result = handler(environ, lambda status, *args: statuses.append(status))
+            stats.started()
+            received = 0
+            try:
+                for chunk in result:
+                    received += len(chunk)
+                    # The worker thread writes at the client's pace.
+                    time.sleep(len(chunk) / rate)
+            finally:
+                result.close()
+                stats.finished(received, statuses[0].startswith("200"))
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            list(executor.map(transfer, range(options["clients"])))
+
+        return stats
+
+    async def run_async(self, path: str, headers: dict, options: dict) -> TransferStats:
+        handler = ASGIHandler()
+        stats = TransferStats()
+        rate: int = options["rate"]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("127.0.0.1", 80),
+        }
+
+        async def transfer():
+            done = asyncio.Event()
+            messages = iter([{"type": "http.request", "body": b""}])
+            status = received = 0
+
+            async def receive() -> dict:
+                message = next(messages, None)
+                if message is None:
+                    # Django listens for a disconnect until the response ends.
+                    await done.wait()
+                    message = {"type": "http.disconnect"}
+                return message
+
+            async def send(message: dict) -> None:
+                nonlocal status, received
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    stats.started()
+                elif message["type"] == "http.response.body":
+                    body = message.get("body", b"")
+                    received += len(body)
+                    # A slow client: the server's send waits for its socket.
+                    await asyncio.sleep(len(body) / rate)
+
+            try:
+                await handler(scope, receive, send)
+            finally:
+                done.set()
+                stats.finished(received, status == 200)
+
+        await asyncio.gather(*(transfer() for _ in range(options["clients"])))
+
+        return stats
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from document.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete expired resumable upload sessions and their partial files."
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+
+        # Deleting through the ORM removes each part file (see document.signals).
+        deleted, _ = expired.delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {deleted} expired upload session(s).")
+        )
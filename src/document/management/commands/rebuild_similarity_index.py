@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from document import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the embedding matrices of the similar documents endpoint "
+        "from the documents' text."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only rebuild the matrix of this user id (repeatable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Documents read and embedded at a time.",
+        )
+
+    def handle(self, *args, **options):
+        embedded = similarity.rebuild(
+            user_ids=options["user_ids"], batch_size=options["batch_size"]
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Embedded {embedded} document(s)."))
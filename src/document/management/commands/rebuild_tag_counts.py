@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from document import tagcounts
+from document.autocomplete import invalidate_tag_index
+from document.models import DocumentTag, UserTagCount
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user tag counts from the document tags and report "
+        "how many were out of date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only rebuild the counts of this user id (repeatable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Counters inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        written, changed = tagcounts.rebuild(
+            DocumentTag,
+            UserTagCount,
+            user_ids=options["user_ids"],
+            batch_size=options["batch_size"],
+        )
+        # Also drops every process' cached usage counts.
+        invalidate_tag_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {written} tag count(s); {changed} were out of date."
+            )
+        )
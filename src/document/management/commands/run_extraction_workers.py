@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from document import pipeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract the text of pending document files on a pool of worker "
+        "processes (one per CPU core by default)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of extraction processes (default: number of CPU cores).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Files claimed per batch (default: 4 per worker).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the files currently pending and exit.",
+        )
+        parser.add_argument(
+            "--requeue-processing",
+            action="store_true",
+            help=(
+                "Put files left in 'processing' by an interrupted run back in "
+                "the queue. Only use it when no other dispatcher is running."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        workers: int = options["workers"]
+        batch_size: int = options["batch_size"] or workers * 4
+
+        if options["requeue_processing"]:
+            requeued = pipeline.requeue_processing_files()
+            self.stdout.write(f"Requeued {requeued} interrupted file(s).")
+
+        self.stdout.write(f"Starting {workers} extraction worker(s).")
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                result = pipeline.run_batch(executor, batch_size)
+
+                if result.total:
+                    self.stdout.write(
+                        f"Processed {result.total} file(s): "
+                        f"{result.done} done, {result.failed} failed."
+                    )
+                    continue
+
+                if options["once"]:
+                    break
+
+                time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS("Extraction queue drained."))
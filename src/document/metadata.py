@@ -0,0 +1,91 @@
+"""File metadata captured once, so reads never touch the storage backend.
+
+Size and checksum come from hashing the content (usually already done for the
+blob storage), the MIME type is sniffed from the first bytes and the page
+count is the number of pages the extraction stage produced. This module has no
+model imports so it can run on worker threads or processes.
+"""
+
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass
+
+from django.core.files import File
+
+# Enough for every signature below.
+SNIFF_BYTES = 2048
+
+DEFAULT_MIME_TYPE = "application/octet-stream"
+
+SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+]
+
+# Containers whose actual type depends on what is inside them (e.g. docx and
+# odt are zips): the extension is trusted if it names a type of that family.
+CONTAINERS = {b"PK\x03\x04": "application/zip"}
+
+
+@dataclass(frozen=True)
+class FileMetadata:
+    size: int
+    mime_type: str
+    # None when the caller already knows it (e.g. from the file's blob).
+    sha256: str | None = None
+
+
+def sniff_mime_type(head: bytes, filename: str) -> str:
+    """Return the MIME type of a file from its first bytes and its name.
+
+    Signatures win over the extension, which is only used for containers and
+    for formats without a signature (e.g. plain text).
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+
+    guessed, _ = mimetypes.guess_type(filename)
+    for signature, mime_type in CONTAINERS.items():
+        if head.startswith(signature):
+            if guessed and guessed.startswith(("application/vnd.", mime_type)):
+                return guessed
+            return mime_type
+
+    return guessed or DEFAULT_MIME_TYPE
+
+
+def read_head(file: File) -> bytes:
+    """Return the first bytes of ``file`` and rewind it."""
+    file.seek(0)
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+
+    return head
+
+
+def read_metadata(path: str, filename: str, digest: bool = True) -> FileMetadata:
+    """Read the metadata of the file at ``path``, hashing it if ``digest``."""
+    with open(path, "rb") as handle:
+        head = handle.read(SNIFF_BYTES)
+        sha256 = None
+
+        if digest:
+            hasher = hashlib.sha256(head)
+            while chunk := handle.read(File.DEFAULT_CHUNK_SIZE):
+                hasher.update(chunk)
+            sha256 = hasher.hexdigest()
+
+        size = os.fstat(handle.fileno()).st_size
+
+    return FileMetadata(size, sniff_mime_type(head, filename), sha256)
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# The DDL of the index as of this migration, rather than the live
+# document.search module: later changes to the module must not change what
+# this migration did. Each entry runs in order.
+CREATE_SQL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE document_search USING fts5("
+        "owner, title, description, notes, "
+        "tokenize = 'unicode61 remove_diacritics 2')",
+        "INSERT INTO document_search (rowid, owner, title, description, notes) "
+        "SELECT d.id, 'u' || d.owner_id, d.title, COALESCE(d.description, ''), "
+        "COALESCE(("
+        "SELECT group_concat(content, char(10)) FROM ("
+        "SELECT n.content FROM document_documentnote n "
+        "WHERE n.document_id = d.id ORDER BY n.id)"
+        "), '') "
+        "FROM document_document d",
+    ],
+    "postgresql": [
+        "CREATE TABLE document_search ("
+        "document_id bigint PRIMARY KEY "
+        "REFERENCES document_document (id) ON DELETE CASCADE "
+        "DEFERRABLE INITIALLY DEFERRED, "
+        "owner_id bigint NOT NULL, "
+        "vector tsvector NOT NULL)",
+        "CREATE INDEX document_search_vector_idx "
+        "ON document_search USING GIN (vector)",
+        "CREATE INDEX document_search_owner_idx ON document_search (owner_id)",
+        "INSERT INTO document_search (document_id, owner_id, vector) "
+        "SELECT d.id, d.owner_id, "
+        "setweight(to_tsvector('simple', d.title), 'A') || "
+        "setweight(to_tsvector('simple', COALESCE(d.description, '')), 'B') || "
+        "setweight(to_tsvector('simple', COALESCE(("
+        "SELECT string_agg(n.content, E'\\n' ORDER BY n.id) "
+        "FROM document_documentnote n WHERE n.document_id = d.id"
+        "), '')), 'C') "
+        "FROM document_document d",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_SQL:
+        raise NotImplementedError(f"Full-text search is not supported on {vendor}.")
+
+    for sql in CREATE_SQL[vendor]:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute("DROP TABLE IF EXISTS document_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0002_document_owner_updated_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
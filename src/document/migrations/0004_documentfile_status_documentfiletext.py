@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0003_document_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentfile",
+            name="extraction_error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="documentfile",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("done", "Done"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="DocumentFileText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("page_number", models.PositiveIntegerField()),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "file",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pages",
+                        to="document.documentfile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["file", "page_number"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("file", "page_number"), name="unique_file_page"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0006_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentfile",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from document import tagcounts
+
+
+def fill_tag_counts(apps, schema_editor):
+    tagcounts.rebuild(
+        apps.get_model("document", "DocumentTag"),
+        apps.get_model("document", "UserTagCount"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0007_documentfile_updated_at_tag_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserTagCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_counts",
+                        to="document.tag",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_counts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "tag"), name="unique_user_tag"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_tag_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0008_usertagcount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentfile",
+            name="mime_type",
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="documentfile",
+            name="page_count",
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="documentfile",
+            name="sha256",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="documentfile",
+            name="size",
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:24
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0009_documentfile_metadata"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["owner", "-created_at", "-id"],
+                name="document_owner_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                models.F("owner"),
+                django.db.models.functions.text.Lower("title"),
+                name="document_owner_title_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="documenttag",
+            index=models.Index(
+                fields=["tag", "document"], name="documenttag_tag_doc_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fold_titles(apps, schema_editor):
+    Document = apps.get_model("document", "Document")
+    batch = []
+    for document in Document.objects.only("pk", "title").iterator(chunk_size=1000):
+        document.title_folded = document.title.casefold()
+        batch.append(document)
+        if len(batch) == 1000:
+            Document.objects.bulk_update(batch, ["title_folded"])
+            batch = []
+    Document.objects.bulk_update(batch, ["title_folded"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("document", "0010_document_filter_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="document",
+            name="document_owner_title_idx",
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="title_folded",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.RunPython(fold_titles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["owner", "title_folded"], name="document_owner_title_idx"
+            ),
+        ),
+    ]
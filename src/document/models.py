@@ -1,9 +1,19 @@
 import uuid
+from datetime import timedelta
+from functools import partial
 from pathlib import Path
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.files import File
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from document.metadata import read_head, sniff_mime_type
+from document.storage import blob_path, sha256_file, write_blob
 
 User = get_user_model()
 
@@ -22,7 +32,7 @@ def document_file_path(instance: "DocumentFile", filename: str) -> str:
     Returns:
         str: The constructed file path.
     """
-    user_id: int = instance.owner.pk
+    user_id: int = instance.document.owner_id
     file_id: uuid.UUID = instance.id or uuid.uuid4()
     ext: str = Path(filename).suffix.lower() or ""
 
@@ -37,6 +47,7 @@ class Tag(models.Model):
     """
 
     name = models.CharField(max_length=250, unique=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
@@ -45,45 +56,414 @@ class Tag(models.Model):
         return self.name
 
 
+class DocumentQuerySet(models.QuerySet):
+    def with_counts(self, files: bool = True, notes: bool = True) -> "DocumentQuerySet":
+        """Annotate each document with its number of files and/or notes.
+
+        Counts are computed with correlated subqueries rather than JOIN +
+        GROUP BY, so the database only evaluates them for the rows that are
+        actually returned (e.g. a single page) instead of the whole library.
+        """
+        annotations = {}
+        if files:
+            annotations["file_count"] = _count_subquery(DocumentFile)
+        if notes:
+            annotations["note_count"] = _count_subquery(DocumentNote)
+
+        return self.annotate(**annotations)
+
+    def with_relations(self, *names: str) -> "DocumentQuerySet":
+        """Prefetch the named relations of the detail representation.
+
+        Args:
+            *names (str): Any of "tags", "files" and "notes", a query each.
+        """
+        lookups = {
+            "tags": "tags",
+            "files": models.Prefetch(
+                "files", queryset=DocumentFile.objects.select_related("uploaded_by")
+            ),
+            "notes": models.Prefetch(
+                "notes", queryset=DocumentNote.objects.select_related("created_by")
+            ),
+        }
+
+        return self.prefetch_related(*(lookups[name] for name in names))
+
+    def with_details(self) -> "DocumentQuerySet":
+        """Load everything the detail representation shows, in four queries."""
+        return self.select_related("owner").with_relations("tags", "files", "notes")
+
+    def tagged(self, tag_ids: list[int], match_all: bool = False) -> "DocumentQuerySet":
+        """Keep the documents with any (or all) of the given tags.
+
+        Each tag is an ``IN`` subquery answered from the (tag, document) index
+        of DocumentTag, rather than a JOIN that could repeat documents.
+        """
+        if not match_all:
+            return self.filter(pk__in=_tagged_document_ids(tag_ids))
+
+        queryset = self
+        for tag_id in tag_ids:
+            queryset = queryset.filter(pk__in=_tagged_document_ids([tag_id]))
+
+        return queryset
+
+    def title_prefix(self, prefix: str) -> "DocumentQuerySet":
+        """Keep the documents whose title starts with ``prefix``, ignoring case.
+
+        Titles are matched on ``title_folded``, their ``str.casefold()``:
+        SQLite's LOWER() only folds ASCII letters, so "éxito" would not find
+        "Éxito". The range lets the database seek the (owner, title_folded)
+        index; the LIKE then only checks the rows of the range.
+        """
+        prefix = prefix.casefold()
+        upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        return self.filter(
+            title_folded__gte=prefix,
+            title_folded__lt=upper_bound,
+            title_folded__startswith=prefix,
+        )
+
+    def having(
+        self, files: bool | None = None, notes: bool | None = None
+    ) -> "DocumentQuerySet":
+        """Keep the documents with (True) or without (False) files and/or notes."""
+        queryset = self
+        for model, present in ((DocumentFile, files), (DocumentNote, notes)):
+            if present is not None:
+                exists = models.Exists(
+                    model.objects.filter(document=models.OuterRef("pk"))
+                )
+                queryset = queryset.filter(exists if present else ~exists)
+
+        return queryset
+
+
+def _tagged_document_ids(tag_ids: list[int]) -> models.QuerySet:
+    return DocumentTag.objects.filter(tag_id__in=tag_ids).values("document_id")
+
+
+def _count_subquery(model: type[models.Model]) -> Coalesce:
+    subquery = models.Subquery(
+        model.objects.filter(document=models.OuterRef("pk"))
+        .order_by()
+        .values("document")
+        .annotate(count=models.Count("pk"))
+        .values("count"),
+        output_field=models.IntegerField(),
+    )
+
+    return Coalesce(subquery, 0)
+
+
 class Document(models.Model):
     """A single logical document."""
 
     title = models.CharField(max_length=500, db_index=True)
+    # title.casefold(), kept by save(), for case-insensitive prefix matches.
+    # Folding can lengthen a title ("ß" becomes "ss"), hence a TextField.
+    title_folded = models.TextField(editable=False, default="")
     description = models.TextField(blank=True, null=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="documents")
     tags = models.ManyToManyField(Tag, through="DocumentTag", related_name="documents")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DocumentQuerySet.as_manager()
+
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [
+            models.Index(
+                fields=["owner", "-updated_at", "-id"],
+                name="document_owner_updated_idx",
+            ),
+            models.Index(
+                fields=["owner", "-created_at", "-id"],
+                name="document_owner_created_idx",
+            ),
+            models.Index(
+                fields=["owner", "title_folded"], name="document_owner_title_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.title_folded = self.title.casefold()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "title" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "title_folded"}
+
+        super().save(*args, **kwargs)
+
     def add_tag(self, tag: Tag, added_by: AbstractUser) -> None:
         DocumentTag.objects.create(document=self, tag=tag, added_by=added_by)
 
 
+class FileBlob(models.Model):
+    """A unique file content, shared by every DocumentFile that uploaded it.
+
+    ``ref_count`` tracks the number of DocumentFile rows pointing at the blob;
+    the bytes are deleted from storage when it drops to zero. Ownership is
+    never checked here: access always goes through a user's DocumentFile.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=1024)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+    @classmethod
+    def store(cls, file: File, filename: str) -> "FileBlob":
+        """Return the blob holding ``file``'s content, writing it if it is new.
+
+        A reference is taken on the blob, in the caller's transaction: the
+        caller must release it unless it commits a DocumentFile pointing at it.
+        New bytes are only written once the row holds the digest, so they
+        cannot be deleted by the purge of an older blob of the same content.
+        """
+        digest = sha256_file(file)
+
+        while True:
+            blob = cls.objects.filter(sha256=digest).first()
+            if blob is not None:
+                # Conditional on the row: the last reference may have been
+                # released, and the row deleted, since the read above.
+                if cls.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1):
+                    return blob
+                continue
+
+            # Read before writing: the storage may move a temporary file away.
+            size = file.size
+            name = blob_path(digest, filename)
+
+            try:
+                with transaction.atomic():
+                    blob = cls.objects.create(
+                        sha256=digest, file=name, size=size, ref_count=1
+                    )
+            except IntegrityError:
+                # Stored concurrently by another request: take a reference.
+                continue
+
+            write_blob(cls._meta.get_field("file").storage, name, file)
+            return blob
+
+    @classmethod
+    def acquire(cls, blob_id: int) -> None:
+        cls.objects.filter(pk=blob_id).update(ref_count=F("ref_count") + 1)
+
+    @classmethod
+    def release(cls, blob_id: int) -> None:
+        """Drop one reference, deleting the blob once nothing points at it."""
+        cls.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+
+        orphan = cls.objects.filter(pk=blob_id, ref_count=0).first()
+        if orphan is None:
+            return
+
+        # The row is only deleted if no reference was taken in the meantime,
+        # and the bytes only once that deletion is committed.
+        if cls.objects.filter(pk=blob_id, ref_count=0).delete()[0]:
+            transaction.on_commit(
+                partial(cls.delete_unused_bytes, orphan.sha256, orphan.file.name)
+            )
+
+    @classmethod
+    def delete_unused_bytes(cls, digest: str, name: str) -> None:
+        """Delete the bytes of content ``digest`` at ``name`` unless a blob owns them.
+
+        The content may have been stored again since the caller let go of it.
+        A placeholder row holds the digest meanwhile: it fails if a live blob
+        exists, and a concurrent ``store()`` of the content waits for it, so
+        only writes its bytes once these are gone.
+        """
+        try:
+            with transaction.atomic():
+                placeholder = cls.objects.create(sha256=digest, file=name, size=0)
+                cls._meta.get_field("file").storage.delete(name)
+                placeholder.delete()
+        except IntegrityError:
+            pass
+
+
 class DocumentFile(models.Model):
+    class Status(models.TextChoices):
+        """Text extraction state, advanced by the extraction workers."""
+
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     document = models.ForeignKey(
         Document, on_delete=models.CASCADE, related_name="files"
     )
     file = models.FileField(upload_to=document_file_path, max_length=1024)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     uploaded_by = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="uploaded_files"
     )
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    extraction_error = models.TextField(blank=True)
+    blob = models.ForeignKey(
+        FileBlob,
+        on_delete=models.PROTECT,
+        related_name="document_files",
+        null=True,
+        blank=True,
+    )
+    # Captured once at upload (page_count at extraction) so that listing and
+    # filtering never hit the storage; see document.metadata. Empty for
+    # files stored before they existed until backfill_file_metadata runs.
+    size = models.BigIntegerField(null=True, blank=True, db_index=True)
+    mime_type = models.CharField(max_length=100, blank=True, db_index=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
 
     @property
     def owner(self) -> AbstractUser:
         return self.document.owner
 
+    def save(self, *args, **kwargs):
+        """Store new uploads in the deduplicated blob layout.
+
+        The uploaded content is hashed and, if an identical content already
+        exists, only a reference to it is added. ``file`` then points at the
+        shared blob path. The content's metadata is captured on the way.
+        Replacing the content of an existing file drops its extracted text
+        and queues it for extraction again.
+        """
+        if not self.file or self.file._committed:
+            return super().save(*args, **kwargs)
+
+        adding = self._state.adding
+        previous_blob_id = None
+        if not adding:
+            previous_blob_id = (
+                DocumentFile.objects.filter(pk=self.pk)
+                .values_list("blob_id", flat=True)
+                .first()
+            )
+
+        # Before storing: the storage may move a temporary file away.
+        mime_type = sniff_mime_type(read_head(self.file.file), self.file.name)
+
+        blob = None
+        try:
+            with transaction.atomic():
+                blob = FileBlob.store(self.file.file, self.file.name)
+                self.blob = blob
+                self.file.name = blob.file.name
+                self.file._committed = True
+                self.size = blob.size
+                self.sha256 = blob.sha256
+                self.mime_type = mime_type
+                replaced = not adding and previous_blob_id != blob.pk
+                if replaced:
+                    # Queued for extraction again, which counts the pages of the
+                    # new content: the text describes the old bytes.
+                    self.status = self.Status.PENDING
+                    self.extraction_error = ""
+                    self.page_count = None
+
+                super().save(*args, **kwargs)
+
+                if replaced:
+                    DocumentFileText.objects.filter(file=self).delete()
+                if previous_blob_id is not None:
+                    FileBlob.release(previous_blob_id)
+        except Exception:
+            if blob is not None:
+                # Bytes this save wrote for a new content are nobody's now.
+                transaction.on_commit(
+                    partial(FileBlob.delete_unused_bytes, blob.sha256, blob.file.name)
+                )
+            raise
+
     def __str__(self):
         return self.document.title
 
 
+class UploadSession(models.Model):
+    """A resumable, chunked upload that becomes a DocumentFile once complete.
+
+    Chunks are appended in order to a part file on the media storage; the
+    session expires ``DOCUMENT_UPLOAD_SESSION_TTL`` seconds after its last
+    chunk and is then removed by ``manage.py purge_upload_sessions``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document = models.ForeignKey(
+        Document, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    chunk_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.size})"
+
+    @property
+    def part_path(self) -> Path:
+        """Absolute path of the file the chunks are appended to."""
+        storage = DocumentFile._meta.get_field("file").storage
+
+        return Path(storage.path(f"uploads/{self.pk}.part"))
+
+    @property
+    def is_complete(self) -> bool:
+        return self.received_bytes == self.size
+
+    def refresh_expiry(self) -> None:
+        self.expires_at = timezone.now() + timedelta(
+            seconds=settings.DOCUMENT_UPLOAD_SESSION_TTL
+        )
+
+    def discard_part(self) -> None:
+        self.part_path.unlink(missing_ok=True)
+
+
+class DocumentFileText(models.Model):
+    """Text extracted from one page of a DocumentFile."""
+
+    file = models.ForeignKey(
+        DocumentFile, on_delete=models.CASCADE, related_name="pages"
+    )
+    page_number = models.PositiveIntegerField()
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["file", "page_number"], name="unique_file_page"
+            )
+        ]
+        ordering = ["file", "page_number"]
+
+    def __str__(self):
+        return f"{self.file} - page {self.page_number}"
+
+
 class DocumentTag(models.Model):
     """Through model for Document and Tag ManyToMany relationship."""
 
@@ -102,12 +482,37 @@ class DocumentTag(models.Model):
                 fields=["document", "tag"], name="unique_document_tag"
             )
         ]
+        indexes = [
+            # Documents by tag; the unique constraint serves tags by document.
+            models.Index(fields=["tag", "document"], name="documenttag_tag_doc_idx")
+        ]
         ordering = ["-added_at"]
 
     def __str__(self):
         return f"{self.document.title} - {self.tag.name}"
 
 
+class UserTagCount(models.Model):
+    """Number of a user's documents carrying a tag.
+
+    Denormalized from DocumentTag so tag facets are a single indexed read.
+    Kept up to date by ``document.tagcounts``; ``manage.py rebuild_tag_counts``
+    recomputes it from scratch.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tag_counts")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="user_counts")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "tag"], name="unique_user_tag")
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.tag.name}: {self.count}"
+
+
 class DocumentNote(models.Model):
     """Simple note model for user-generated content."""
 
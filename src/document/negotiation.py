@@ -0,0 +1,16 @@
+"""Content negotiation of the endpoints answering with file bytes.
+
+These return the file's own content type, not a representation picked by
+DRF's renderers: negotiating the Accept header against the JSON renderers
+would answer 406 to a client asking for the file's type, e.g.
+``Accept: application/pdf``. Their errors are rendered with the first renderer.
+"""
+
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class IgnoreAcceptNegotiation(DefaultContentNegotiation):
+    """Pick the first renderer whatever the client accepts."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
@@ -0,0 +1,41 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DocumentCursorPagination(CursorPagination):
+    """Keyset pagination for document listings.
+
+    Pages are addressed by an opaque cursor on ``updated_at`` instead of an
+    OFFSET, so fetching a deep page costs the same as fetching the first one.
+    ``id`` is used as a tie-breaker to keep the ordering deterministic when
+    several documents share the same ``updated_at``.
+
+    ``?ordering=`` picks another of ``orderings``, each served by an index on
+    (owner, <field>, id).
+    """
+
+    ordering = ("-updated_at", "-id")
+    orderings = {
+        "-updated_at": ("-updated_at", "-id"),
+        "updated_at": ("updated_at", "id"),
+        "-created_at": ("-created_at", "-id"),
+        "created_at": ("created_at", "id"),
+    }
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view) -> tuple[str, ...]:
+        # Validated by the view (see DocumentFilterSerializer).
+        return self.orderings.get(request.query_params.get("ordering"), self.ordering)
+
+
+class SearchPagination(PageNumberPagination):
+    """Page-number pagination for ranked search results.
+
+    Relevance ordering has no stable keyset to build a cursor from, and
+    clients rarely go beyond the first few pages of hits.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,188 @@
+"""Background extraction stage for uploaded files.
+
+A single dispatcher (the ``run_extraction_workers`` command) claims pending
+files from the database and fans the CPU-bound extraction out to a process
+pool. Workers only see file paths; all database writes happen back in the
+dispatcher, so request handling never waits for OCR. The same pool renders
+the default-size preview of each file, so the first listing after an upload
+finds it in the preview cache.
+"""
+
+import logging
+from concurrent.futures import Executor, as_completed
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from document import responsecache, similarity
+from document.extraction import extract_pages
+from document.previews import preview_key, render_previews
+from document.models import DocumentFile, DocumentFileText
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    done: int = 0
+    failed: int = 0
+    # Results dropped because the file changed while it was being extracted.
+    stale: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.done + self.failed + self.stale
+
+
+def claim_pending_files(limit: int) -> list[DocumentFile]:
+    """Move up to ``limit`` pending files to PROCESSING and return them.
+
+    Rows are locked with SKIP LOCKED where the database supports it, so
+    several dispatchers can share the queue on PostgreSQL. The files' documents
+    are loaded along, so the owners' cached responses can be invalidated at
+    each status change without a query.
+    """
+    with transaction.atomic():
+        files = list(
+            DocumentFile.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("document")
+            .filter(status=DocumentFile.Status.PENDING)
+            .order_by("uploaded_at")[:limit]
+        )
+        DocumentFile.objects.filter(pk__in=[file.pk for file in files]).update(
+            status=DocumentFile.Status.PROCESSING,
+            extraction_error="",
+            updated_at=timezone.now(),
+        )
+        responsecache.invalidate_users(file.document.owner_id for file in files)
+
+    return files
+
+
+def requeue_processing_files() -> int:
+    """Return files left in PROCESSING by an interrupted dispatcher to the queue."""
+    requeued = DocumentFile.objects.filter(
+        status=DocumentFile.Status.PROCESSING
+    ).update(status=DocumentFile.Status.PENDING, updated_at=timezone.now())
+    if requeued:
+        responsecache.invalidate_all()
+
+    return requeued
+
+
+def claimed(document_file: DocumentFile) -> QuerySet[DocumentFile]:
+    """The file's row, if it still holds the content claimed for extraction.
+
+    A replacement while the extraction ran requeues the file with another
+    digest, so the results of the old content match nothing.
+    """
+    return DocumentFile.objects.filter(
+        pk=document_file.pk,
+        status=DocumentFile.Status.PROCESSING,
+        sha256=document_file.sha256,
+    )
+
+
+def save_pages(document_file: DocumentFile, pages: list[str]) -> bool:
+    """Store the extracted ``pages``; False if the file changed in between."""
+    with transaction.atomic():
+        if not claimed(document_file).update(
+            status=DocumentFile.Status.DONE,
+            page_count=len(pages),
+            updated_at=timezone.now(),
+        ):
+            return False
+
+        DocumentFileText.objects.filter(file=document_file).delete()
+        DocumentFileText.objects.bulk_create(
+            DocumentFileText(file=document_file, page_number=number, content=text)
+            for number, text in enumerate(pages, start=1)
+        )
+        responsecache.invalidate_user(document_file.document.owner_id)
+        similarity.index_on_commit([document_file.document_id])
+
+    return True
+
+
+def mark_failed(document_file: DocumentFile, error: str) -> bool:
+    """Record the extraction ``error``; False if the file changed in between."""
+    if not claimed(document_file).update(
+        status=DocumentFile.Status.FAILED,
+        extraction_error=error,
+        updated_at=timezone.now(),
+    ):
+        return False
+
+    responsecache.invalidate_user(document_file.document.owner_id)
+
+    return True
+
+
+def process_files(files: list[DocumentFile], executor: Executor) -> BatchResult:
+    """Extract the text of ``files`` on ``executor`` and store the results."""
+    result = BatchResult()
+    futures = {}
+    paths = []
+
+    for document_file in files:
+        try:
+            path = document_file.file.path
+        except (ValueError, NotImplementedError) as exc:
+            # No file attached, or a storage backend without local paths.
+            fail(document_file, exc, result)
+            continue
+
+        future = executor.submit(extract_pages, settings.DOCUMENT_TEXT_EXTRACTOR, path)
+        futures[future] = document_file
+        paths.append((document_file, path))
+
+    # Queued behind the extractions, so previews never delay the text.
+    preview_futures = {
+        executor.submit(
+            render_previews,
+            settings.DOCUMENT_PREVIEW_RENDERER,
+            str(settings.DOCUMENT_PREVIEW_CACHE_DIR),
+            settings.DOCUMENT_PREVIEW_CACHE_MAX_BYTES,
+            preview_key(document_file.sha256, str(document_file.pk)),
+            path,
+            [settings.DOCUMENT_PREVIEW_DEFAULT_SIZE],
+        ): document_file
+        for document_file, path in paths
+    }
+
+    for future in as_completed(futures):
+        document_file = futures[future]
+
+        try:
+            pages = future.result()
+        except Exception as exc:
+            fail(document_file, exc, result)
+        else:
+            if save_pages(document_file, pages):
+                result.done += 1
+            else:
+                result.stale += 1
+
+    for future in as_completed(preview_futures):
+        try:
+            future.result()
+        except Exception as exc:
+            # Not every file type has a preview; the text is what matters.
+            logger.info("No preview for file %s: %s", preview_futures[future].pk, exc)
+
+    return result
+
+
+def fail(document_file: DocumentFile, exc: Exception, result: BatchResult) -> None:
+    logger.warning("Extraction failed for file %s: %s", document_file.pk, exc)
+    if mark_failed(document_file, str(exc) or exc.__class__.__name__):
+        result.failed += 1
+    else:
+        result.stale += 1
+
+
+def run_batch(executor: Executor, batch_size: int) -> BatchResult:
+    return process_files(claim_pending_files(batch_size), executor)
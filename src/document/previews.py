@@ -0,0 +1,306 @@
+"""Sized preview images (thumbnails) of uploaded files.
+
+Like ``document.extraction``, this module stays free of model imports: the
+extraction workers pre-render previews right after upload, and the preview
+endpoint renders synchronously only on a cache miss. Renders are stored in a
+bounded on-disk LRU cache shared by every process on the host, keyed by the
+content they were rendered from: replacing a file's content, or deleting the
+file, needs no invalidation, and a render of the old content finishing late
+is never served for the new one. Renders nothing uses anymore age out.
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+import time
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from document.extraction import IMAGE_EXTENSIONS
+
+PREVIEW_CONTENT_TYPE = "image/jpeg"
+PREVIEW_EXTENSION = ".jpg"
+JPEG_QUALITY = 80
+
+
+class PreviewError(Exception):
+    """Raised when a preview cannot be rendered for a file."""
+
+
+class BasePreviewRenderer:
+    """Interface for preview renderers.
+
+    Subclasses must be importable by dotted path and constructible without
+    arguments, since they are instantiated inside the worker processes.
+    """
+
+    def render(self, path: str, size: int) -> bytes:
+        """Render the file at ``path`` as a JPEG fitting a ``size`` square.
+
+        Args:
+            path (str): Absolute path of the file on local storage.
+            size (int): Maximum width and height of the preview, in pixels.
+
+        Returns:
+            bytes: The encoded JPEG image.
+        """
+        raise NotImplementedError
+
+
+class FakePreviewRenderer(BasePreviewRenderer):
+    """Return the first bytes of the file tagged with the requested size.
+
+    Meant for tests and local development, where decoding real images and
+    PDFs would be slow and require system packages.
+    """
+
+    def render(self, path: str, size: int) -> bytes:
+        with open(path, "rb") as file:
+            return f"{size}:".encode() + file.read(64)
+
+
+class PillowRenderer(BasePreviewRenderer):
+    """Downscale images with Pillow.
+
+    Pillow is imported on first use, so only processes that actually render
+    need it installed.
+    """
+
+    def render(self, path: str, size: int) -> bytes:
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            raise PreviewError("Pillow is not installed.")
+
+        try:
+            with Image.open(path) as image:
+                # Let the JPEG decoder scale down while decoding.
+                image.draft("RGB", (size, size))
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((size, size))
+
+                if image.mode != "RGB":
+                    # Flatten transparency onto white instead of black.
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, "white")
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+
+                output = io.BytesIO()
+                image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        except (OSError, Image.DecompressionBombError) as exc:
+            raise PreviewError(f"Cannot read image: {exc}")
+
+        return output.getvalue()
+
+
+class PdftoppmRenderer(BasePreviewRenderer):
+    """Render the first page of a PDF with poppler's ``pdftoppm``."""
+
+    timeout = 60
+
+    def render(self, path: str, size: int) -> bytes:
+        command = [
+            "pdftoppm",
+            "-f",
+            "1",
+            "-l",
+            "1",
+            "-singlefile",
+            "-scale-to",
+            str(size),
+            "-jpeg",
+            "-jpegopt",
+            f"quality={JPEG_QUALITY}",
+            path,
+        ]
+
+        try:
+            # Without an output root, the page is written to stdout.
+            result = subprocess.run(
+                command, capture_output=True, check=True, timeout=self.timeout
+            )
+        except FileNotFoundError:
+            raise PreviewError("pdftoppm is not installed.")
+        except subprocess.CalledProcessError as exc:
+            stderr = exc.stderr.decode("utf-8", errors="replace").strip()
+            raise PreviewError(f"pdftoppm failed: {stderr}")
+        except subprocess.TimeoutExpired:
+            raise PreviewError("pdftoppm timed out.")
+
+        return result.stdout
+
+
+class DefaultPreviewRenderer(BasePreviewRenderer):
+    """Pick a renderer from the file extension."""
+
+    renderers: dict[str, type[BasePreviewRenderer]] = {
+        ".pdf": PdftoppmRenderer,
+        **{extension: PillowRenderer for extension in IMAGE_EXTENSIONS},
+    }
+
+    def render(self, path: str, size: int) -> bytes:
+        extension = Path(path).suffix.lower()
+
+        try:
+            renderer = self.renderers[extension]()
+        except KeyError:
+            raise PreviewError(f"No preview for file type: {extension or 'unknown'}")
+
+        return renderer.render(path, size)
+
+
+class PreviewCache:
+    """Bounded LRU cache of rendered previews on local disk.
+
+    Entries are plain files named after the content key and preview size, so hits
+    are served straight from disk and the cache is shared by every process on
+    the host. Recency is the entry's mtime, refreshed on every hit.
+
+    Each instance keeps an estimate of the cache size, recounted from disk at
+    most every ``rescan_interval`` seconds, so writes don't walk the whole
+    directory. Once the estimate exceeds ``max_bytes``, the least recently used
+    entries are evicted down to ``low_water`` of the budget.
+    """
+
+    low_water = 0.9
+    rescan_interval = 60.0
+
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.usage: int | None = None
+        self.scanned_at = 0.0
+
+    def path(self, key: str, size: int) -> Path:
+        return self.directory / key[:2] / f"{key}-{size}{PREVIEW_EXTENSION}"
+
+    def open(self, key: str, size: int) -> BinaryIO | None:
+        """Return the cached preview opened for reading, or None on a miss."""
+        path = self.path(key, size)
+
+        try:
+            # An open file stays readable even if another process evicts it.
+            file = path.open("rb")
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return file
+
+    def put(self, key: str, size: int, data: bytes) -> Path:
+        path = self.path(key, size)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write next to the final name and rename, so readers never see a
+        # partial image.
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, suffix=".tmp", delete=False
+        ) as temporary:
+            temporary.write(data)
+        os.replace(temporary.name, path)
+
+        stale = time.monotonic() - self.scanned_at > self.rescan_interval
+        if self.usage is None or stale:
+            self.trim()
+        else:
+            self.usage += len(data)
+            if self.usage > self.max_bytes:
+                self.trim()
+
+        return path
+
+    def trim(self) -> int:
+        """Recount the cache and evict LRU entries if over budget.
+
+        Returns:
+            int: Number of entries evicted.
+        """
+        entries = []
+        for path in self.directory.glob(f"*/*{PREVIEW_EXTENSION}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        self.usage = sum(size for _, size, _ in entries)
+        self.scanned_at = time.monotonic()
+        if self.usage <= self.max_bytes:
+            return 0
+
+        target = self.max_bytes * self.low_water
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if self.usage <= target:
+                break
+
+            path.unlink(missing_ok=True)
+            self.usage -= size
+            evicted += 1
+
+        return evicted
+
+
+def preview_key(sha256: str, file_id: str) -> str:
+    """Cache key of the previews of a file's content.
+
+    The content digest, shared by every file holding the same bytes. Files
+    stored before digests were recorded fall back to their id: they get a
+    digest as soon as their content is replaced.
+    """
+    return sha256 or file_id
+
+
+@lru_cache
+def cache_for(directory: str, max_bytes: int) -> PreviewCache:
+    return PreviewCache(directory, max_bytes)
+
+
+def get_preview_cache() -> PreviewCache:
+    """The process-wide cache configured by ``DOCUMENT_PREVIEW_CACHE_*``."""
+    return cache_for(
+        str(settings.DOCUMENT_PREVIEW_CACHE_DIR),
+        settings.DOCUMENT_PREVIEW_CACHE_MAX_BYTES,
+    )
+
+
+def open_preview(
+    cache: PreviewCache, renderer_path: str, key: str, file_path: str, size: int
+) -> BinaryIO:
+    """Return the preview of ``key`` at ``size``, rendering it on a miss."""
+    preview = cache.open(key, size)
+    if preview is not None:
+        return preview
+
+    renderer: BasePreviewRenderer = import_string(renderer_path)()
+    data = renderer.render(file_path, size)
+    cache.put(key, size, data)
+
+    # Fall back to the rendered bytes if the entry was evicted right away.
+    return cache.open(key, size) or io.BytesIO(data)
+
+
+def render_previews(
+    renderer_path: str,
+    cache_directory: str,
+    cache_max_bytes: int,
+    key: str,
+    file_path: str,
+    sizes: Iterable[int],
+) -> None:
+    """Entry point executed in the worker processes."""
+    cache = cache_for(cache_directory, cache_max_bytes)
+
+    for size in sizes:
+        open_preview(cache, renderer_path, key, file_path, size).close()
@@ -0,0 +1,183 @@
+"""Per-user cache of document list and detail responses.
+
+Responses are stored under their request path, in a namespace made of two
+generation counters: the user's, bumped whenever one of their documents, files,
+tag links or notes changes, and a global one, bumped when a tag changes (detail
+responses embed tag names) and by maintenance commands that rewrite many rows.
+Invalidating is then a single increment, whatever the number of cached pages:
+entries of an older generation are never read again and expire on their own.
+
+Counters start from the current time in nanoseconds rather than from zero, so
+a counter evicted from the cache and created again cannot come back to a value
+old entries were stored under.
+
+Writers bump twice: right away, so the rest of their transaction reads fresh
+data, and again once the transaction commits, so nothing another request
+cached from the pre-commit state in between survives.
+
+Misses are built from the primary even for requests routed to the read
+replica: a response read from a lagging replica would be cached under the
+current generation and outlive the lag.
+"""
+
+import hashlib
+import time
+from collections.abc import Iterable
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from config.database import read_from_primary
+
+GLOBAL_GENERATION_KEY = "document:response-cache:generation"
+USER_GENERATION_KEY = "document:response-cache:generation:{user_id}"
+RESPONSE_KEY = "document:response-cache:{user_id}:{generations}:{digest}"
+HITS_KEY = "document:response-cache:hits"
+MISSES_KEY = "document:response-cache:misses"
+
+CACHE_HEADER = "X-Cache"
+
+
+def user_generation_key(user_id: int) -> str:
+    return USER_GENERATION_KEY.format(user_id=user_id)
+
+
+def get_generations(user_id: int) -> tuple[int, int]:
+    """The user's generation and the global one, creating missing counters."""
+    keys = [user_generation_key(user_id), GLOBAL_GENERATION_KEY]
+    values = cache.get_many(keys)
+
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        # Another process may have created them first.
+        values.update(cache.get_many(missing))
+
+    return values[keys[0]], values[keys[1]]
+
+
+async def aget_generations(user_id: int) -> tuple[int, int]:
+    keys = [user_generation_key(user_id), GLOBAL_GENERATION_KEY]
+    values = await cache.aget_many(keys)
+
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+        values.update(await cache.aget_many(missing))
+
+    return values[keys[0]], values[keys[1]]
+
+
+def bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted: any fresh start is past the values old entries used.
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate(key: str) -> None:
+    bump(key)
+    transaction.on_commit(partial(bump, key))
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop every cached response of the user."""
+    invalidate(user_generation_key(user_id))
+
+
+def invalidate_users(user_ids: Iterable[int]) -> None:
+    for user_id in set(user_ids):
+        invalidate_user(user_id)
+
+
+def invalidate_all() -> None:
+    """Drop every cached response of every user."""
+    invalidate(GLOBAL_GENERATION_KEY)
+
+
+def response_key(user_id: int, path: str) -> str:
+    return format_response_key(user_id, get_generations(user_id), path)
+
+
+async def aresponse_key(user_id: int, path: str) -> str:
+    return format_response_key(user_id, await aget_generations(user_id), path)
+
+
+def format_response_key(user_id: int, generations: tuple[int, int], path: str) -> str:
+    digest = hashlib.md5(path.encode(), usedforsecurity=False).hexdigest()
+
+    return RESPONSE_KEY.format(
+        user_id=user_id, generations="{}:{}".format(*generations), digest=digest
+    )
+
+
+def count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def acount(key: str) -> None:
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_stats() -> dict:
+    """Hits and misses of all processes sharing the cache."""
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else None,
+    }
+
+
+class CachedResponseMixin:
+    """Serve ``list`` and ``retrieve`` from the response cache.
+
+    Only successful responses are stored, as their serialized data rather
+    than rendered bytes, so any renderer can answer a hit. Every response
+    carries an ``X-Cache: HIT`` or ``MISS`` header.
+    """
+
+    def list(self, request: Request, *args, **kwargs) -> HttpResponse:
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> HttpResponse:
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, view, request: Request, *args, **kwargs) -> HttpResponse:
+        key = response_key(request.user.pk, request.get_full_path())
+
+        data = cache.get(key)
+        if data is not None:
+            count(HITS_KEY)
+            response = Response(data)
+            response[CACHE_HEADER] = "HIT"
+            return response
+
+        count(MISSES_KEY)
+        with read_from_primary():
+            response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.DOCUMENT_RESPONSE_CACHE_TIMEOUT)
+        response[CACHE_HEADER] = "MISS"
+
+        return response
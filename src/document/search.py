@@ -0,0 +1,261 @@
+"""Full-text search over documents and their notes.
+
+The inverted index lives in a table that is not managed by the ORM because its
+shape depends on the database: an FTS5 virtual table on SQLite and a
+GIN-indexed ``tsvector`` table on PostgreSQL, created by migration 0003. Both
+are keyed by document id and kept in sync by the receivers in
+``document.signals``.
+"""
+
+import re
+from collections import defaultdict
+from collections.abc import Iterable
+
+from django.db import connection
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Model
+from django.db.models.query import QuerySet
+
+SEARCH_TABLE = "document_search"
+
+# Only word characters reach the database, so user input can never be
+# interpreted as FTS5 / tsquery syntax.
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+MAX_QUERY_TOKENS = 16
+
+
+def tokenize_query(query: str) -> list[str]:
+    """Split a free-text query into at most ``MAX_QUERY_TOKENS`` lowercase terms."""
+    return [token.lower() for token in TOKEN_PATTERN.findall(query)][:MAX_QUERY_TOKENS]
+
+
+class SearchBackend:
+    """Database-specific operations on the search index."""
+
+    def upsert(self, cursor, rows: list[tuple[int, int, str, str, str]]) -> None:
+        """Insert or replace ``(document_id, owner_id, title, description, notes)``."""
+        raise NotImplementedError
+
+    def delete(self, cursor, document_ids: list[int]) -> None:
+        placeholders = ", ".join(["%s"] * len(document_ids))
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE {self.id_column} IN ({placeholders})",
+            document_ids,
+        )
+
+    def search(
+        self, cursor, owner_id: int, tokens: list[str], limit: int, offset: int
+    ) -> list[tuple[int, float]]:
+        """Return ``(document_id, rank)`` pairs, best match first."""
+        raise NotImplementedError
+
+    def count(self, cursor, owner_id: int, tokens: list[str]) -> int:
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 index.
+
+    The owner is stored as an indexed ``u<id>`` token so that scoping a query
+    to one user is resolved inside the inverted index instead of filtering
+    every user's matches afterwards.
+    """
+
+    id_column = "rowid"
+    # bm25 weights for (owner, title, description, notes).
+    rank_expression = f"bm25({SEARCH_TABLE}, 0.0, 10.0, 4.0, 1.0)"
+
+    def upsert(self, cursor, rows) -> None:
+        self.delete(cursor, [row[0] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, owner, title, description, notes) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [
+                (document_id, f"u{owner_id}", title, description, notes)
+                for document_id, owner_id, title, description, notes in rows
+            ],
+        )
+
+    def match_expression(self, owner_id: int, tokens: list[str]) -> str:
+        terms = " AND ".join(f'"{token}"*' for token in tokens)
+
+        return f'owner : "u{owner_id}" AND {{title description notes}} : ({terms})'
+
+    def search(self, cursor, owner_id, tokens, limit, offset):
+        cursor.execute(
+            f"SELECT rowid, {self.rank_expression} AS rank FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank, rowid DESC "
+            "LIMIT %s OFFSET %s",
+            [self.match_expression(owner_id, tokens), limit, offset],
+        )
+
+        # bm25() is "lower is better"; expose "higher is better" like Postgres.
+        return [(document_id, -rank) for document_id, rank in cursor.fetchall()]
+
+    def count(self, cursor, owner_id, tokens):
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [self.match_expression(owner_id, tokens)],
+        )
+
+        return cursor.fetchone()[0]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted ``tsvector`` index with a GIN index for matching."""
+
+    id_column = "document_id"
+    config = "simple"
+
+    def upsert(self, cursor, rows) -> None:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (document_id, owner_id, vector) VALUES ("
+            "%s, %s, "
+            f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'C')) "
+            "ON CONFLICT (document_id) DO UPDATE "
+            "SET owner_id = EXCLUDED.owner_id, vector = EXCLUDED.vector",
+            rows,
+        )
+
+    def tsquery(self, tokens: list[str]) -> str:
+        return " & ".join(f"{token}:*" for token in tokens)
+
+    def search(self, cursor, owner_id, tokens, limit, offset):
+        cursor.execute(
+            "SELECT document_id, ts_rank(vector, query) AS rank "
+            f"FROM {SEARCH_TABLE}, to_tsquery('{self.config}', %s) AS query "
+            "WHERE owner_id = %s AND vector @@ query "
+            "ORDER BY rank DESC, document_id DESC LIMIT %s OFFSET %s",
+            [self.tsquery(tokens), owner_id, limit, offset],
+        )
+
+        return cursor.fetchall()
+
+    def count(self, cursor, owner_id, tokens):
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {SEARCH_TABLE} "
+            f"WHERE owner_id = %s AND vector @@ to_tsquery('{self.config}', %s)",
+            [owner_id, self.tsquery(tokens)],
+        )
+
+        return cursor.fetchone()[0]
+
+
+BACKENDS: dict[str, type[SearchBackend]] = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend(db_connection: BaseDatabaseWrapper = connection) -> SearchBackend:
+    try:
+        return BACKENDS[db_connection.vendor]()
+    except KeyError:
+        raise NotImplementedError(
+            f"Full-text search is not supported on {db_connection.vendor}."
+        )
+
+
+def index_documents(document_ids: Iterable[int]) -> None:
+    """(Re)build the index entries of the given documents from the database."""
+    from document.models import Document, DocumentNote
+
+    index_rows(Document, DocumentNote, list(document_ids))
+
+
+def index_rows(
+    document_model: type[Model],
+    note_model: type[Model],
+    document_ids: list[int],
+    db_connection: BaseDatabaseWrapper = connection,
+) -> None:
+    """Index ``document_ids`` reading from the given (possibly historical) models.
+
+    Documents that no longer exist are removed from the index.
+    """
+    if not document_ids:
+        return
+
+    notes: dict[int, list[str]] = defaultdict(list)
+    for document_id, content in (
+        note_model.objects.filter(document_id__in=document_ids)
+        .order_by("pk")
+        .values_list("document_id", "content")
+    ):
+        notes[document_id].append(content)
+
+    rows = [
+        (pk, owner_id, title, description or "", "\n".join(notes[pk]))
+        for pk, owner_id, title, description in document_model.objects.filter(
+            pk__in=document_ids
+        ).values_list("pk", "owner_id", "title", "description")
+    ]
+
+    backend = get_backend(db_connection)
+    with db_connection.cursor() as cursor:
+        if rows:
+            backend.upsert(cursor, rows)
+
+        missing = set(document_ids) - {row[0] for row in rows}
+        if missing:
+            backend.delete(cursor, list(missing))
+
+
+def remove_documents(document_ids: Iterable[int]) -> None:
+    document_ids = list(document_ids)
+    if not document_ids:
+        return
+
+    with connection.cursor() as cursor:
+        get_backend().delete(cursor, document_ids)
+
+
+class SearchResults:
+    """Lazy, sliceable view over ranked search hits.
+
+    Implements the ``count()`` / slicing protocol expected by Django's
+    ``Paginator``, so only the requested page is fetched from the index and
+    only those documents are loaded from ``queryset``.
+    """
+
+    def __init__(self, queryset: QuerySet, owner_id: int, query: str):
+        self.queryset = queryset
+        self.owner_id = owner_id
+        self.tokens = tokenize_query(query)
+        self.backend = get_backend()
+
+    def count(self) -> int:
+        if not self.tokens:
+            return 0
+
+        with connection.cursor() as cursor:
+            return self.backend.count(cursor, self.owner_id, self.tokens)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice) -> list:
+        if not isinstance(key, slice):
+            raise TypeError("SearchResults only supports slicing.")
+
+        offset = key.start or 0
+        limit = (key.stop - offset) if key.stop is not None else self.count()
+        if not self.tokens or limit <= 0:
+            return []
+
+        with connection.cursor() as cursor:
+            hits = self.backend.search(
+                cursor, self.owner_id, self.tokens, limit, offset
+            )
+
+        documents = self.queryset.in_bulk([document_id for document_id, _ in hits])
+        results = []
+        for document_id, rank in hits:
+            if document_id in documents:
+                document = documents[document_id]
+                document.rank = rank
+                results.append(document)
+
+        return results
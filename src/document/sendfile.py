@@ -0,0 +1,284 @@
+"""Serve DocumentFile bytes once the caller has checked ownership.
+
+Django only decides *whether* a file may be sent and with which headers. The
+transfer itself is delegated to the front web server when
+``DOCUMENT_SENDFILE_BACKEND`` is configured (nginx ``X-Accel-Redirect`` or
+Apache/lighttpd ``X-Sendfile``). Otherwise a ``FileResponse`` is returned,
+which WSGI servers such as gunicorn hand to ``sendfile(2)``, so the bytes are
+not copied through the Python worker either. ``aserve_file()`` is the same for
+async views, streaming the file from an async iterator.
+"""
+
+import mimetypes
+import re
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import BinaryIO
+
+import aiofiles
+import aiofiles.os
+from django.conf import settings
+from django.http import FileResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.utils.text import slugify
+
+from document.models import DocumentFile
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+X_ACCEL_REDIRECT = "x-accel-redirect"
+X_SENDFILE = "x-sendfile"
+
+# Bytes read per step by the async transfer.
+CHUNK_SIZE = 64 * 1024
+
+
+class FileRange:
+    """File-like view over ``length`` bytes of ``file`` starting at ``start``.
+
+    ``fileno()`` is exposed with the descriptor positioned at ``start``, so a
+    WSGI server can still ``sendfile()`` the range using Content-Length.
+    """
+
+    def __init__(self, file: BinaryIO, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def file_etag(document_file: DocumentFile) -> str:
+    """Strong validator: the content digest when known."""
+    if document_file.blob_id is not None:
+        return quote_etag(document_file.blob.sha256)
+
+    return quote_etag(f"{document_file.pk}-{document_file.updated_at.timestamp()}")
+
+
+def file_last_modified(document_file: DocumentFile) -> int:
+    """``Last-Modified`` of the content, as a timestamp.
+
+    ``updated_at`` rather than ``uploaded_at``: a PUT replaces the content of
+    an existing file. Other writes bump it too, which only costs a client a
+    full response where a 304 or a range would have done.
+    """
+    return int(document_file.updated_at.timestamp())
+
+
+def download_filename(document_file: DocumentFile) -> str:
+    extension = Path(document_file.file.name).suffix.lower()
+
+    return f"{slugify(document_file.document.title) or 'document'}{extension}"
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Return ``(start, length)`` for a single-range ``Range`` header.
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges), in which case the whole file is served. Raises ValueError when
+    the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+
+    first, last = match[1], match[2]
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes.
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError("Empty suffix range.")
+        return size - length, length
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable.")
+
+    return start, end - start + 1
+
+
+def range_applies(request: HttpRequest, etag: str, last_modified: int) -> bool:
+    """Honour ``If-Range``: only serve a range of the representation asked for."""
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+
+    if if_range.startswith(('"', 'W/"')):
+        return if_range == etag
+
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_file(request: HttpRequest, document_file: DocumentFile) -> HttpResponse:
+    """Build the download response for ``document_file``.
+
+    Handles ``If-None-Match`` / ``If-Modified-Since`` (304), ``Range`` and
+    ``If-Range`` (206 / 416), and offloads the transfer when configured.
+    """
+    etag = file_etag(document_file)
+    last_modified = file_last_modified(document_file)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    response = offload_file(document_file)
+    if response is None:
+        response = stream_file(request, document_file, etag, last_modified)
+        if response.status_code == 416:
+            return response
+
+    return add_file_headers(response, document_file, etag, last_modified)
+
+
+async def aserve_file(
+    request: HttpRequest, document_file: DocumentFile
+) -> HttpResponse:
+    """Async ``serve_file()``: the bytes are read with aiofiles as they are sent.
+
+    Under an ASGI server, a slow client then holds a suspended task instead
+    of a worker thread for the whole transfer.
+    """
+    etag = file_etag(document_file)
+    last_modified = file_last_modified(document_file)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    response = offload_file(document_file)
+    if response is None:
+        response = await astream_file(request, document_file, etag, last_modified)
+        if response.status_code == 416:
+            return response
+
+    return add_file_headers(response, document_file, etag, last_modified)
+
+
+def offload_file(document_file: DocumentFile) -> HttpResponse | None:
+    """The response handing the transfer to the web server, if one is configured."""
+    backend = settings.DOCUMENT_SENDFILE_BACKEND
+    if backend == X_ACCEL_REDIRECT:
+        # nginx serves the internal location, including Range requests.
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = (
+            f"{settings.DOCUMENT_SENDFILE_URL_PREFIX}{document_file.file.name}"
+        )
+        return response
+
+    if backend == X_SENDFILE:
+        response = HttpResponse()
+        response["X-Sendfile"] = document_file.file.path
+        return response
+
+    return None
+
+
+def add_file_headers(
+    response: HttpResponse, document_file: DocumentFile, etag: str, last_modified: int
+) -> HttpResponse:
+    content_type, _ = mimetypes.guess_type(document_file.file.name)
+    response["Content-Type"] = content_type or "application/octet-stream"
+    response["Content-Disposition"] = (
+        f'attachment; filename="{download_filename(document_file)}"'
+    )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+
+    return response
+
+
+def range_not_satisfiable(size: int) -> HttpResponse:
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+
+    return response
+
+
+def stream_file(
+    request: HttpRequest, document_file: DocumentFile, etag: str, last_modified: int
+) -> HttpResponse:
+    file = document_file.file.open("rb")
+    size = document_file.file.size
+
+    range_header = request.headers.get("Range")
+    if not range_header or not range_applies(request, etag, last_modified):
+        return FileResponse(file)
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        file.close()
+        return range_not_satisfiable(size)
+
+    if byte_range is None:
+        return FileResponse(file)
+
+    start, length = byte_range
+    response = FileResponse(FileRange(file, start, length), status=206)
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+
+    return response
+
+
+async def astream_file(
+    request: HttpRequest, document_file: DocumentFile, etag: str, last_modified: int
+) -> HttpResponse:
+    path = document_file.file.path
+    size = await aiofiles.os.path.getsize(path)
+    byte_range = None
+
+    range_header = request.headers.get("Range")
+    if range_header and range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return range_not_satisfiable(size)
+
+    if byte_range is None:
+        response = StreamingHttpResponse(read_chunks(path, 0, size))
+        response["Content-Length"] = str(size)
+        return response
+
+    start, length = byte_range
+    response = StreamingHttpResponse(read_chunks(path, start, length), status=206)
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+
+    return response
+
+
+async def read_chunks(
+    path: str, start: int, length: int, chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as file:
+        await file.seek(start)
+        while length > 0:
+            data = await file.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
@@ -1,6 +1,18 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from document.models import Document, DocumentFile, Tag, DocumentNote
+from document.fieldsets import SparseFieldsetMixin
+from document.models import (
+    Document,
+    DocumentFile,
+    DocumentNote,
+    DocumentQuerySet,
+    Tag,
+    UploadSession,
+)
+from document.pagination import DocumentCursorPagination
+
+MAX_BULK_TAG_DOCUMENTS = 10_000
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -10,11 +22,133 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
+class TagAutocompleteQuerySerializer(serializers.Serializer):
+    prefix = serializers.CharField(max_length=250)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
 class DocumentFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = DocumentFile
-        fields = ["id", "file", "uploaded_at", "uploaded_by"]
-        read_only_fields = ["id", "uploaded_at", "uploaded_by"]
+        fields = [
+            "id",
+            "file",
+            "status",
+            "size",
+            "mime_type",
+            "page_count",
+            "sha256",
+            "uploaded_at",
+            "uploaded_by",
+        ]
+        read_only_fields = [
+            "id",
+            "status",
+            "size",
+            "mime_type",
+            "page_count",
+            "sha256",
+            "uploaded_at",
+            "uploaded_by",
+        ]
+
+
+class DocumentFileFilterSerializer(serializers.Serializer):
+    # An exact type, or a family such as "image/*".
+    mime_type = serializers.CharField(max_length=100, required=False)
+    min_size = serializers.IntegerField(min_value=0, required=False)
+    max_size = serializers.IntegerField(min_value=0, required=False)
+    min_pages = serializers.IntegerField(min_value=0, required=False)
+    max_pages = serializers.IntegerField(min_value=0, required=False)
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", required=False)
+
+    def get_filters(self) -> dict:
+        """Queryset filter arguments for the validated parameters."""
+        data = self.validated_data
+        lookups = {
+            "min_size": "size__gte",
+            "max_size": "size__lte",
+            "min_pages": "page_count__gte",
+            "max_pages": "page_count__lte",
+        }
+        filters = {
+            lookup: data[name] for name, lookup in lookups.items() if name in data
+        }
+
+        if "sha256" in data:
+            filters["sha256"] = data["sha256"].lower()
+
+        mime_type = data.get("mime_type")
+        if mime_type and mime_type.endswith("/*"):
+            filters["mime_type__startswith"] = mime_type[:-1]
+        elif mime_type:
+            filters["mime_type"] = mime_type
+
+        return filters
+
+
+class DocumentFilterSerializer(serializers.Serializer):
+    # Comma-separated tag ids, matched with "any" or "all" of them.
+    tags = serializers.RegexField(r"^\d+(,\d+)*$", required=False)
+    tag_match = serializers.ChoiceField(choices=["any", "all"], default="any")
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    updated_after = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+    # Case-insensitive.
+    title_prefix = serializers.CharField(max_length=500, required=False)
+    has_files = serializers.BooleanField(required=False)
+    has_notes = serializers.BooleanField(required=False)
+    ordering = serializers.ChoiceField(
+        choices=list(DocumentCursorPagination.orderings), required=False
+    )
+
+    def filter_queryset(self, queryset: DocumentQuerySet) -> DocumentQuerySet:
+        """Narrow ``queryset`` to the validated parameters."""
+        data = self.validated_data
+        lookups = {
+            "created_after": "created_at__gte",
+            "created_before": "created_at__lt",
+            "updated_after": "updated_at__gte",
+            "updated_before": "updated_at__lt",
+        }
+        queryset = queryset.filter(
+            **{lookup: data[name] for name, lookup in lookups.items() if name in data}
+        )
+
+        if "tags" in data:
+            tag_ids = [int(tag_id) for tag_id in data["tags"].split(",")]
+            queryset = queryset.tagged(tag_ids, match_all=data["tag_match"] == "all")
+        if data.get("title_prefix"):
+            queryset = queryset.title_prefix(data["title_prefix"])
+
+        return queryset.having(files=data.get("has_files"), notes=data.get("has_notes"))
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = [
+            "id",
+            "filename",
+            "size",
+            "received_bytes",
+            "chunk_count",
+            "created_at",
+            "expires_at",
+        ]
+        read_only_fields = [
+            "id",
+            "received_bytes",
+            "chunk_count",
+            "created_at",
+            "expires_at",
+        ]
+        extra_kwargs = {"size": {"min_value": 1}}
+
+
+class UploadCompleteSerializer(serializers.Serializer):
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", required=False)
 
 
 class DocumentNoteSerializer(serializers.ModelSerializer):
@@ -24,11 +158,21 @@ class DocumentNoteSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_by", "created_at", "updated_at"]
 
 
-class DocumentSerializer(serializers.ModelSerializer):
+# The nested relations of documents, which ?expand= adds to compact outputs.
+DOCUMENT_RELATIONS = {
+    "tags": lambda: TagSerializer(many=True, read_only=True),
+    "files": lambda: DocumentFileSerializer(many=True, read_only=True),
+    "notes": lambda: DocumentNoteSerializer(many=True, read_only=True),
+}
+
+
+class DocumentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     files = DocumentFileSerializer(many=True, read_only=True)
     notes = DocumentNoteSerializer(many=True, read_only=True)
 
+    expandable_fields = DOCUMENT_RELATIONS
+
     class Meta:
         model = Document
         fields = [
@@ -43,3 +187,101 @@ class DocumentSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["id", "owner", "created_at", "updated_at"]
+
+
+class DocumentListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact representation used when listing documents.
+
+    Nested relations are replaced by ids and counts so a page of documents can
+    be rendered from a single annotated query plus one prefetch for tags.
+    """
+
+    tag_ids = serializers.PrimaryKeyRelatedField(
+        source="tags", many=True, read_only=True
+    )
+    file_count = serializers.IntegerField(read_only=True)
+    note_count = serializers.IntegerField(read_only=True)
+
+    expandable_fields = DOCUMENT_RELATIONS
+
+    class Meta:
+        model = Document
+        fields = [
+            "id",
+            "title",
+            "description",
+            "owner",
+            "tag_ids",
+            "file_count",
+            "note_count",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class DocumentSearchResultSerializer(DocumentListSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(DocumentListSerializer.Meta):
+        fields = [*DocumentListSerializer.Meta.fields, "rank"]
+        read_only_fields = fields
+
+
+class DocumentSimilarResultSerializer(DocumentListSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(DocumentListSerializer.Meta):
+        fields = [*DocumentListSerializer.Meta.fields, "score"]
+        read_only_fields = fields
+
+
+class BulkTagSerializer(serializers.Serializer):
+    document_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_TAG_DOCUMENTS,
+    )
+    add = serializers.ListField(
+        child=serializers.CharField(max_length=250), default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.CharField(max_length=250), default=list
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        # Drop duplicates, keeping the order given by the client.
+        for key in ("document_ids", "add", "remove"):
+            attrs[key] = list(dict.fromkeys(attrs[key]))
+
+        if not attrs["add"] and not attrs["remove"]:
+            raise serializers.ValidationError("Give at least one tag to add or remove.")
+
+        if set(attrs["add"]) & set(attrs["remove"]):
+            raise serializers.ValidationError("A tag cannot be added and removed.")
+
+        return attrs
+
+
+class DocumentSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=500)
+
+
+class SimilarQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    # Not "format", which DRF reserves for choosing the renderer.
+    archive = serializers.ChoiceField(choices=["zip", "tar"], default="zip")
+
+
+class PreviewQuerySerializer(serializers.Serializer):
+    size = serializers.IntegerField(required=False)
+
+    def validate_size(self, value: int) -> int:
+        if value not in settings.DOCUMENT_PREVIEW_SIZES:
+            sizes = ", ".join(str(size) for size in settings.DOCUMENT_PREVIEW_SIZES)
+            raise serializers.ValidationError(f"Must be one of: {sizes}.")
+
+        return value
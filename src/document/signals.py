@@ -0,0 +1,166 @@
+from django.db import transaction
+from django.db.models import Model, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from document import responsecache, search, similarity, tagcounts
+from document.autocomplete import invalidate_tag_index
+from document.models import (
+    Document,
+    DocumentFile,
+    DocumentNote,
+    DocumentTag,
+    FileBlob,
+    Tag,
+    UploadSession,
+    User,
+)
+
+
+def is_cascade(origin: Model | QuerySet | None, model: type[Model]) -> bool:
+    """Whether a delete signal for ``model`` comes from deleting a parent object."""
+    if isinstance(origin, QuerySet):
+        return origin.model is not model
+
+    return origin is not None and not isinstance(origin, model)
+
+
+@receiver(post_save, sender=Document)
+def index_saved_document(sender, instance: Document, **kwargs):
+    search.index_documents([instance.pk])
+
+
+@receiver(post_delete, sender=Document)
+def unindex_deleted_document(sender, instance: Document, **kwargs):
+    search.remove_documents([instance.pk])
+
+
+@receiver(post_save, sender=Document)
+def embed_saved_document(sender, instance: Document, **kwargs):
+    similarity.index_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Document)
+def unembed_deleted_document(sender, instance: Document, **kwargs):
+    similarity.remove_on_commit(instance.owner_id, [instance.pk])
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalidate_document_responses(sender, instance: Document, **kwargs):
+    responsecache.invalidate_user(instance.owner_id)
+
+
+@receiver(pre_delete, sender=Document)
+def remember_document_owner(sender, instance: Document, **kwargs):
+    # Its links are deleted first; a batch flushed after the document is gone
+    # could not look the owner up any more.
+    tagcounts.remember_owner(instance.pk, instance.owner_id)
+
+
+@receiver(post_save, sender=DocumentTag)
+def count_added_tag(sender, instance: DocumentTag, created: bool, **kwargs):
+    if created:
+        tagcounts.record(
+            instance.document_id, instance.tag_id, 1, link_owner_id(instance)
+        )
+
+
+@receiver(post_delete, sender=DocumentTag)
+def count_removed_tag(sender, instance: DocumentTag, origin=None, **kwargs):
+    # The counters of a deleted tag or user are deleted along with it.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(origin_model, (Tag, User)):
+        return
+
+    if isinstance(origin, Document):
+        owner_id = origin.owner_id
+    else:
+        owner_id = link_owner_id(instance)
+
+    tagcounts.record(instance.document_id, instance.tag_id, -1, owner_id)
+
+
+def link_owner_id(link: DocumentTag) -> int | None:
+    """The owner of the link's document, if it is known without a query."""
+    if DocumentTag.document.is_cached(link):
+        return link.document.owner_id
+
+    return None
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_autocomplete(sender, instance: Tag, **kwargs):
+    transaction.on_commit(invalidate_tag_index)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_responses(sender, instance: Tag, **kwargs):
+    # Tags are shared, and detail responses embed their names.
+    responsecache.invalidate_all()
+
+
+@receiver(post_save, sender=DocumentFile)
+@receiver(post_save, sender=DocumentNote)
+def invalidate_child_responses(sender, instance: DocumentFile | DocumentNote, **kwargs):
+    responsecache.invalidate_user(child_owner_id(instance))
+
+
+@receiver(post_delete, sender=DocumentFile)
+@receiver(post_delete, sender=DocumentNote)
+def invalidate_deleted_child_responses(
+    sender, instance: DocumentFile | DocumentNote, origin=None, **kwargs
+):
+    # Deleting the document invalidates its owner's responses once.
+    if is_cascade(origin, sender):
+        return
+
+    responsecache.invalidate_user(child_owner_id(instance))
+
+
+def child_owner_id(instance: DocumentFile | DocumentNote) -> int:
+    """The owner of the file's or note's document."""
+    if type(instance).document.is_cached(instance):
+        return instance.document.owner_id
+
+    return (
+        Document.objects.filter(pk=instance.document_id)
+        .values_list("owner_id", flat=True)
+        .get()
+    )
+
+
+@receiver(post_save, sender=DocumentNote)
+def index_note_document(sender, instance: DocumentNote, **kwargs):
+    search.index_documents([instance.document_id])
+    similarity.index_on_commit([instance.document_id])
+
+
+@receiver(post_delete, sender=DocumentNote)
+def reindex_note_document(sender, instance: DocumentNote, origin=None, **kwargs):
+    # The document's own entry is dropped when the document itself goes away.
+    if is_cascade(origin, DocumentNote):
+        return
+
+    search.index_documents([instance.document_id])
+    similarity.index_on_commit([instance.document_id])
+
+
+@receiver(post_delete, sender=DocumentFile)
+def reembed_file_document(sender, instance: DocumentFile, origin=None, **kwargs):
+    # Without the text of the file.
+    if not is_cascade(origin, DocumentFile):
+        similarity.index_on_commit([instance.document_id])
+
+
+@receiver(post_delete, sender=DocumentFile)
+def release_file_blob(sender, instance: DocumentFile, **kwargs):
+    if instance.blob_id is not None:
+        FileBlob.release(instance.blob_id)
+
+
+@receiver(post_delete, sender=UploadSession)
+def discard_upload_part(sender, instance: UploadSession, **kwargs):
+    instance.discard_part()
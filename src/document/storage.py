@@ -0,0 +1,82 @@
+"""Content-addressed layout for uploaded file bytes.
+
+Every distinct content is written once, under a path derived from its SHA-256
+digest, and shared by all the DocumentFile rows that reference it through a
+FileBlob.
+"""
+
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+from django.core.files import File
+from django.core.files.storage import Storage
+
+
+def sha256_file(file: File) -> str:
+    """Return the hex SHA-256 digest of ``file``.
+
+    Uploads that went through ``document.uploadhandlers`` were already hashed
+    while streaming in; anything else is hashed chunk by chunk here.
+    """
+    digest = getattr(file, "sha256", None)
+    if digest:
+        return digest
+
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+
+    return hasher.hexdigest()
+
+
+def blob_path(digest: str, filename: str) -> str:
+    """Return the storage-relative path of the blob with ``digest``.
+
+    Format: blobs/<aa>/<bb>/<sha256><ext>
+    The two-level fan-out keeps directories small. The extension of the first
+    upload is kept so that tools relying on it (extractors, MIME guessing)
+    keep working.
+
+    Args:
+        digest (str): Hex SHA-256 digest of the content.
+        filename (str): Original filename, used for the extension only.
+
+    Returns:
+        str: The constructed file path.
+    """
+    ext: str = Path(filename).suffix.lower() or ""
+
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def write_blob(storage: Storage, name: str, file: File) -> None:
+    """Write ``file`` at exactly ``name`` unless that content is already stored.
+
+    On local storage the bytes go to a temporary name first and are renamed
+    into place, so ``name`` never holds a partial content; a concurrent writer
+    of the same content just replaces identical bytes. Elsewhere, if another
+    process stored the same content concurrently, the storage backend saves
+    ours under an alternative name, and that copy is simply discarded.
+    """
+    if storage.exists(name):
+        return
+
+    file.seek(0)
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        saved_name = storage.save(name, file)
+        if saved_name != name:
+            storage.delete(saved_name)
+        return
+
+    temp_name = storage.save(f"{name}.{uuid.uuid4().hex}.part", file)
+    try:
+        os.replace(storage.path(temp_name), path)
+    except OSError:
+        storage.delete(temp_name)
+        raise
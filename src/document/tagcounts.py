@@ -0,0 +1,181 @@
+"""Incremental maintenance of the UserTagCount table.
+
+Every DocumentTag insert or delete becomes a ``(document, tag, ±1)`` delta.
+Deltas are summed per ``(owner, tag)`` and written with one INSERT of the
+missing counters and one ``UPDATE ... SET count = count + CASE ...``, so the
+cost of a flush does not depend on the number of links involved.
+
+Outside of ``batch()``, each delta is flushed on its own. Bulk operations wrap
+their writes in ``batch()`` so a whole request is flushed once.
+"""
+
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Model, Q, Value, When
+
+from document import responsecache
+from document.autocomplete import invalidate_tag_usage
+from document.models import Document, UserTagCount
+
+_current_batch: ContextVar["TagCountBatch | None"] = ContextVar(
+    "tag_count_batch", default=None
+)
+
+
+class TagCountBatch:
+    """Deltas waiting to be written, keyed by document and tag."""
+
+    def __init__(self):
+        self.deltas: Counter[tuple[int, int]] = Counter()
+        self.owners: dict[int, int] = {}
+
+    def add(
+        self, document_id: int, tag_id: int, delta: int, owner_id: int | None = None
+    ) -> None:
+        self.deltas[document_id, tag_id] += delta
+        if owner_id is not None:
+            self.owners[document_id] = owner_id
+
+    def flush(self) -> None:
+        missing = {document_id for document_id, _ in self.deltas} - set(self.owners)
+        if missing:
+            self.owners.update(
+                Document.objects.filter(pk__in=missing).values_list("pk", "owner_id")
+            )
+
+        counts: Counter[tuple[int, int]] = Counter()
+        for (document_id, tag_id), delta in self.deltas.items():
+            # A document deleted before its owner was known took its own
+            # links with it; the repair command accounts for those.
+            if document_id in self.owners:
+                counts[self.owners[document_id], tag_id] += delta
+
+        apply_counts(counts)
+        self.deltas.clear()
+
+
+@contextmanager
+def batch():
+    """Collect the deltas of the enclosed writes and flush them once on exit.
+
+    Nested calls join the outermost batch. Nothing is written if the block
+    raises.
+    """
+    current = _current_batch.get()
+    if current is not None:
+        yield current
+        return
+
+    current = TagCountBatch()
+    token = _current_batch.set(current)
+    try:
+        yield current
+    finally:
+        _current_batch.reset(token)
+
+    current.flush()
+
+
+def record(
+    document_id: int, tag_id: int, delta: int, owner_id: int | None = None
+) -> None:
+    """Count a link change now, or at the end of the current batch."""
+    with batch() as current:
+        current.add(document_id, tag_id, delta, owner_id)
+
+
+def remember_owner(document_id: int, owner_id: int) -> None:
+    """Record a document's owner before it is deleted along with its links."""
+    current = _current_batch.get()
+    if current is not None:
+        current.owners[document_id] = owner_id
+
+
+def apply_counts(counts: Mapping[tuple[int, int], int]) -> None:
+    """Add ``counts`` (by ``(user_id, tag_id)``) to the counters."""
+    counts = {key: delta for key, delta in counts.items() if delta}
+    if not counts:
+        return
+
+    UserTagCount.objects.bulk_create(
+        [
+            UserTagCount(user_id=user_id, tag_id=tag_id)
+            for (user_id, tag_id), delta in counts.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+
+    matches = {key: Q(user_id=key[0], tag_id=key[1]) for key in counts}
+    UserTagCount.objects.filter(
+        Q.create(list(matches.values()), connector=Q.OR)
+    ).update(
+        count=F("count")
+        + Case(
+            *(When(match, then=Value(counts[key])) for key, match in matches.items()),
+            output_field=IntegerField(),
+        )
+    )
+
+    for user_id in {user_id for user_id, _ in counts}:
+        transaction.on_commit(partial(invalidate_tag_usage, user_id))
+        # Their documents' tag lists changed too.
+        responsecache.invalidate_user(user_id)
+
+
+def rebuild(
+    document_tag_model: type[Model],
+    count_model: type[Model],
+    user_ids: Iterable[int] | None = None,
+    batch_size: int = 1000,
+) -> tuple[int, int]:
+    """Recompute the counters from DocumentTag, for all users or ``user_ids``.
+
+    Takes the models as arguments so migrations can pass historical ones.
+
+    Returns:
+        tuple[int, int]: Number of counters written, and how many of them
+        differed from the stored ones (missing, stale or extra).
+    """
+    links = document_tag_model.objects.all()
+    counters = count_model.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        links = links.filter(document__owner_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        stored = {
+            (user_id, tag_id): count
+            for user_id, tag_id, count in counters.values_list(
+                "user_id", "tag_id", "count"
+            )
+        }
+        expected = {
+            (user_id, tag_id): count
+            for user_id, tag_id, count in links.values("document__owner_id", "tag_id")
+            .annotate(count=Count("pk"))
+            .order_by()
+            .values_list("document__owner_id", "tag_id", "count")
+        }
+        changed = sum(
+            1
+            for key in stored.keys() | expected.keys()
+            if stored.get(key, 0) != expected.get(key, 0)
+        )
+
+        counters.delete()
+        count_model.objects.bulk_create(
+            [
+                count_model(user_id=user_id, tag_id=tag_id, count=count)
+                for (user_id, tag_id), count in expected.items()
+            ],
+            batch_size=batch_size,
+        )
+
+    return len(expected), changed
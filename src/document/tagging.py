@@ -0,0 +1,127 @@
+"""Apply or remove tags across many documents with a constant number of queries.
+
+``Document.add_tag`` inserts one row per call; here every step is a single
+statement whatever the number of documents: create the missing tags, read the
+existing links, insert the new ones and delete the removed ones. Tag counts
+are updated once for the whole batch (see ``document.tagcounts``).
+"""
+
+from dataclasses import dataclass, field
+from django.contrib.auth.models import AbstractUser
+from django.db import transaction
+from django.db.models.query import QuerySet
+
+from document import tagcounts
+from document.autocomplete import invalidate_tag_index
+from document.models import Document, DocumentTag, Tag
+
+
+@dataclass
+class TagChanges:
+    """Tag names actually added to and removed from one document."""
+
+    document_id: int
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+
+def resolve_tags(names: list[str], create: bool) -> dict[str, Tag]:
+    """Map tag names to Tag rows, creating the missing ones if ``create``."""
+    if not names:
+        return {}
+
+    tags = Tag.objects.in_bulk(names, field_name="name")
+    missing = [name for name in names if name not in tags]
+
+    if create and missing:
+        # Concurrent requests may create the same names: let the unique
+        # constraint win and read the missing ones back.
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True
+        )
+        tags |= Tag.objects.in_bulk(missing, field_name="name")
+        # bulk_create() sends no post_save for the autocomplete index.
+        transaction.on_commit(invalidate_tag_index)
+
+    return {name: tags[name] for name in names if name in tags}
+
+
+def bulk_tag(
+    documents: QuerySet[Document],
+    added_by: AbstractUser,
+    add: list[str],
+    remove: list[str],
+) -> dict[int, TagChanges]:
+    """Add ``add`` and remove ``remove`` tag names on every document.
+
+    Args:
+        documents (QuerySet[Document]): Documents to change, already scoped to
+            what the user may edit.
+        added_by (AbstractUser): Recorded on the new DocumentTag rows.
+        add (list[str]): Tag names to apply; missing tags are created.
+        remove (list[str]): Tag names to take off; unknown names are ignored.
+
+    Returns:
+        dict[int, TagChanges]: The changes made, by document id.
+    """
+    with transaction.atomic(), tagcounts.batch() as counts:
+        owners = dict(documents.order_by().values_list("pk", "owner_id"))
+        document_ids = list(owners)
+        changes = {document_id: TagChanges(document_id) for document_id in document_ids}
+        if not document_ids:
+            return changes
+
+        counts.owners.update(owners)
+
+        tags_to_add = resolve_tags(add, create=True)
+        tags_to_remove = resolve_tags(remove, create=False)
+        tag_ids = [tag.pk for tag in (tags_to_add | tags_to_remove).values()]
+
+        existing = set(
+            DocumentTag.objects.filter(document_id__in=document_ids, tag_id__in=tag_ids)
+            .order_by()
+            .values_list("document_id", "tag_id")
+        )
+
+        new_links = []
+        removing = False
+        for document_id in document_ids:
+            for tag in tags_to_add.values():
+                if (document_id, tag.pk) not in existing:
+                    new_links.append(
+                        DocumentTag(document_id=document_id, tag=tag, added_by=added_by)
+                    )
+
+            for name, tag in tags_to_remove.items():
+                if (document_id, tag.pk) in existing:
+                    removing = True
+                    changes[document_id].removed.append(name)
+
+        if new_links:
+            # Links created concurrently since the read above are skipped by
+            # the unique_document_tag constraint instead of failing the batch.
+            DocumentTag.objects.bulk_create(new_links, ignore_conflicts=True)
+            # bulk_create() does not tell which links it skipped: read them
+            # back and keep ours, told apart by the added_at stamped on them.
+            inserted = set(
+                DocumentTag.objects.filter(
+                    document_id__in=document_ids,
+                    tag_id__in=[tag.pk for tag in tags_to_add.values()],
+                )
+                .order_by()
+                .values_list("document_id", "tag_id", "added_at")
+            )
+            # bulk_create() sends no post_save, while the delete below does.
+            for link in new_links:
+                if (link.document_id, link.tag_id, link.added_at) in inserted:
+                    counts.add(link.document_id, link.tag_id, 1)
+                    changes[link.document_id].added.append(link.tag.name)
+        if removing:
+            # Filtered by document and tag rather than by link: the number of
+            # links is not bounded by SQLite's 32,766 query parameters.
+            DocumentTag.objects.filter(
+                document_id__in=document_ids,
+                tag_id__in=[tag.pk for tag in tags_to_remove.values()],
+            ).delete()
+
+    return changes
@@ -0,0 +1,240 @@
+import shutil
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from authapi.models import ApiToken
+from document import admission
+from document.models import Document, DocumentFile
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def upload() -> SimpleUploadedFile:
+    return SimpleUploadedFile("scan.pdf", b"%PDF-1.4 scan")
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    DOCUMENT_UPLOAD_RATE="1/min",
+    DOCUMENT_UPLOAD_BURST=2,
+    DOCUMENT_INGEST_USER_CONCURRENCY=2,
+    DOCUMENT_INGEST_GLOBAL_CONCURRENCY=3,
+    DOCUMENT_MAX_PENDING_EXTRACTIONS=10,
+    DOCUMENT_ADMISSION_RETRY_AFTER=7,
+)
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Scans", owner=self.user)
+        self.upload_url = reverse(
+            "document-files-list", kwargs={"document_pk": self.document.pk}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def hold_slots(self, key: str, count: int) -> list[admission.ConcurrencyLimit]:
+        limits = [admission.ConcurrencyLimit(key, count) for _ in range(count)]
+        for limit in limits:
+            self.assertTrue(limit.acquire())
+
+        return limits
+
+    def user_slots(self) -> int:
+        return cache.get(admission.USER_SLOTS_KEY.format(user_id=self.user.pk))
+
+    def test_uploads_over_the_rate_are_throttled(self):
+        # --- Act
+        responses = [
+            self.client.post(self.upload_url, {"file": upload()}) for _ in range(3)
+        ]
+
+        # --- Assert
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS],
+        )
+        # The bucket holds 2 tokens and refills one every 60 seconds.
+        self.assertIn(int(responses[-1]["Retry-After"]), range(58, 61))
+        self.assertEqual(DocumentFile.objects.count(), 2)
+
+    def test_replacements_are_throttled_like_uploads(self):
+        # --- Arrange
+        created = self.client.post(self.upload_url, {"file": upload()})
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.document.pk, "pk": created.json()["id"]},
+        )
+
+        # --- Act
+        responses = [
+            self.client.put(url, {"file": upload()}),
+            self.client.patch(url, {"file": upload()}),
+        ]
+
+        # --- Assert
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS],
+        )
+
+    def test_rate_is_per_user(self):
+        # --- Arrange
+        for _ in range(2):
+            self.client.post(self.upload_url, {"file": upload()})
+        other_document = Document.objects.create(title="Other", owner=self.other_user)
+        self.client.force_authenticate(self.other_user)
+
+        # --- Act
+        response = self.client.post(
+            reverse("document-files-list", kwargs={"document_pk": other_document.pk}),
+            {"file": upload()},
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bucket_refills_over_time(self):
+        # --- Arrange
+        key = "test:bucket"
+        rate = admission.parse_rate("2/s")
+
+        # --- Act
+        taken = [admission.take_token(key, rate, 2, now=100) for _ in range(3)]
+        refilled = admission.take_token(key, rate, 2, now=100.5)
+
+        # --- Assert
+        self.assertEqual(taken, [0, 0, 0.5])
+        self.assertEqual(refilled, 0)
+
+    @override_settings(DOCUMENT_UPLOAD_RATE=None)
+    def test_rate_limit_can_be_disabled(self):
+        # --- Act
+        responses = [
+            self.client.post(self.upload_url, {"file": upload()}) for _ in range(3)
+        ]
+
+        # --- Assert
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * 3,
+        )
+
+    def test_user_concurrency_limit(self):
+        # --- Arrange
+        held = self.hold_slots(admission.USER_SLOTS_KEY.format(user_id=self.user.pk), 2)
+
+        # --- Act
+        rejected = self.client.post(self.upload_url, {"file": upload()})
+        document_list = self.client.get(reverse("document-list"))
+        for limit in held:
+            limit.release()
+        admitted = self.client.post(self.upload_url, {"file": upload()})
+
+        # --- Assert
+        self.assertEqual(rejected.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(rejected["Retry-After"], "7")
+        self.assertEqual(document_list.status_code, status.HTTP_200_OK)
+        self.assertEqual(admitted.status_code, status.HTTP_201_CREATED)
+
+    def test_global_concurrency_limit(self):
+        # --- Arrange
+        self.hold_slots(admission.GLOBAL_SLOTS_KEY, 3)
+
+        # --- Act
+        response = self.client.post(self.upload_url, {"file": upload()})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "7")
+        # The user's slot taken before the global check was given back.
+        self.assertEqual(self.user_slots(), 0)
+
+    def test_slots_are_released_after_failed_requests(self):
+        # --- Act
+        response = self.client.post(self.upload_url, {})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.user_slots(), 0)
+        self.assertEqual(cache.get(admission.GLOBAL_SLOTS_KEY), 0)
+
+    @override_settings(DOCUMENT_MAX_PENDING_EXTRACTIONS=1)
+    def test_pending_extraction_backlog(self):
+        # --- Arrange
+        pending = DocumentFile.objects.create(
+            document=self.document, uploaded_by=self.user, file=upload()
+        )
+
+        # --- Act
+        rejected = self.client.post(self.upload_url, {"file": upload()})
+        pending.status = DocumentFile.Status.DONE
+        pending.save()
+        admitted = self.client.post(self.upload_url, {"file": upload()})
+
+        # --- Assert
+        self.assertEqual(rejected.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(rejected["Retry-After"], "7")
+        self.assertEqual(admitted.status_code, status.HTTP_201_CREATED)
+
+    def test_upload_chunks_are_concurrency_limited(self):
+        # --- Arrange
+        self.hold_slots(admission.USER_SLOTS_KEY.format(user_id=self.user.pk), 2)
+        url = reverse(
+            "document-uploads-chunk",
+            kwargs={
+                "document_pk": self.document.pk,
+                "pk": "00000000-0000-0000-0000-000000000000",
+                "index": 0,
+            },
+        )
+
+        # --- Act
+        response = self.client.put(
+            url,
+            b"data",
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE="bytes 0-3/4",
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    async def test_async_upload_is_admitted_the_same_way(self):
+        # --- Arrange
+        _, key = await sync_to_async(ApiToken.issue)(self.user, "scanner")
+        headers = {"Authorization": f"Token {key}"}
+        url = reverse(
+            "async-document-files-upload", kwargs={"document_pk": self.document.pk}
+        )
+
+        # --- Act
+        responses = [
+            await self.async_client.post(url, {"file": upload()}, headers=headers)
+            for _ in range(3)
+        ]
+
+        # --- Assert
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS],
+        )
+        self.assertIn("Retry-After", responses[-1])
+        self.assertEqual(await sync_to_async(self.user_slots)(), 0)
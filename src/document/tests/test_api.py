@@ -118,7 +118,62 @@ class DocumentViewSetTests(BaseAPITestCase):
 
         # --- Assert
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(self.document.title, [document["title"] for document in data])
+        self.assertIn(
+            self.document.title, [document["title"] for document in data["results"]]
+        )
+
+    def test_list_documents_uses_compact_representation(self):
+        # --- Arrange
+        DocumentNote.objects.create(
+            document=self.document, created_by=self.user, content="Note"
+        )
+
+        url = self.url("document-list")
+
+        # --- Act
+        response = self.client.get(url)
+        document = response.json()["results"][0]
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(document["tag_ids"], [self.tag.pk])
+        self.assertEqual(document["file_count"], 0)
+        self.assertEqual(document["note_count"], 1)
+        self.assertNotIn("notes", document)
+
+    def test_list_documents_is_cursor_paginated(self):
+        # --- Arrange
+        for index in range(4):
+            Document.objects.create(title=f"Doc {index}", owner=self.user)
+
+        url = self.url("document-list")
+
+        # --- Act
+        first_page = self.client.get(url, {"page_size": 3}).json()
+        second_page = self.client.get(first_page["next"]).json()
+
+        # --- Assert
+        self.assertEqual(len(first_page["results"]), 3)
+        self.assertEqual(len(second_page["results"]), 2)
+        self.assertIsNone(second_page["next"])
+
+        first_ids = {document["id"] for document in first_page["results"]}
+        second_ids = {document["id"] for document in second_page["results"]}
+        self.assertFalse(first_ids & second_ids)
+
+    def test_retrieve_document_is_fully_nested(self):
+        # --- Arrange
+        url = self.url("document-detail", pk=self.document.pk)
+
+        # --- Act
+        response = self.client.get(url)
+        data = response.json()
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(data["tags"], [{"id": self.tag.pk, "name": self.tag.name}])
+        self.assertEqual(data["files"], [])
+        self.assertEqual(data["notes"], [])
 
     def test_create_document(self):
         # --- Arrange
@@ -148,7 +203,7 @@ class DocumentViewSetTests(BaseAPITestCase):
 
         # --- Assert
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        titles = [document["title"] for document in data]
+        titles = [document["title"] for document in data["results"]]
         self.assertNotIn(other_document.title, titles)
 
     def test_update_document(self):
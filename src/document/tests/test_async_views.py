@@ -0,0 +1,231 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from authapi.models import ApiToken
+from document.models import Document, DocumentFile, DocumentNote, Tag
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+CONTENT = b"%PDF-1.4 0123456789abcdefghij"
+
+
+async def read_streaming(response) -> bytes:
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        _, key = ApiToken.issue(self.user, "scanner")
+        self.headers = {"Authorization": f"Token {key}"}
+
+        self.document = Document.objects.create(title="Tax Return", owner=self.user)
+        self.document.add_tag(Tag.objects.create(name="taxes"), added_by=self.user)
+        DocumentNote.objects.create(
+            document=self.document, created_by=self.user, content="Filed"
+        )
+        self.document_file = DocumentFile.objects.create(
+            document=self.document,
+            uploaded_by=self.user,
+            file=SimpleUploadedFile("return.pdf", CONTENT),
+        )
+        self.detail_url = reverse(
+            "async-document-detail", kwargs={"pk": self.document.pk}
+        )
+        self.upload_url = reverse(
+            "async-document-files-upload", kwargs={"document_pk": self.document.pk}
+        )
+        self.download_url = reverse(
+            "async-document-files-download",
+            kwargs={"document_pk": self.document.pk, "pk": self.document_file.pk},
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def sync_detail(self) -> dict:
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        return client.get(
+            reverse("document-detail", kwargs={"pk": self.document.pk})
+        ).json()
+
+    async def test_detail_matches_the_sync_view_and_is_cached(self):
+        # --- Act
+        first = await self.async_client.get(self.detail_url, headers=self.headers)
+        second = await self.async_client.get(self.detail_url, headers=self.headers)
+
+        # --- Assert
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual((first["X-Cache"], second["X-Cache"]), ("MISS", "HIT"))
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(first.json(), await sync_to_async(self.sync_detail)())
+
+    async def test_detail_with_session(self):
+        # --- Arrange
+        await self.async_client.aforce_login(self.user)
+
+        # --- Act
+        response = await self.async_client.get(self.detail_url)
+
+        # --- Assert
+        self.assertEqual(response.json()["title"], "Tax Return")
+
+    async def test_detail_requires_authentication(self):
+        # --- Act
+        anonymous = await self.async_client.get(self.detail_url)
+        bad_token = await self.async_client.get(
+            self.detail_url, headers={"Authorization": "Token nope"}
+        )
+
+        # --- Assert
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(bad_token.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("detail", bad_token.json())
+
+    async def test_other_users_document_is_not_found(self):
+        # --- Arrange
+        await self.async_client.aforce_login(self.other_user)
+
+        # --- Act
+        detail = await self.async_client.get(self.detail_url)
+        download = await self.async_client.get(self.download_url)
+
+        # --- Assert
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(download.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_download_streams_the_file(self):
+        # --- Act
+        response = await self.async_client.get(self.download_url, headers=self.headers)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(await read_streaming(response), CONTENT)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+        self.assertIn('filename="tax-return.pdf"', response["Content-Disposition"])
+
+    async def test_download_byte_ranges(self):
+        # --- Act
+        middle = await self.async_client.get(
+            self.download_url, headers={**self.headers, "Range": "bytes=9-18"}
+        )
+        unsatisfiable = await self.async_client.get(
+            self.download_url, headers={**self.headers, "Range": "bytes=500-"}
+        )
+
+        # --- Assert
+        self.assertEqual(middle.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(await read_streaming(middle), CONTENT[9:19])
+        self.assertEqual(middle["Content-Range"], f"bytes 9-18/{len(CONTENT)}")
+        self.assertEqual(
+            unsatisfiable.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    async def test_download_not_modified(self):
+        # --- Arrange
+        response = await self.async_client.get(self.download_url, headers=self.headers)
+
+        # --- Act
+        revalidated = await self.async_client.get(
+            self.download_url,
+            headers={**self.headers, "If-None-Match": response["ETag"]},
+        )
+
+        # --- Assert
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_upload_with_token_needs_no_csrf(self):
+        # --- Arrange
+        self.async_client.handler.enforce_csrf_checks = True
+
+        # --- Act
+        response = await self.async_client.post(
+            self.upload_url,
+            {"file": SimpleUploadedFile("scan.pdf", b"%PDF-1.7 scan")},
+            headers=self.headers,
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()
+        self.assertEqual(data["mime_type"], "application/pdf")
+        self.assertEqual(data["status"], DocumentFile.Status.PENDING)
+        self.assertEqual(
+            await DocumentFile.objects.filter(document=self.document).acount(), 2
+        )
+
+    async def test_upload_with_session_enforces_csrf(self):
+        # --- Arrange
+        self.async_client.handler.enforce_csrf_checks = True
+        await self.async_client.aforce_login(self.user)
+
+        # --- Act
+        response = await self.async_client.post(
+            self.upload_url, {"file": SimpleUploadedFile("scan.pdf", b"scan")}
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_upload_without_file(self):
+        # --- Act
+        response = await self.async_client.post(
+            self.upload_url, {}, headers=self.headers
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", response.json())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class LoadTestTransfersCommandTests(TransactionTestCase):
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def test_sync_pool_caps_concurrent_transfers(self):
+        # --- Arrange
+        stdout = StringIO()
+
+        # --- Act
+        call_command(
+            "loadtest_transfers",
+            "--clients=6",
+            "--threads=2",
+            "--size=8192",
+            "--rate=1000000",
+            "--host=testserver",
+            stdout=stdout,
+        )
+
+        # --- Assert
+        sync_line, async_line = stdout.getvalue().splitlines()
+        self.assertIn("6 transfer(s)", sync_line)
+        self.assertIn("(0 failed), peak 2 concurrent", sync_line)
+        self.assertIn("6 transfer(s)", async_line)
+        self.assertIn("(0 failed)", async_line)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(DocumentFile.objects.exists())
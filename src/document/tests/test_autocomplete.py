@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.autocomplete import PrefixIndex
+from document.models import Document, Tag
+
+User = get_user_model()
+
+
+class TagAutocompleteTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.url = reverse("tag-autocomplete")
+        self.tags = {
+            name: Tag.objects.create(name=name)
+            for name in ["Tax-2022", "tax-2023", "taxes", "travel", "work"]
+        }
+
+    def suggest(self, prefix: str, **params) -> list[str]:
+        response = self.client.get(self.url, {"prefix": prefix, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [suggestion["name"] for suggestion in response.json()]
+
+    def tag_documents(self, user, name: str, count: int) -> None:
+        for index in range(count):
+            document = Document.objects.create(title=f"{name} {index}", owner=user)
+            document.add_tag(self.tags[name], added_by=user)
+
+    def test_prefix_matches_ignore_case_and_respect_limit(self):
+        # --- Act
+        matches = self.suggest("TAX")
+        limited = self.suggest("t", limit=2)
+
+        # --- Assert
+        self.assertEqual(matches, ["Tax-2022", "tax-2023", "taxes"])
+        self.assertEqual(limited, ["Tax-2022", "tax-2023"])
+
+    def test_tags_used_by_the_user_rank_first(self):
+        # --- Arrange
+        self.tag_documents(self.user, "taxes", 2)
+        self.tag_documents(self.user, "tax-2023", 1)
+        self.tag_documents(self.other_user, "Tax-2022", 5)
+
+        # --- Act
+        response = self.client.get(self.url, {"prefix": "ta"})
+
+        # --- Assert
+        self.assertEqual(
+            response.json(),
+            [
+                {"id": self.tags["taxes"].pk, "name": "taxes", "count": 2},
+                {"id": self.tags["tax-2023"].pk, "name": "tax-2023", "count": 1},
+                {"id": self.tags["Tax-2022"].pk, "name": "Tax-2022", "count": 0},
+            ],
+        )
+
+    def test_index_follows_tag_changes(self):
+        # --- Arrange
+        self.suggest("t")
+
+        # --- Act
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name="tea")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags["travel"].name = "holidays"
+            self.tags["travel"].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags["taxes"].delete()
+
+        # --- Assert
+        self.assertEqual(self.suggest("t"), ["Tax-2022", "tax-2023", "tea"])
+        self.assertEqual(self.suggest("hol"), ["holidays"])
+
+    def test_ranking_follows_bulk_tagging(self):
+        # --- Arrange
+        document = Document.objects.create(title="Ticket", owner=self.user)
+        self.suggest("t")
+
+        # --- Act
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("document-bulk-tag"),
+                {"document_ids": [document.pk], "add": ["travel", "trips"]},
+                format="json",
+            )
+
+        # --- Assert
+        self.assertEqual(self.suggest("t")[:2], ["travel", "trips"])
+
+    def test_warm_lookups_do_not_query_the_database(self):
+        # --- Arrange
+        self.suggest("ta")
+
+        # --- Act / Assert
+        with self.assertNumQueries(0):
+            self.suggest("tr")
+
+    def test_prefix_is_required(self):
+        # --- Act
+        response = self.client.get(self.url)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("prefix", response.json())
+
+
+class PrefixIndexTests(APITestCase):
+    def test_search_returns_the_sorted_prefix_range(self):
+        # --- Arrange
+        index = PrefixIndex(
+            [(1, "b"), (2, "Ab"), (3, "a"), (4, "abc"), (5, "ä"), (6, "ac")]
+        )
+
+        # --- Act / Assert
+        self.assertEqual(index.search("ab"), [(2, "Ab"), (4, "abc")])
+        self.assertEqual(index.search("a", limit=2), [(3, "a"), (2, "Ab")])
+        self.assertEqual(index.search("ä"), [(5, "ä")])
+        self.assertEqual(index.search("z"), [])
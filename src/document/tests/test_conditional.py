@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentFile, DocumentNote, Tag
+
+User = get_user_model()
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Lease", owner=self.user)
+        self.note = DocumentNote.objects.create(
+            document=self.document, created_by=self.user, content="Signed"
+        )
+        self.tag = Tag.objects.create(name="home")
+        self.document.add_tag(self.tag, added_by=self.user)
+
+    def revalidate(self, url: str, etag: str):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_document_list_is_not_modified(self):
+        # --- Arrange
+        url = reverse("document-list")
+        etag = self.client.get(url)["ETag"]
+
+        # --- Act
+        response = self.revalidate(url, etag)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_document_list_changes_with_documents_and_related_rows(self):
+        # --- Arrange
+        url = reverse("document-list")
+        etags = [self.client.get(url)["ETag"]]
+
+        # --- Act
+        changes = [
+            lambda: DocumentNote.objects.create(
+                document=self.document, created_by=self.user, content="Paid"
+            ),
+            lambda: DocumentFile.objects.create(
+                document=self.document, uploaded_by=self.user, file="lease.pdf"
+            ),
+            lambda: self.document.tags.clear(),
+            lambda: Document.objects.create(title="Invoice", owner=self.user),
+            lambda: self.document.delete(),
+        ]
+        responses = []
+        for change in changes:
+            change()
+            responses.append(self.revalidate(url, etags[-1]))
+            etags.append(responses[-1]["ETag"])
+
+        # --- Assert
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_document_list_ignores_other_users_changes(self):
+        # --- Arrange
+        url = reverse("document-list")
+        etag = self.client.get(url)["ETag"]
+        Document.objects.create(title="Not mine", owner=self.other_user)
+
+        # --- Act
+        response = self.revalidate(url, etag)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_document_detail_changes_with_tag_rename_and_file_status(self):
+        # --- Arrange
+        url = reverse("document-detail", kwargs={"pk": self.document.pk})
+        document_file = DocumentFile.objects.create(
+            document=self.document, uploaded_by=self.user, file="lease.pdf"
+        )
+        first = self.client.get(url)
+
+        # --- Act
+        self.tag.name = "house"
+        self.tag.save()
+        after_rename = self.revalidate(url, first["ETag"])
+
+        document_file.status = DocumentFile.Status.DONE
+        document_file.save()
+        after_status = self.revalidate(url, after_rename["ETag"])
+
+        # --- Assert
+        self.assertNotIn("Last-Modified", first)
+        self.assertEqual(after_rename.status_code, status.HTTP_200_OK)
+        self.assertEqual(after_status.status_code, status.HTTP_200_OK)
+        self.assertEqual(after_status.json()["files"][0]["status"], "done")
+
+    def test_missing_document_is_not_found_despite_validators(self):
+        # --- Arrange
+        other = Document.objects.create(title="Not mine", owner=self.other_user)
+        url = reverse("document-detail", kwargs={"pk": other.pk})
+
+        # --- Act
+        response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_note_detail_supports_if_modified_since(self):
+        # --- Arrange
+        url = reverse(
+            "document-notes-detail",
+            kwargs={"document_pk": self.document.pk, "pk": self.note.pk},
+        )
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        # --- Act
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tag_list_changes_when_a_tag_is_renamed(self):
+        # --- Arrange
+        url = reverse("tag-list")
+        etag = self.client.get(url)["ETag"]
+        unchanged = self.revalidate(url, etag)
+
+        # --- Act
+        self.tag.name = "house"
+        self.tag.save()
+        changed = self.revalidate(url, etag)
+
+        # --- Assert
+        self.assertEqual(unchanged.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed["ETag"], etag)
@@ -0,0 +1,182 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from document.models import Document, DocumentFile
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+CONTENT = b"%PDF-1.4 0123456789abcdefghij"
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DocumentFileDownloadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Tax Return", owner=self.user)
+        self.document_file = DocumentFile.objects.create(
+            document=self.document,
+            uploaded_by=self.user,
+            file=SimpleUploadedFile("return.pdf", CONTENT),
+        )
+        self.url = reverse(
+            "document-files-download",
+            kwargs={"document_pk": self.document.pk, "pk": self.document_file.pk},
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def test_download_full_file(self):
+        # --- Act
+        response = self.client.get(self.url)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(response["ETag"], f'"{self.document_file.blob.sha256}"')
+        self.assertIn('filename="tax-return.pdf"', response["Content-Disposition"])
+
+    def test_download_ignores_the_accept_header(self):
+        # --- Act
+        response = self.client.get(self.url, HTTP_ACCEPT="application/pdf")
+        missing = self.client.get(
+            reverse(
+                "document-files-download",
+                kwargs={
+                    "document_pk": self.document.pk,
+                    "pk": "00000000-0000-0000-0000-000000000000",
+                },
+            ),
+            HTTP_ACCEPT="application/pdf",
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(missing["Content-Type"], "application/json")
+
+    def test_download_byte_ranges(self):
+        # --- Act
+        middle = self.client.get(self.url, HTTP_RANGE="bytes=9-18")
+        suffix = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE="bytes=500-")
+
+        # --- Assert
+        self.assertEqual(middle.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(middle.streaming_content), CONTENT[9:19])
+        self.assertEqual(middle["Content-Range"], f"bytes 9-18/{len(CONTENT)}")
+        self.assertEqual(middle["Content-Length"], "10")
+
+        self.assertEqual(b"".join(suffix.streaming_content), CONTENT[-5:])
+
+        self.assertEqual(
+            unsatisfiable.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(unsatisfiable["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_stale_if_range_serves_full_file(self):
+        # --- Act
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"outdated"'
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+
+    def test_conditional_requests_return_not_modified(self):
+        # --- Arrange
+        etag = self.client.get(self.url)["ETag"]
+        last_modified = http_date(self.document_file.updated_at.timestamp())
+
+        # --- Act
+        by_etag = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        by_date = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        # --- Assert
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_replaced_content_is_not_validated_by_the_old_date(self):
+        # --- Arrange
+        uploaded = timezone.now() - timedelta(days=1)
+        DocumentFile.objects.filter(pk=self.document_file.pk).update(
+            uploaded_at=uploaded, updated_at=uploaded
+        )
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        self.client.put(
+            reverse(
+                "document-files-detail",
+                kwargs={"document_pk": self.document.pk, "pk": self.document_file.pk},
+            ),
+            {"file": SimpleUploadedFile("return.pdf", b"%PDF-1.4 amended return")},
+            format="multipart",
+        )
+
+        # --- Act
+        modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        resumed = self.client.get(
+            self.url, HTTP_RANGE="bytes=9-", HTTP_IF_RANGE=last_modified
+        )
+
+        # --- Assert
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(resumed.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            b"".join(resumed.streaming_content), b"%PDF-1.4 amended return"
+        )
+
+    def test_download_denied_for_foreign_file(self):
+        # --- Arrange
+        self.client.force_authenticate(self.other_user)
+
+        # --- Act
+        response = self.client.get(self.url)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(
+        DOCUMENT_SENDFILE_BACKEND="x-accel-redirect",
+        DOCUMENT_SENDFILE_URL_PREFIX="/protected-media/",
+    )
+    def test_download_offloaded_to_nginx(self):
+        # --- Act
+        response = self.client.get(self.url)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            f"/protected-media/{self.document_file.file.name}",
+        )
+        self.assertEqual(response.content, b"")
+
+    @override_settings(DOCUMENT_SENDFILE_BACKEND="x-sendfile")
+    def test_download_offloaded_with_x_sendfile(self):
+        # --- Act
+        response = self.client.get(self.url)
+
+        # --- Assert
+        self.assertEqual(response["X-Sendfile"], self.document_file.file.path)
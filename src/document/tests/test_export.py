@@ -0,0 +1,154 @@
+import io
+import json
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document import export
+from document.models import Document, DocumentFile, DocumentNote, Tag
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Taxes", owner=self.user)
+        self.document.add_tag(Tag.objects.create(name="finance"), self.user)
+        DocumentNote.objects.create(
+            document=self.document, created_by=self.user, content="Filed in May"
+        )
+        self.file = self.add_file(self.document, "return.pdf", b"%PDF-1.4 taxes")
+
+        other_document = Document.objects.create(title="Private", owner=self.other_user)
+        self.add_file(other_document, "secret.pdf", b"secret")
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def add_file(self, document: Document, name: str, content: bytes) -> DocumentFile:
+        document_file = DocumentFile(
+            document=document,
+            uploaded_by=document.owner,
+            file=SimpleUploadedFile(name, content),
+        )
+        document_file.save()
+
+        return document_file
+
+    def download(self, archive: str, **headers) -> bytes:
+        response = self.client.get(
+            reverse("document-export"), {"archive": archive}, **headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], export.CONTENT_TYPES[archive])
+
+        return b"".join(response.streaming_content)
+
+    def test_zip_export_contains_manifest_and_files(self):
+        # --- Act
+        content = self.download("zip")
+
+        # --- Assert
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        file_path = f"files/{self.document.pk}/{self.file.pk}.pdf"
+        self.assertEqual(archive.namelist(), [export.MANIFEST_NAME, file_path])
+        self.assertEqual(archive.read(file_path), b"%PDF-1.4 taxes")
+
+        [line] = archive.read(export.MANIFEST_NAME).decode().splitlines()
+        manifest = json.loads(line)
+        self.assertEqual(manifest["title"], "Taxes")
+        self.assertEqual(manifest["tags"], ["finance"])
+        self.assertEqual(manifest["notes"][0]["content"], "Filed in May")
+        self.assertEqual(manifest["files"][0]["path"], file_path)
+        self.assertEqual(manifest["files"][0]["size"], 14)
+
+    def test_tar_export_matches_zip_export(self):
+        # --- Act
+        archive = tarfile.open(fileobj=io.BytesIO(self.download("tar")))
+
+        # --- Assert
+        members = archive.getmembers()
+        self.assertEqual(
+            [member.name for member in members],
+            [export.MANIFEST_NAME, f"files/{self.document.pk}/{self.file.pk}.pdf"],
+        )
+        self.assertEqual(archive.extractfile(members[1]).read(), b"%PDF-1.4 taxes")
+        manifest = json.loads(archive.extractfile(members[0]).read())
+        self.assertEqual(manifest["id"], self.document.pk)
+
+    def test_missing_files_are_skipped(self):
+        # --- Arrange
+        self.file.file.storage.delete(self.file.file.name)
+
+        # --- Act
+        with self.assertLogs("document.export", "WARNING"):
+            archive = zipfile.ZipFile(io.BytesIO(self.download("zip")))
+
+        # --- Assert
+        self.assertEqual(archive.namelist(), [export.MANIFEST_NAME])
+
+    def test_export_ignores_the_accept_header(self):
+        # --- Act
+        content = self.download("zip", HTTP_ACCEPT="application/zip")
+
+        # --- Assert
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertIn(export.MANIFEST_NAME, archive.namelist())
+
+    def test_unknown_archive_format(self):
+        # --- Act
+        response = self.client.get(reverse("document-export"), {"archive": "rar"})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_is_written_in_chunks(self):
+        # --- Arrange
+        self.add_file(self.document, "large.bin", b"x" * (3 * 64 * 1024))
+
+        # --- Act
+        chunks = list(export.stream_export(self.user, "tar"))
+
+        # --- Assert
+        self.assertGreater(len(chunks), 3)
+        self.assertLessEqual(max(len(chunk) for chunk in chunks), 64 * 1024)
+
+    def test_command_writes_archive(self):
+        # --- Arrange
+        output = Path(TEMP_MEDIA_ROOT) / "export.tar"
+        stdout = StringIO()
+
+        # --- Act
+        call_command(
+            "export_documents",
+            "--owner=alice",
+            "--archive=tar",
+            f"--output={output}",
+            stdout=stdout,
+        )
+
+        # --- Assert
+        with tarfile.open(output) as archive:
+            self.assertEqual(len(archive.getnames()), 2)
+        self.assertIn(f"Wrote {output.stat().st_size} bytes", stdout.getvalue())
@@ -0,0 +1,191 @@
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from document import pipeline
+from document.models import Document, DocumentFile, DocumentFileText
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    DOCUMENT_TEXT_EXTRACTOR="document.extraction.FakeExtractor",
+    DOCUMENT_PREVIEW_RENDERER="document.previews.FakePreviewRenderer",
+    DOCUMENT_PREVIEW_CACHE_DIR=f"{TEMP_MEDIA_ROOT}/previews",
+)
+class ExtractionPipelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Scans", owner=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def upload(self, name: str, content: bytes) -> DocumentFile:
+        url = reverse("document-files-list", kwargs={"document_pk": self.document.pk})
+        response = self.client.post(
+            url, {"file": SimpleUploadedFile(name, content)}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return DocumentFile.objects.get(pk=response.json()["id"])
+
+    def test_upload_is_queued_without_extracting(self):
+        # --- Act
+        document_file = self.upload("scan.pdf", b"Page one")
+
+        # --- Assert
+        self.assertEqual(document_file.status, DocumentFile.Status.PENDING)
+        self.assertFalse(DocumentFileText.objects.exists())
+
+    def test_batch_stores_text_per_page(self):
+        # --- Arrange
+        document_file = self.upload("scan.pdf", b"Page one\fPage two")
+
+        # --- Act
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = pipeline.run_batch(executor, batch_size=10)
+
+        # --- Assert
+        document_file.refresh_from_db()
+        self.assertEqual(result.done, 1)
+        self.assertEqual(document_file.status, DocumentFile.Status.DONE)
+        self.assertEqual(document_file.page_count, 2)
+        self.assertEqual(
+            list(document_file.pages.values_list("page_number", "content")),
+            [(1, "Page one"), (2, "Page two")],
+        )
+
+    def test_replaced_content_is_queued_again(self):
+        # --- Arrange
+        document_file = self.upload("scan.pdf", b"Old page")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pipeline.run_batch(executor, batch_size=10)
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.document.pk, "pk": document_file.pk},
+        )
+
+        # --- Act
+        response = self.client.put(
+            url,
+            {"file": SimpleUploadedFile("scan.pdf", b"New page")},
+            format="multipart",
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        document_file.refresh_from_db()
+        self.assertEqual(document_file.status, DocumentFile.Status.PENDING)
+        self.assertIsNone(document_file.page_count)
+        self.assertFalse(document_file.pages.exists())
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pipeline.run_batch(executor, batch_size=10)
+        self.assertEqual(document_file.pages.get().content, "New page")
+
+    def test_identical_content_keeps_its_extraction(self):
+        # --- Arrange
+        document_file = self.upload("scan.pdf", b"Page one\fPage two")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pipeline.run_batch(executor, batch_size=10)
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.document.pk, "pk": document_file.pk},
+        )
+
+        # --- Act
+        self.client.put(
+            url,
+            {"file": SimpleUploadedFile("copy.pdf", b"Page one\fPage two")},
+            format="multipart",
+        )
+
+        # --- Assert
+        document_file.refresh_from_db()
+        self.assertEqual(document_file.status, DocumentFile.Status.DONE)
+        self.assertEqual(document_file.page_count, 2)
+        self.assertEqual(document_file.pages.count(), 2)
+
+    def test_results_of_replaced_content_are_dropped(self):
+        # --- Arrange
+        document_file = self.upload("scan.pdf", b"Old page")
+        [claimed] = pipeline.claim_pending_files(10)
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.document.pk, "pk": document_file.pk},
+        )
+        self.client.put(
+            url,
+            {"file": SimpleUploadedFile("scan.pdf", b"New page")},
+            format="multipart",
+        )
+
+        # --- Act
+        saved = pipeline.save_pages(claimed, ["Old page"])
+        failed = pipeline.mark_failed(claimed, "Unreadable")
+
+        # --- Assert
+        self.assertFalse(saved)
+        self.assertFalse(failed)
+        document_file.refresh_from_db()
+        self.assertEqual(document_file.status, DocumentFile.Status.PENDING)
+        self.assertEqual(document_file.extraction_error, "")
+        self.assertFalse(document_file.pages.exists())
+
+    def test_batch_marks_unreadable_files_as_failed(self):
+        # --- Arrange
+        document_file = self.upload("scan.pdf", b"Lost")
+        document_file.file.storage.delete(document_file.file.name)
+
+        # --- Act
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = pipeline.run_batch(executor, batch_size=10)
+
+        # --- Assert
+        document_file.refresh_from_db()
+        self.assertEqual(result.failed, 1)
+        self.assertEqual(document_file.status, DocumentFile.Status.FAILED)
+        self.assertTrue(document_file.extraction_error)
+
+    def test_batch_runs_on_process_pool(self):
+        # --- Arrange
+        document_file = self.upload("scan.pdf", b"From a worker process")
+
+        # --- Act
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            pipeline.run_batch(executor, batch_size=10)
+
+        # --- Assert
+        self.assertEqual(document_file.pages.get().content, "From a worker process")
+
+    def test_command_drains_queue(self):
+        # --- Arrange
+        self.upload("a.pdf", b"First")
+        self.upload("b.pdf", b"Second")
+        stdout = StringIO()
+
+        # --- Act
+        call_command("run_extraction_workers", "--once", "--workers=1", stdout=stdout)
+
+        # --- Assert
+        self.assertFalse(
+            DocumentFile.objects.exclude(status=DocumentFile.Status.DONE).exists()
+        )
+        self.assertIn("2 done", stdout.getvalue())
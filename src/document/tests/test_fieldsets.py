@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentFile, DocumentNote, Tag
+
+User = get_user_model()
+
+LIST_FIELDS = {
+    "id",
+    "title",
+    "description",
+    "owner",
+    "tag_ids",
+    "file_count",
+    "note_count",
+    "created_at",
+    "updated_at",
+}
+DETAIL_FIELDS = {
+    "id",
+    "title",
+    "description",
+    "owner",
+    "tags",
+    "files",
+    "notes",
+    "created_at",
+    "updated_at",
+}
+
+
+class FieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(
+            title="Lease", description="Flat lease", owner=self.user
+        )
+        self.tag = Tag.objects.create(name="home")
+        self.document.add_tag(self.tag, added_by=self.user)
+        DocumentFile.objects.create(
+            document=self.document, uploaded_by=self.user, file="documents/lease.pdf"
+        )
+        DocumentNote.objects.create(
+            document=self.document, created_by=self.user, content="Renew in May"
+        )
+        self.list_url = reverse("document-list")
+        self.detail_url = reverse("document-detail", kwargs={"pk": self.document.pk})
+
+    def get(self, url: str, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = "\n".join(query["sql"] for query in queries.captured_queries)
+
+        return response.json(), sql
+
+    def test_default_representations_are_unchanged(self):
+        # --- Act
+        listed, _ = self.get(self.list_url)
+        detail, _ = self.get(self.detail_url)
+
+        # --- Assert
+        self.assertEqual(set(listed["results"][0]), LIST_FIELDS)
+        self.assertEqual(set(detail), DETAIL_FIELDS)
+        self.assertEqual(detail["tags"], [{"id": self.tag.pk, "name": "home"}])
+
+    def test_list_fields(self):
+        # --- Act
+        listed, sql = self.get(self.list_url, fields="title")
+
+        # --- Assert
+        [result] = listed["results"]
+        self.assertEqual(set(result), {"id", "title", "updated_at"})
+        self.assertEqual(result["title"], "Lease")
+        self.assertNotIn("description", sql)
+        self.assertNotIn("document_documentfile", sql)
+        self.assertNotIn("document_tag", sql)
+
+    def test_list_fields_load_the_ordering_fields(self):
+        # --- Arrange
+        for title in ("Deed", "Will"):
+            Document.objects.create(title=title, owner=self.user)
+        params = {"fields": "title", "page_size": 2}
+        with CaptureQueriesContext(connection) as default_ordering:
+            self.get(self.list_url, **params)
+
+        # --- Act
+        with self.assertNumQueries(len(default_ordering)):
+            listed, sql = self.get(self.list_url, ordering="created_at", **params)
+
+        # --- Assert
+        self.assertEqual(
+            [result["title"] for result in listed["results"]], ["Lease", "Deed"]
+        )
+        self.assertIsNotNone(listed["next"])
+        self.assertNotIn("description", sql)
+
+    def test_list_expand(self):
+        # --- Act
+        listed, _ = self.get(self.list_url, expand="tags,notes")
+
+        # --- Assert
+        [result] = listed["results"]
+        self.assertEqual(set(result), LIST_FIELDS | {"tags", "notes"})
+        self.assertEqual(result["tags"], [{"id": self.tag.pk, "name": "home"}])
+        self.assertEqual(result["notes"][0]["content"], "Renew in May")
+
+    def test_list_fields_and_expand(self):
+        # --- Act
+        listed, sql = self.get(self.list_url, fields="title,file_count", expand="files")
+
+        # --- Assert
+        [result] = listed["results"]
+        self.assertEqual(
+            set(result), {"id", "title", "file_count", "files", "updated_at"}
+        )
+        self.assertEqual(result["file_count"], 1)
+        self.assertEqual(len(result["files"]), 1)
+        self.assertNotIn("document_documentnote", sql)
+
+    def test_detail_fields(self):
+        # --- Act
+        detail, sql = self.get(self.detail_url, fields="title, notes")
+
+        # --- Assert
+        self.assertEqual(set(detail), {"id", "title", "notes", "updated_at"})
+        self.assertEqual(len(detail["notes"]), 1)
+        self.assertNotIn("document_documentfile", sql)
+        self.assertNotIn("document_tag", sql)
+
+    def test_search_fields(self):
+        # --- Act
+        results, _ = self.get(
+            reverse("document-search"), q="lease", fields="title,rank"
+        )
+
+        # --- Assert
+        self.assertEqual(
+            set(results["results"][0]), {"id", "title", "rank", "updated_at"}
+        )
+
+    def test_fieldsets_are_cached_separately(self):
+        # --- Arrange
+        self.client.get(self.detail_url)
+
+        # --- Act
+        response = self.client.get(self.detail_url, {"fields": "title"})
+
+        # --- Assert
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertNotIn("notes", response.json())
+
+    def test_unknown_names_are_rejected(self):
+        # --- Act
+        fields = self.client.get(self.list_url, {"fields": "title,secret"})
+        expand = self.client.get(self.detail_url, {"expand": "owner"})
+
+        # --- Assert
+        self.assertEqual(fields.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("secret", fields.json()["fields"])
+        self.assertEqual(expand.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", expand.json())
+
+    def test_writes_return_the_full_representation(self):
+        # --- Act
+        response = self.client.patch(
+            f"{self.detail_url}?fields=title", {"title": "Renamed"}
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.json()), DETAIL_FIELDS)
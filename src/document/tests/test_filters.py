@@ -0,0 +1,175 @@
+from datetime import datetime, timezone
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentFile, DocumentNote, Tag
+
+User = get_user_model()
+
+# One request per supported filter and ordering, for the EXPLAIN test.
+FILTER_PARAMS = [
+    {"tags": "1,2"},
+    {"tags": "1,2", "tag_match": "all"},
+    {"created_after": "2024-01-01T00:00:00Z", "ordering": "-created_at"},
+    {"created_before": "2024-01-01T00:00:00Z", "ordering": "created_at"},
+    {"updated_after": "2024-01-01T00:00:00Z"},
+    {"updated_before": "2024-01-01T00:00:00Z", "ordering": "updated_at"},
+    {"title_prefix": "lea"},
+    {"has_files": "true"},
+    {"has_notes": "false"},
+]
+
+
+class DocumentFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.home = Tag.objects.create(name="home")
+        self.tax = Tag.objects.create(name="tax")
+
+        self.lease = Document.objects.create(title="Lease", owner=self.user)
+        self.lease.add_tag(self.home, added_by=self.user)
+        DocumentFile.objects.create(
+            document=self.lease, uploaded_by=self.user, file="documents/lease.pdf"
+        )
+
+        self.leaflet = Document.objects.create(title="leaflet", owner=self.user)
+        self.leaflet.add_tag(self.home, added_by=self.user)
+        self.leaflet.add_tag(self.tax, added_by=self.user)
+        DocumentNote.objects.create(
+            document=self.leaflet, created_by=self.user, content="Shred"
+        )
+
+        self.receipt = Document.objects.create(title="Receipt", owner=self.user)
+        self.receipt.add_tag(self.tax, added_by=self.user)
+
+        for document, year in (
+            (self.lease, 2022),
+            (self.leaflet, 2023),
+            (self.receipt, 2024),
+        ):
+            moment = datetime(year, 6, 1, tzinfo=timezone.utc)
+            Document.objects.filter(pk=document.pk).update(
+                created_at=moment, updated_at=moment
+            )
+
+        self.url = reverse("document-list")
+
+    def list_ids(self, **params) -> list[int]:
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [document["id"] for document in response.data["results"]]
+
+    def test_tags_any_and_all(self):
+        # --- Arrange
+        tags = f"{self.home.pk},{self.tax.pk}"
+
+        # --- Act
+        any_ids = self.list_ids(tags=tags)
+        all_ids = self.list_ids(tags=tags, tag_match="all")
+
+        # --- Assert
+        self.assertEqual(any_ids, [self.receipt.pk, self.leaflet.pk, self.lease.pk])
+        self.assertEqual(all_ids, [self.leaflet.pk])
+
+    def test_date_ranges(self):
+        # --- Act
+        created = self.list_ids(
+            created_after="2023-01-01T00:00:00Z", created_before="2024-01-01T00:00:00Z"
+        )
+        updated = self.list_ids(updated_after="2023-06-01T00:00:00Z")
+
+        # --- Assert
+        self.assertEqual(created, [self.leaflet.pk])
+        self.assertEqual(updated, [self.receipt.pk, self.leaflet.pk])
+
+    def test_title_prefix_ignores_case(self):
+        # --- Act
+        ids = self.list_ids(title_prefix="LEA")
+
+        # --- Assert
+        self.assertEqual(ids, [self.leaflet.pk, self.lease.pk])
+        self.assertEqual(self.list_ids(title_prefix="leas"), [self.lease.pk])
+
+    def test_title_prefix_ignores_case_beyond_ascii(self):
+        # --- Arrange
+        exito = Document.objects.create(title="Éxito", owner=self.user)
+        nandu = Document.objects.create(title="Lease", owner=self.user)
+        nandu.title = "Ñandú"
+        nandu.save(update_fields=["title"])
+
+        # --- Act / Assert
+        self.assertEqual(self.list_ids(title_prefix="éxi"), [exito.pk])
+        self.assertEqual(self.list_ids(title_prefix="ÑAND"), [nandu.pk])
+        self.assertEqual(self.list_ids(title_prefix="ñandú"), [nandu.pk])
+
+    def test_has_files_and_notes(self):
+        # --- Act
+        with_files = self.list_ids(has_files="true")
+        without_notes = self.list_ids(has_notes="false")
+
+        # --- Assert
+        self.assertEqual(with_files, [self.lease.pk])
+        self.assertEqual(without_notes, [self.receipt.pk, self.lease.pk])
+
+    def test_ordering_by_creation(self):
+        # --- Act
+        oldest_first = self.list_ids(ordering="created_at", page_size=2)
+
+        # --- Assert
+        self.assertEqual(oldest_first, [self.lease.pk, self.leaflet.pk])
+
+    def test_invalid_parameters(self):
+        # --- Act
+        response = self.client.get(
+            self.url, {"tags": "home", "tag_match": "some", "ordering": "title"}
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {"tags", "tag_match", "ordering"})
+
+    def test_filtered_list_changes_with_the_filtered_table(self):
+        # --- Arrange
+        params = {"fields": "title", "tags": str(self.tax.pk)}
+        etag = self.client.get(self.url, params)["ETag"]
+
+        # --- Act
+        self.lease.add_tag(self.tax, added_by=self.user)
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+
+    @skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans.")
+    def test_filters_use_an_index(self):
+        for params in FILTER_PARAMS:
+            with self.subTest(**params):
+                # --- Act
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(self.url, params)
+                [page_sql] = [
+                    query["sql"]
+                    for query in queries
+                    if 'FROM "document_document"' in query["sql"]
+                    and "LIMIT" in query["sql"]
+                ]
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {page_sql}")
+                    plan = [row[-1] for row in cursor.fetchall()]
+
+                # --- Assert
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn("SEARCH document_document USING INDEX", "\n".join(plan))
+                full_scans = [line for line in plan if line.startswith("SCAN ")]
+                self.assertEqual(full_scans, [], plan)
@@ -0,0 +1,215 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from document import importer
+from document.importer import JOURNAL_NAME, folder_tags
+from document.models import Document, DocumentFile, FileBlob, UserTagCount
+from document.search import SearchResults
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportDocumentsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+        self.write("invoice.pdf", b"invoice")
+        self.write("finance/2023/report.pdf", b"report")
+        self.write("finance/2023/copy of report.pdf", b"report")
+        self.write("finance/budget.txt", b"budget")
+        self.write(".DS_Store", b"junk")
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def write(self, path: str, content: bytes) -> None:
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+    def run_import(self, *args) -> str:
+        stdout = StringIO()
+        call_command(
+            "import_documents",
+            str(self.root),
+            "--owner=alice",
+            *args,
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+
+        return stdout.getvalue()
+
+    def stored_files(self) -> set[str]:
+        return {
+            f"blobs/{first}/{second}/{name}"
+            for first in default_storage.listdir("blobs")[0]
+            for second in default_storage.listdir(f"blobs/{first}")[0]
+            for name in default_storage.listdir(f"blobs/{first}/{second}")[1]
+        }
+
+    def tag_names(self, title: str) -> list[str]:
+        document = Document.objects.get(title=title)
+
+        return sorted(document.tags.values_list("name", flat=True))
+
+    def test_folder_tags(self):
+        # --- Act / Assert
+        self.assertEqual(folder_tags("a.pdf"), [])
+        self.assertEqual(folder_tags("finance/2023/a.pdf"), ["finance", "2023"])
+
+    def test_import_creates_documents_files_and_tags(self):
+        # --- Act
+        output = self.run_import("--batch-size=2")
+
+        # --- Assert
+        self.assertEqual(Document.objects.filter(owner=self.user).count(), 4)
+        self.assertEqual(self.tag_names("invoice"), [])
+        self.assertEqual(self.tag_names("report"), ["2023", "finance"])
+        self.assertEqual(self.tag_names("budget"), ["finance"])
+        self.assertEqual(
+            dict(
+                UserTagCount.objects.filter(user=self.user).values_list(
+                    "tag__name", "count"
+                )
+            ),
+            {"finance": 3, "2023": 2},
+        )
+
+        document_file = DocumentFile.objects.get(document__title="budget")
+        self.assertEqual(document_file.status, DocumentFile.Status.PENDING)
+        self.assertEqual(
+            (document_file.size, document_file.mime_type), (6, "text/plain")
+        )
+        with document_file.file.open("rb") as handle:
+            self.assertEqual(handle.read(), b"budget")
+
+        self.assertIn("Imported 4 file(s)", output)
+        self.assertIn("files/s", output)
+        self.assertIn("MB/s", output)
+
+    def test_imported_titles_are_folded(self):
+        # --- Arrange
+        self.write("Ébauche.txt", b"draft")
+
+        # --- Act
+        self.run_import()
+
+        # --- Assert
+        [draft] = Document.objects.title_prefix("éb")
+        self.assertEqual(draft.title, "Ébauche")
+
+    def test_identical_files_share_one_blob(self):
+        # --- Act
+        self.run_import()
+
+        # --- Assert
+        blob = FileBlob.objects.get(document_files__document__title="report")
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(FileBlob.objects.count(), 3)
+
+    def test_imported_documents_are_searchable(self):
+        # --- Act
+        self.run_import()
+
+        # --- Assert
+        results = SearchResults(
+            Document.objects.filter(owner=self.user), self.user.pk, "budget"
+        )
+        self.assertEqual([document.title for document in results[:10]], ["budget"])
+
+    def test_rerun_only_imports_new_files(self):
+        # --- Arrange
+        self.run_import()
+        self.write("finance/2024/statement.pdf", b"statement")
+
+        # --- Act
+        output = self.run_import()
+
+        # --- Assert
+        self.assertIn("Importing 1 file(s), 4 already imported.", output)
+        self.assertEqual(Document.objects.count(), 5)
+        self.assertTrue((self.root / JOURNAL_NAME).exists())
+
+    def test_files_are_stored_a_bounded_window_ahead(self):
+        # --- Arrange
+        store_file = importer.store_file
+        import_batch = importer.import_batch
+        stored = []
+        stored_before_batch = []
+
+        def record_store(root, path):
+            stored.append(path)
+            return store_file(root, path)
+
+        def record_batch(files, owner):
+            stored_before_batch.append(len(stored))
+            return import_batch(files, owner)
+
+        # --- Act
+        with (
+            mock.patch.object(importer, "store_file", record_store),
+            mock.patch.object(importer, "import_batch", record_batch),
+        ):
+            self.run_import("--batch-size=1", "--workers=1")
+
+        # --- Assert
+        self.assertEqual(len(stored), 4)
+        # Two batches of one file ahead of each batch written.
+        for index, count in enumerate(stored_before_batch):
+            self.assertLessEqual(count, index + 2)
+
+    def test_failed_batch_leaves_no_stored_files(self):
+        # --- Arrange
+        self.run_import()
+        self.write("finance/2024/statement.pdf", b"statement")
+        blobs_before = set(FileBlob.objects.values_list("file", flat=True))
+
+        # --- Act
+        with mock.patch.object(
+            importer, "import_batch", side_effect=RuntimeError("database down")
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+
+        # --- Assert
+        self.assertEqual(self.stored_files(), blobs_before)
+
+    def test_duplicate_under_another_extension_is_not_kept(self):
+        # --- Arrange
+        self.write("notes/report.txt", b"report")
+
+        # --- Act
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import()
+
+        # --- Assert
+        document_file = DocumentFile.objects.get(
+            document__title="report", mime_type="text/plain"
+        )
+        self.assertEqual(document_file.file.name, document_file.blob.file.name)
+        self.assertEqual(
+            self.stored_files(), set(FileBlob.objects.values_list("file", flat=True))
+        )
+
+    def test_unknown_owner(self):
+        # --- Act / Assert
+        with self.assertRaisesMessage(CommandError, "Unknown user 'bob'"):
+            call_command("import_documents", str(self.root), "--owner=bob")
@@ -0,0 +1,151 @@
+import hashlib
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.metadata import sniff_mime_type
+from document.models import Document, DocumentFile, DocumentFileText
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 16
+
+
+class SniffMimeTypeTests(SimpleTestCase):
+    def test_signature_wins_over_extension(self):
+        # --- Act / Assert
+        self.assertEqual(sniff_mime_type(b"%PDF-1.7", "scan.jpg"), "application/pdf")
+        self.assertEqual(sniff_mime_type(PNG, "photo"), "image/png")
+        self.assertEqual(
+            sniff_mime_type(b"RIFF\0\0\0\0WEBPVP8 ", "image.bin"), "image/webp"
+        )
+
+    def test_containers_and_unknown_content_use_the_extension(self):
+        # --- Act / Assert
+        self.assertEqual(
+            sniff_mime_type(b"PK\x03\x04", "letter.docx"),
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        )
+        self.assertEqual(sniff_mime_type(b"PK\x03\x04", "a.pdf"), "application/zip")
+        self.assertEqual(sniff_mime_type(b"hello", "notes.txt"), "text/plain")
+        self.assertEqual(
+            sniff_mime_type(b"\0\1", "unknown"), "application/octet-stream"
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DocumentFileMetadataTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Scans", owner=self.user)
+        self.url = reverse(
+            "document-files-list", kwargs={"document_pk": self.document.pk}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def upload(self, name: str, content: bytes) -> dict:
+        response = self.client.post(
+            self.url, {"file": SimpleUploadedFile(name, content)}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return response.json()
+
+    def list_ids(self, **params) -> set[str]:
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return {document_file["id"] for document_file in response.json()}
+
+    def test_upload_captures_metadata(self):
+        # --- Arrange
+        content = b"%PDF-1.4 content"
+
+        # --- Act
+        data = self.upload("scan.pdf", content)
+
+        # --- Assert
+        self.assertEqual(data["size"], len(content))
+        self.assertEqual(data["mime_type"], "application/pdf")
+        self.assertEqual(data["sha256"], hashlib.sha256(content).hexdigest())
+        self.assertIsNone(data["page_count"])
+
+    def test_list_filters(self):
+        # --- Arrange
+        pdf = self.upload("scan.pdf", b"%PDF-1.4 " + b"x" * 100)
+        png = self.upload("photo.png", PNG)
+        DocumentFile.objects.filter(pk=pdf["id"]).update(page_count=3)
+
+        # --- Act / Assert
+        self.assertEqual(self.list_ids(mime_type="image/*"), {png["id"]})
+        self.assertEqual(self.list_ids(mime_type="application/pdf"), {pdf["id"]})
+        self.assertEqual(self.list_ids(min_size=50), {pdf["id"]})
+        self.assertEqual(self.list_ids(max_size=50), {png["id"]})
+        self.assertEqual(self.list_ids(min_pages=2, max_pages=3), {pdf["id"]})
+        self.assertEqual(self.list_ids(sha256=png["sha256"].upper()), {png["id"]})
+
+    def test_invalid_filter(self):
+        # --- Act
+        response = self.client.get(self.url, {"min_size": "big"})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backfill_command(self):
+        # --- Arrange
+        storage = DocumentFile._meta.get_field("file").storage
+        legacy_name = storage.save("documents/legacy.png", ContentFile(PNG))
+        legacy = DocumentFile.objects.create(
+            document=self.document, uploaded_by=self.user, file=legacy_name
+        )
+        extracted = DocumentFile.objects.create(
+            document=self.document,
+            uploaded_by=self.user,
+            file=storage.save("documents/done.txt", ContentFile(b"text")),
+            status=DocumentFile.Status.DONE,
+        )
+        DocumentFileText.objects.create(file=extracted, page_number=1, content="a")
+        DocumentFileText.objects.create(file=extracted, page_number=2, content="b")
+        missing = DocumentFile.objects.create(
+            document=self.document, uploaded_by=self.user, file="documents/lost.pdf"
+        )
+        stdout = StringIO()
+
+        # --- Act
+        call_command(
+            "backfill_file_metadata", "--batch-size=1", stdout=stdout, stderr=StringIO()
+        )
+
+        # --- Assert
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.size, len(PNG))
+        self.assertEqual(legacy.mime_type, "image/png")
+        self.assertEqual(legacy.sha256, hashlib.sha256(PNG).hexdigest())
+
+        extracted.refresh_from_db()
+        self.assertEqual(extracted.page_count, 2)
+        self.assertEqual(extracted.mime_type, "text/plain")
+
+        missing.refresh_from_db()
+        self.assertIsNone(missing.size)
+        self.assertIn(
+            "Backfilled 2 file(s) and 1 page count(s); 1 file(s) could not be read.",
+            stdout.getvalue(),
+        )
@@ -0,0 +1,235 @@
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from document import pipeline
+from document.models import Document, DocumentFile
+from document.previews import FakePreviewRenderer, PreviewCache, get_preview_cache
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+TEMP_PREVIEW_ROOT = f"{TEMP_MEDIA_ROOT}/previews"
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    DOCUMENT_TEXT_EXTRACTOR="document.extraction.FakeExtractor",
+    DOCUMENT_PREVIEW_RENDERER="document.previews.FakePreviewRenderer",
+    DOCUMENT_PREVIEW_CACHE_DIR=TEMP_PREVIEW_ROOT,
+)
+class DocumentFilePreviewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Scans", owner=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def create_file(self, name: str, content: bytes) -> DocumentFile:
+        return DocumentFile.objects.create(
+            document=self.document,
+            uploaded_by=self.user,
+            file=SimpleUploadedFile(name, content),
+        )
+
+    def preview_url(self, document_file: DocumentFile) -> str:
+        return reverse(
+            "document-files-preview",
+            kwargs={"document_pk": self.document.pk, "pk": document_file.pk},
+        )
+
+    def test_preview_is_rendered_once_then_served_from_cache(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+        url = self.preview_url(document_file)
+
+        # --- Act
+        first = self.client.get(url, {"size": 128})
+        # The cached render no longer needs the original.
+        os.remove(document_file.file.path)
+        second = self.client.get(url, {"size": 128})
+
+        # --- Assert
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(first.streaming_content), b"128:page one")
+        self.assertEqual(first["Content-Type"], "image/jpeg")
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(second.streaming_content), b"128:page one")
+
+    def test_preview_defaults_size_and_supports_conditional_get(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+        url = self.preview_url(document_file)
+
+        # --- Act
+        response = self.client.get(url)
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        # --- Assert
+        self.assertEqual(b"".join(response.streaming_content), b"256:page one")
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_preview_ignores_the_accept_header(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+
+        # --- Act
+        response = self.client.get(
+            self.preview_url(document_file), HTTP_ACCEPT="image/webp,image/*"
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_preview_rejects_unknown_sizes(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+
+        # --- Act
+        response = self.client.get(self.preview_url(document_file), {"size": 5000})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("size", response.json())
+
+    def test_preview_is_scoped_to_owner(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+        self.client.force_authenticate(self.other_user)
+
+        # --- Act
+        response = self.client.get(self.preview_url(document_file))
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(
+        DOCUMENT_PREVIEW_RENDERER="document.previews.DefaultPreviewRenderer"
+    )
+    def test_images_are_downscaled(self):
+        # --- Arrange
+        image = io.BytesIO()
+        Image.new("RGBA", (800, 400), (255, 0, 0, 128)).save(image, "PNG")
+        document_file = self.create_file("photo.png", image.getvalue())
+
+        # --- Act
+        response = self.client.get(self.preview_url(document_file), {"size": 128})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as preview:
+            self.assertEqual(preview.format, "JPEG")
+            self.assertEqual(preview.size, (128, 64))
+
+    @override_settings(
+        DOCUMENT_PREVIEW_RENDERER="document.previews.DefaultPreviewRenderer"
+    )
+    def test_unsupported_file_type_has_no_preview(self):
+        # --- Arrange
+        document_file = self.create_file("notes.txt", b"plain text")
+
+        # --- Act
+        response = self.client.get(self.preview_url(document_file))
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json()["detail"], "No preview for file type: .txt")
+
+    def test_extraction_workers_pregenerate_default_preview(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+
+        # --- Act
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pipeline.run_batch(executor, batch_size=10)
+
+        # --- Assert
+        self.assertTrue(get_preview_cache().path(document_file.sha256, 256).exists())
+
+    def test_identical_contents_share_their_previews(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+        copy = self.create_file("copy.pdf", b"page one")
+        self.client.get(self.preview_url(document_file))
+
+        # --- Act
+        with mock.patch.object(FakePreviewRenderer, "render") as render:
+            response = self.client.get(self.preview_url(copy))
+
+        # --- Assert
+        self.assertEqual(b"".join(response.streaming_content), b"256:page one")
+        render.assert_not_called()
+
+    def test_replaced_content_never_serves_the_old_previews(self):
+        # --- Arrange
+        document_file = self.create_file("scan.pdf", b"page one")
+        old_digest = document_file.sha256
+        url = self.preview_url(document_file)
+        etag = self.client.get(url)["ETag"]
+
+        # --- Act
+        self.client.put(
+            reverse(
+                "document-files-detail",
+                kwargs={"document_pk": self.document.pk, "pk": document_file.pk},
+            ),
+            {"file": SimpleUploadedFile("scan.pdf", b"page two")},
+            format="multipart",
+        )
+        # A render of the old content, started before the replacement,
+        # finishing after it.
+        get_preview_cache().put(old_digest, 256, b"256:page one")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(b"".join(response.streaming_content), b"256:page two")
+
+
+class PreviewCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def age(self, cache: PreviewCache, file_id: str, seconds: int) -> None:
+        path = cache.path(file_id, 128)
+        mtime = path.stat().st_mtime - seconds
+        os.utime(path, (mtime, mtime))
+
+    def test_least_recently_used_entries_are_evicted_over_budget(self):
+        # --- Arrange
+        cache = PreviewCache(self.directory, max_bytes=250)
+        cache.put("aa-first", 128, b"x" * 100)
+        self.age(cache, "aa-first", 30)
+        cache.put("bb-second", 128, b"x" * 100)
+        self.age(cache, "bb-second", 20)
+        # A hit makes the oldest entry the most recently used one.
+        cache.open("aa-first", 128).close()
+
+        # --- Act
+        cache.put("cc-third", 128, b"x" * 100)
+
+        # --- Assert
+        self.assertFalse(cache.path("bb-second", 128).exists())
+        self.assertTrue(cache.path("aa-first", 128).exists())
+        self.assertTrue(cache.path("cc-third", 128).exists())
+        self.assertEqual(cache.usage, 200)
@@ -0,0 +1,384 @@
+"""Query-count budgets for every API route.
+
+Each route is exercised against a small and a large seeded library and must
+run the exact same number of queries in both, so an N+1 introduced by a
+serializer or queryset change fails here instead of in production.
+"""
+
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentFile, DocumentNote, Tag, UploadSession
+from document.previews import get_preview_cache, preview_key
+
+User = get_user_model()
+
+# Authenticated requests always pay for the session and the user lookups.
+SESSION_QUERIES = 2
+
+# Writes to a document or one of its notes rebuild its full-text search entry:
+# read the document and its notes, then replace the index row.
+SEARCH_INDEX_QUERIES = 4
+
+
+class QueryBudgetMixin:
+    """Route budgets shared by every library size.
+
+    Subclasses set ``library_size`` (number of documents); each document gets
+    ``RELATED_PER_DOCUMENT`` files, tags and notes.
+    """
+
+    library_size: int
+    RELATED_PER_DOCUMENT = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient()
+        self.client.login(username="alice", password="pass1234")
+
+        self.tags = [
+            Tag.objects.create(name=f"tag-{index}")
+            for index in range(self.RELATED_PER_DOCUMENT)
+        ]
+        self.documents = [
+            self.seed_document(index) for index in range(self.library_size)
+        ]
+        self.document = self.documents[0]
+        self.file = self.document.files.first()
+        self.note = self.document.notes.first()
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def seed_document(self, index: int) -> Document:
+        document = Document.objects.create(
+            title=f"Document {index}", description="Seeded", owner=self.user
+        )
+
+        for tag in self.tags:
+            document.add_tag(tag, added_by=self.user)
+
+        for file_index in range(self.RELATED_PER_DOCUMENT):
+            DocumentFile.objects.create(
+                document=document,
+                uploaded_by=self.user,
+                file=f"documents/{self.user.pk}/{index}-{file_index}.pdf",
+            )
+            DocumentNote.objects.create(
+                document=document, created_by=self.user, content=f"Note {file_index}"
+            )
+
+        return document
+
+    def assertQueryBudget(self, budget: int, method: str, url: str, data=None):
+        with self.assertNumQueries(SESSION_QUERIES + budget):
+            response = getattr(self.client, method)(url, data)
+
+        self.assertLess(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        return response
+
+    # --- API root
+
+    def test_api_root(self):
+        self.assertQueryBudget(0, "get", reverse("api-root"))
+
+    # --- Tags
+
+    def test_tag_list(self):
+        # Validators + page.
+        self.assertQueryBudget(2, "get", reverse("tag-list"))
+
+    def test_tag_create(self):
+        # Uniqueness check + INSERT.
+        self.assertQueryBudget(2, "post", reverse("tag-list"), {"name": "new"})
+
+    def test_tag_retrieve(self):
+        url = reverse("tag-detail", kwargs={"pk": self.tags[0].pk})
+        self.assertQueryBudget(2, "get", url)
+
+    def test_tag_update(self):
+        url = reverse("tag-detail", kwargs={"pk": self.tags[0].pk})
+        self.assertQueryBudget(3, "patch", url, {"name": "renamed"})
+
+    def test_tag_delete(self):
+        url = reverse("tag-detail", kwargs={"pk": self.tags[0].pk})
+        # Lookup, links collected for their signals, then the DELETEs of the
+        # tag counts, links and tag.
+        self.assertQueryBudget(5, "delete", url)
+
+    def test_tag_autocomplete(self):
+        url = reverse("tag-autocomplete")
+        cache.clear()
+        self.client.get(url, {"prefix": "tag"})
+
+        # Served from the warm in-process index.
+        self.assertQueryBudget(0, "get", url, {"prefix": "tag"})
+
+    def test_tag_facets(self):
+        # One indexed read of the maintained counters.
+        self.assertQueryBudget(1, "get", reverse("tag-facets"))
+
+    # --- Documents
+
+    def test_document_list(self):
+        # Validators, annotated page and tags prefetch.
+        self.assertQueryBudget(3, "get", reverse("document-list"))
+
+    def test_document_list_sparse(self):
+        # Validators and the page, without counts or tags.
+        self.assertQueryBudget(2, "get", reverse("document-list"), {"fields": "title"})
+
+    def test_document_list_expanded(self):
+        # Validators, annotated page, then tags, files and notes prefetches.
+        self.assertQueryBudget(
+            5, "get", reverse("document-list"), {"expand": "tags,files,notes"}
+        )
+
+    def test_document_list_not_modified(self):
+        url = reverse("document-list")
+        etag = self.client.get(url)["ETag"]
+
+        # Only the validators: nothing is loaded or serialized.
+        with self.assertNumQueries(SESSION_QUERIES + 1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_document_create(self):
+        # INSERT + one query per nested relation of the fresh instance.
+        self.assertQueryBudget(
+            4 + SEARCH_INDEX_QUERIES,
+            "post",
+            reverse("document-list"),
+            {"title": "New document"},
+        )
+
+    def test_document_retrieve(self):
+        url = reverse("document-detail", kwargs={"pk": self.document.pk})
+        self.assertQueryBudget(5, "get", url)
+
+    def test_document_retrieve_sparse(self):
+        url = reverse("document-detail", kwargs={"pk": self.document.pk})
+        # Validators and the document, without its relations.
+        self.assertQueryBudget(2, "get", url, {"fields": "title,description"})
+
+    def test_document_retrieve_not_modified(self):
+        url = reverse("document-detail", kwargs={"pk": self.document.pk})
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(SESSION_QUERIES + 1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_document_update(self):
+        url = reverse("document-detail", kwargs={"pk": self.document.pk})
+        self.assertQueryBudget(
+            8 + SEARCH_INDEX_QUERIES, "patch", url, {"title": "Renamed"}
+        )
+
+    def test_document_bulk_tag(self):
+        data = {
+            "document_ids": [document.pk for document in self.documents],
+            "add": ["new", self.tags[0].name],
+            "remove": [self.tags[1].name],
+        }
+        # Document ids, tag lookups (plus INSERT and SELECT of the new one), link
+        # SELECT, INSERT and SELECT of the inserted ones, SELECT and DELETE of
+        # the removed ones, one tag count INSERT and UPDATE, plus the savepoint
+        # around them.
+        self.assertQueryBudget(14, "post", reverse("document-bulk-tag"), data)
+
+    def test_document_delete(self):
+        url = reverse("document-detail", kwargs={"pk": self.document.pk})
+        # Cascades to tags, files (and their pages), notes and upload sessions,
+        # then drops the search index row and updates the tag counts once.
+        self.assertQueryBudget(15, "delete", url)
+
+    def test_document_export(self):
+        url = reverse("document-export")
+
+        # Manifest documents with their tags, notes and files, then the files
+        # again for their bytes. The seeded files have none on disk and are
+        # skipped with a warning.
+        with self.assertLogs("document.export", "WARNING"):
+            with self.assertNumQueries(SESSION_QUERIES + 5):
+                response = self.client.get(url)
+                b"".join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    # --- Document files
+
+    def test_document_file_list(self):
+        url = reverse("document-files-list", kwargs={"document_pk": self.document.pk})
+        self.assertQueryBudget(1, "get", url)
+
+    def test_document_file_create(self):
+        url = reverse("document-files-list", kwargs={"document_pk": self.document.pk})
+        upload = SimpleUploadedFile("scan.pdf", b"%PDF-1.4 content")
+
+        # Pending extractions count (admission control), document lookup, blob
+        # lookup and INSERT (holding the file's reference), file INSERT, plus
+        # the savepoints around them.
+        with override_settings(MEDIA_ROOT=self.media_root):
+            self.assertQueryBudget(9, "post", url, {"file": upload})
+
+    def test_document_file_retrieve(self):
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.document.pk, "pk": self.file.pk},
+        )
+        self.assertQueryBudget(1, "get", url)
+
+    @override_settings(DOCUMENT_SENDFILE_BACKEND="x-accel-redirect")
+    def test_document_file_download(self):
+        url = reverse(
+            "document-files-download",
+            kwargs={"document_pk": self.document.pk, "pk": self.file.pk},
+        )
+        # File, document and blob in a single query.
+        self.assertQueryBudget(1, "get", url)
+
+    def test_document_file_preview(self):
+        url = reverse(
+            "document-files-preview",
+            kwargs={"document_pk": self.document.pk, "pk": self.file.pk},
+        )
+        preview_root = f"{self.media_root}/previews"
+
+        with override_settings(DOCUMENT_PREVIEW_CACHE_DIR=preview_root):
+            get_preview_cache().put(
+                preview_key(self.file.sha256, str(self.file.pk)), 256, b"preview"
+            )
+
+            # Cache hits only need the ownership-checked file lookup.
+            self.assertQueryBudget(1, "get", url)
+
+    def test_document_file_delete(self):
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.document.pk, "pk": self.file.pk},
+        )
+        # DELETE of the file and of its extracted pages.
+        self.assertQueryBudget(3, "delete", url)
+
+    # --- Resumable uploads
+
+    def create_upload_session(self, size: int) -> UploadSession:
+        return UploadSession.objects.create(
+            document=self.document,
+            created_by=self.user,
+            filename="scan.pdf",
+            size=size,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_upload_session_create(self):
+        url = reverse("document-uploads-list", kwargs={"document_pk": self.document.pk})
+        self.assertQueryBudget(2, "post", url, {"filename": "scan.pdf", "size": 10})
+
+    def test_upload_session_retrieve(self):
+        session = self.create_upload_session(size=10)
+        url = reverse(
+            "document-uploads-detail",
+            kwargs={"document_pk": self.document.pk, "pk": session.pk},
+        )
+        self.assertQueryBudget(1, "get", url)
+
+    def test_upload_session_chunk(self):
+        session = self.create_upload_session(size=4)
+        url = reverse(
+            "document-uploads-chunk",
+            kwargs={"document_pk": self.document.pk, "pk": session.pk, "index": 0},
+        )
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            with self.assertNumQueries(SESSION_QUERIES + 4):
+                response = self.client.put(
+                    url,
+                    b"data",
+                    content_type="application/octet-stream",
+                    HTTP_CONTENT_RANGE="bytes 0-3/4",
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_upload_session_complete(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            session = self.create_upload_session(size=4)
+            session.part_path.parent.mkdir(parents=True)
+            session.part_path.write_bytes(b"data")
+            session.received_bytes = 4
+            session.save()
+
+            url = reverse(
+                "document-uploads-complete",
+                kwargs={"document_pk": self.document.pk, "pk": session.pk},
+            )
+            # Pending extractions count, session and document lookups, the
+            # blob-backed file INSERT (see test_document_file_create) and the
+            # session DELETE.
+            self.assertQueryBudget(11, "post", url)
+
+    def test_upload_session_delete(self):
+        session = self.create_upload_session(size=10)
+        url = reverse(
+            "document-uploads-detail",
+            kwargs={"document_pk": self.document.pk, "pk": session.pk},
+        )
+        self.assertQueryBudget(2, "delete", url)
+
+    # --- Document notes
+
+    def test_document_note_list(self):
+        url = reverse("document-notes-list", kwargs={"document_pk": self.document.pk})
+        self.assertQueryBudget(2, "get", url)
+
+    def test_document_note_create(self):
+        url = reverse("document-notes-list", kwargs={"document_pk": self.document.pk})
+        self.assertQueryBudget(
+            2 + SEARCH_INDEX_QUERIES, "post", url, {"content": "Another note"}
+        )
+
+    def test_document_note_retrieve(self):
+        url = reverse(
+            "document-notes-detail",
+            kwargs={"document_pk": self.document.pk, "pk": self.note.pk},
+        )
+        self.assertQueryBudget(2, "get", url)
+
+    def test_document_note_update(self):
+        url = reverse(
+            "document-notes-detail",
+            kwargs={"document_pk": self.document.pk, "pk": self.note.pk},
+        )
+        self.assertQueryBudget(
+            2 + SEARCH_INDEX_QUERIES, "patch", url, {"content": "Edited"}
+        )
+
+    def test_document_note_delete(self):
+        url = reverse(
+            "document-notes-detail",
+            kwargs={"document_pk": self.document.pk, "pk": self.note.pk},
+        )
+        self.assertQueryBudget(2 + SEARCH_INDEX_QUERIES, "delete", url)
+
+
+class SmallLibraryQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    library_size = 2
+
+
+class LargeLibraryQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    library_size = 25
@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APITestCase
+
+from config.database import REPLICA_ALIAS, PrimaryReplicaRouter, _read_from_replica
+from document import pipeline, responsecache
+from document.models import Document, DocumentFile, Tag
+
+User = get_user_model()
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Lease", owner=self.user)
+        self.tag = Tag.objects.create(name="home")
+        self.document.add_tag(self.tag, added_by=self.user)
+        self.list_url = reverse("document-list")
+        self.detail_url = reverse("document-detail", kwargs={"pk": self.document.pk})
+
+    def get(self, url: str):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response
+
+    def test_second_request_is_a_hit(self):
+        # --- Act
+        first = self.get(self.list_url)
+        second = self.get(self.list_url)
+
+        # --- Assert
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+
+    def test_hits_do_not_build_the_payload(self):
+        # --- Arrange
+        self.get(self.detail_url)
+
+        # --- Act
+        with self.assertNumQueries(1):
+            # Only the conditional GET validators.
+            response = self.get(self.detail_url)
+
+        # --- Assert
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()["title"], "Lease")
+
+    def test_writes_invalidate_the_owner_responses(self):
+        # --- Arrange
+        self.get(self.detail_url)
+        notes_url = reverse(
+            "document-notes-list", kwargs={"document_pk": self.document.pk}
+        )
+
+        # --- Act
+        changes = [
+            lambda: self.client.patch(self.detail_url, {"title": "Lease 2024"}),
+            lambda: self.client.post(notes_url, {"content": "Signed"}),
+            lambda: DocumentFile.objects.create(
+                document=self.document, uploaded_by=self.user, file="lease.pdf"
+            ),
+            lambda: self.document.tags.clear(),
+            lambda: self.tag.save(),
+        ]
+        cache_statuses = []
+        for change in changes:
+            change()
+            cache_statuses.append(self.get(self.detail_url)["X-Cache"])
+
+        # --- Assert
+        self.assertEqual(cache_statuses, ["MISS"] * len(changes))
+        data = self.get(self.detail_url).json()
+        self.assertEqual(data["title"], "Lease 2024")
+        self.assertEqual(len(data["notes"]), 1)
+        self.assertEqual(len(data["files"]), 1)
+        self.assertEqual(data["tags"], [])
+
+    def test_other_users_writes_keep_the_cache(self):
+        # --- Arrange
+        self.get(self.list_url)
+
+        # --- Act
+        Document.objects.create(title="Invoice", owner=self.other_user)
+        response = self.get(self.list_url)
+
+        # --- Assert
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_extraction_status_updates_invalidate(self):
+        # --- Arrange
+        document_file = DocumentFile.objects.create(
+            document=self.document, uploaded_by=self.user, file="lease.pdf"
+        )
+        self.get(self.detail_url)
+
+        # --- Act
+        [claimed] = pipeline.claim_pending_files(10)
+        pipeline.save_pages(claimed, ["page one", "page two"])
+        response = self.get(self.detail_url)
+
+        # --- Assert
+        self.assertEqual(response["X-Cache"], "MISS")
+        [file_data] = response.json()["files"]
+        self.assertEqual(file_data["id"], str(document_file.pk))
+        self.assertEqual(file_data["status"], DocumentFile.Status.DONE)
+        self.assertEqual(file_data["page_count"], 2)
+
+    def test_generation_is_bumped_again_on_commit(self):
+        # --- Arrange
+        before, _ = responsecache.get_generations(self.user.pk)
+
+        # --- Act
+        with self.captureOnCommitCallbacks(execute=True):
+            responsecache.invalidate_user(self.user.pk)
+            during, _ = responsecache.get_generations(self.user.pk)
+        after, _ = responsecache.get_generations(self.user.pk)
+
+        # --- Assert
+        self.assertEqual(during, before + 1)
+        self.assertEqual(after, before + 2)
+
+    def test_evicted_generation_restarts_above_old_values(self):
+        # --- Arrange
+        before, _ = responsecache.get_generations(self.user.pk)
+        cache.delete(responsecache.user_generation_key(self.user.pk))
+
+        # --- Act
+        after, _ = responsecache.get_generations(self.user.pk)
+
+        # --- Assert
+        self.assertGreater(after, before)
+
+    def test_stats_for_staff_only(self):
+        # --- Arrange
+        self.get(self.list_url)
+        self.get(self.list_url)
+        self.get(self.detail_url)
+        url = reverse("document-cache-stats")
+
+        # --- Act
+        forbidden = self.client.get(url)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+
+        # --- Assert
+        self.assertEqual(forbidden.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json(), {"hits": 1, "misses": 2, "hit_ratio": 1 / 3})
+
+
+class LaggingReplicaTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+        replica = mock.patch.dict(
+            connections.databases, {REPLICA_ALIAS: connections.databases["default"]}
+        )
+        replica.start()
+        self.addCleanup(replica.stop)
+
+        # What the middleware does for a read-only action.
+        token = _read_from_replica.set(True)
+        self.addCleanup(_read_from_replica.reset, token)
+
+        self.request = RequestFactory().get("/documents/1/")
+        self.request.user = SimpleNamespace(pk=1)
+        self.mixin = responsecache.CachedResponseMixin()
+
+    def view(self, request) -> Response:
+        # The replica has not caught up with the latest write yet.
+        if PrimaryReplicaRouter().db_for_read(None) == REPLICA_ALIAS:
+            return Response({"title": "Lease (old)"})
+
+        return Response({"title": "Lease"})
+
+    def test_misses_are_read_from_the_primary(self):
+        # --- Act
+        miss = self.mixin.cached_response(self.view, self.request)
+        hit = self.mixin.cached_response(self.view, self.request)
+
+        # --- Assert
+        self.assertEqual(miss.data, {"title": "Lease"})
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.data, {"title": "Lease"})
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(None), REPLICA_ALIAS)
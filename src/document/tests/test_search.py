@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentNote
+
+User = get_user_model()
+
+
+class DocumentSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.login(username="alice", password="pass1234")
+
+        self.url = reverse("document-search")
+
+    def search(self, query: str) -> list[dict]:
+        response = self.client.get(self.url, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response.json()["results"]
+
+    def test_search_matches_title_description_and_notes(self):
+        # --- Arrange
+        by_title = Document.objects.create(title="Electricity invoice", owner=self.user)
+        by_description = Document.objects.create(
+            title="Scan", description="Water invoice for March", owner=self.user
+        )
+        by_note = Document.objects.create(title="Receipt", owner=self.user)
+        DocumentNote.objects.create(
+            document=by_note, created_by=self.user, content="Paid the invoice"
+        )
+        Document.objects.create(title="Passport", owner=self.user)
+
+        # --- Act
+        results = self.search("invoice")
+
+        # --- Assert
+        self.assertEqual(
+            [result["id"] for result in results],
+            [by_title.pk, by_description.pk, by_note.pk],
+        )
+
+    def test_search_is_scoped_to_owner(self):
+        # --- Arrange
+        Document.objects.create(title="Secret contract", owner=self.other_user)
+        own = Document.objects.create(title="Rental contract", owner=self.user)
+
+        # --- Act
+        results = self.search("contract")
+
+        # --- Assert
+        self.assertEqual([result["id"] for result in results], [own.pk])
+
+    def test_search_matches_prefixes_and_ignores_accents(self):
+        # --- Arrange
+        document = Document.objects.create(
+            title="Declaración de renta", owner=self.user
+        )
+
+        # --- Act
+        results = self.search("declaracion ren")
+
+        # --- Assert
+        self.assertEqual([result["id"] for result in results], [document.pk])
+
+    def test_index_follows_note_and_document_changes(self):
+        # --- Arrange
+        document = Document.objects.create(title="Lease", owner=self.user)
+        note = DocumentNote.objects.create(
+            document=document, created_by=self.user, content="Landlord phone"
+        )
+
+        # --- Act
+        note.content = "Agency phone"
+        note.save()
+        after_edit = self.search("landlord")
+        after_edit_new_term = self.search("agency")
+
+        document.delete()
+        after_delete = self.search("lease")
+
+        # --- Assert
+        self.assertEqual(after_edit, [])
+        self.assertEqual(len(after_edit_new_term), 1)
+        self.assertEqual(after_delete, [])
+
+    def test_search_is_paginated(self):
+        # --- Arrange
+        for index in range(3):
+            Document.objects.create(title=f"Bank statement {index}", owner=self.user)
+
+        # --- Act
+        response = self.client.get(self.url, {"q": "statement", "page_size": 2})
+        data = response.json()
+
+        # --- Assert
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIsNotNone(data["next"])
+
+    def test_search_requires_query(self):
+        # --- Act
+        response = self.client.get(self.url)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("q", response.json())
@@ -0,0 +1,210 @@
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document import similarity
+from document.models import Document, DocumentFile, DocumentFileText, DocumentNote
+from document.pipeline import save_pages
+from document.similarity import UserMatrix
+
+User = get_user_model()
+
+
+class EmbeddingTests(SimpleTestCase):
+    def test_embeddings_are_unit_length_and_stable(self):
+        # --- Act
+        vector = similarity.embed("Lease", "Flat lease signed in Lyon")
+
+        # --- Assert
+        self.assertEqual(vector.dtype, np.float32)
+        self.assertEqual(vector.shape, (similarity.DIMENSIONS,))
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        np.testing.assert_array_equal(
+            vector, similarity.embed("Lease", "Flat lease signed in Lyon")
+        )
+        self.assertFalse(similarity.embed("", "a 12 of").any())
+
+    def test_shared_words_score_higher(self):
+        # --- Arrange
+        lease = similarity.embed("Flat lease", "rent deposit landlord tenant")
+        other_lease = similarity.embed("Lease renewal", "landlord rent increase")
+        invoice = similarity.embed("Invoice", "plumber boiler repair parts labour")
+
+        # --- Act / Assert
+        self.assertGreater(float(lease @ other_lease), float(lease @ invoice))
+
+
+class UserMatrixTests(SimpleTestCase):
+    def setUp(self):
+        self.matrix = UserMatrix(1)
+
+    def vectors(self, document_ids) -> dict[int, np.ndarray]:
+        return {
+            document_id: similarity.embed(f"Document {document_id}", "shared words")
+            for document_id in document_ids
+        }
+
+    def test_rows_are_updated_in_place_and_reused(self):
+        # --- Arrange
+        self.matrix.write(self.vectors(range(1, 201)))
+        self.matrix.write(self.vectors(range(201, 301)))
+        rows = self.matrix.rows()
+
+        # --- Act
+        self.matrix.write(self.vectors([5]))
+        self.matrix.remove([7, 8])
+        self.matrix.write(self.vectors([1001, 1002]))
+
+        # --- Assert
+        self.assertEqual(rows, 2 * similarity.MIN_ROWS)
+        self.assertEqual(self.matrix.rows(), rows)
+        ids, _ = self.matrix.open()
+        self.assertEqual(int((ids > 0).sum()), 300)
+        self.assertEqual(list(ids[[4, 6, 7]]), [5, 1001, 1002])
+
+    def test_nearest_rows_best_first(self):
+        # --- Arrange
+        self.matrix.write(
+            {
+                1: similarity.embed("Lease", "rent deposit landlord"),
+                2: similarity.embed("Lease", "rent deposit"),
+                3: similarity.embed("Lease", "landlord"),
+                4: similarity.embed("Boiler", "plumber repair"),
+            }
+        )
+
+        # --- Act
+        hits = self.matrix.nearest(1, limit=2)
+
+        # --- Assert
+        self.assertEqual([document_id for document_id, _ in hits], [2, 3])
+        self.assertGreater(hits[0][1], hits[1][1])
+        self.assertIsNone(self.matrix.nearest(99, limit=2))
+
+
+class SimilarDocumentsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lease = Document.objects.create(
+                title="Flat lease", description="Rent and deposit", owner=self.user
+            )
+            self.renewal = Document.objects.create(
+                title="Lease renewal", description="Rent increase", owner=self.user
+            )
+            self.invoice = Document.objects.create(
+                title="Boiler invoice", description="Plumber repair", owner=self.user
+            )
+            Document.objects.create(
+                title="Flat lease", description="Rent and deposit", owner=self.other
+            )
+
+    def get_similar(self, document: Document, **params):
+        url = reverse("document-similar", kwargs={"pk": document.pk})
+
+        return self.client.get(url, params)
+
+    def test_returns_the_owners_closest_documents(self):
+        # --- Act
+        response = self.get_similar(self.lease)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [result] = response.data["results"]
+        self.assertEqual(result["id"], self.renewal.pk)
+        self.assertEqual(result["title"], "Lease renewal")
+        self.assertGreater(result["score"], 0)
+        self.assertIn("file_count", result)
+
+    def test_notes_and_file_text_count(self):
+        # --- Arrange
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentNote.objects.create(
+                document=self.invoice, created_by=self.user, content="Lease deposit"
+            )
+            document_file = DocumentFile.objects.create(
+                document=self.lease,
+                uploaded_by=self.user,
+                file="documents/lease.pdf",
+                status=DocumentFile.Status.PROCESSING,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            save_pages(document_file, ["boiler plumber repair clause"])
+
+        # --- Act
+        response = self.get_similar(self.lease, limit=5)
+
+        # --- Assert
+        self.assertIn(
+            self.invoice.pk, [result["id"] for result in response.data["results"]]
+        )
+        self.assertTrue(DocumentFileText.objects.filter(file=document_file).exists())
+
+    def test_deleted_documents_are_left_out(self):
+        # --- Arrange
+        with self.captureOnCommitCallbacks(execute=True):
+            self.renewal.delete()
+
+        # --- Act
+        response = self.get_similar(self.lease)
+
+        # --- Assert
+        self.assertEqual(response.data["results"], [])
+
+    def test_document_without_embedding_is_embedded_on_request(self):
+        # --- Arrange
+        UserMatrix(self.user.pk).remove([self.lease.pk])
+
+        # --- Act
+        response = self.get_similar(self.lease)
+
+        # --- Assert
+        self.assertEqual(
+            [result["id"] for result in response.data["results"]], [self.renewal.pk]
+        )
+
+    def test_other_users_documents_are_not_found(self):
+        # --- Arrange
+        foreign = Document.objects.get(owner=self.other)
+
+        # --- Act
+        response = self.get_similar(foreign)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fields_and_limit(self):
+        # --- Act
+        response = self.get_similar(self.lease, fields="title,score", limit=1)
+        invalid = self.get_similar(self.lease, limit=0)
+
+        # --- Assert
+        [result] = response.data["results"]
+        self.assertEqual(set(result), {"id", "title", "score", "updated_at"})
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        # --- Arrange
+        UserMatrix(self.user.pk).clear()
+        output = StringIO()
+
+        # --- Act
+        call_command("rebuild_similarity_index", user_ids=[self.user.pk], stdout=output)
+
+        # --- Assert
+        self.assertIn("Embedded 3 document(s).", output.getvalue())
+        ids, _ = UserMatrix(self.user.pk).open()
+        self.assertEqual(
+            sorted(int(document_id) for document_id in ids if document_id),
+            sorted([self.lease.pk, self.renewal.pk, self.invoice.pk]),
+        )
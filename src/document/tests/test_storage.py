@@ -0,0 +1,192 @@
+import hashlib
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from document.models import Document, DocumentFile, FileBlob
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+CONTENT = b"%PDF-1.4 scanned invoice"
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DeduplicatedStorageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+
+        self.document = Document.objects.create(title="Invoice", owner=self.user)
+        self.other_document = Document.objects.create(
+            title="Invoice copy", owner=self.other_user
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def upload(self, user, document: Document, content: bytes) -> DocumentFile:
+        self.client.force_authenticate(user)
+        url = reverse("document-files-list", kwargs={"document_pk": document.pk})
+        response = self.client.post(
+            url,
+            {"file": SimpleUploadedFile("invoice.PDF", content)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return DocumentFile.objects.get(pk=response.json()["id"])
+
+    def test_identical_uploads_share_one_blob(self):
+        # --- Act
+        first = self.upload(self.user, self.document, CONTENT)
+        second = self.upload(self.other_user, self.other_document, CONTENT)
+
+        # --- Assert
+        blob = FileBlob.objects.get()
+        digest = hashlib.sha256(CONTENT).hexdigest()
+
+        self.assertEqual(blob.sha256, digest)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.size, len(CONTENT))
+        self.assertEqual(
+            first.file.name, f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.pdf"
+        )
+        self.assertEqual(first.file.name, second.file.name)
+
+    def test_ownership_is_kept_per_document_file(self):
+        # --- Arrange
+        other_file = self.upload(self.other_user, self.other_document, CONTENT)
+        self.upload(self.user, self.document, CONTENT)
+
+        url = reverse(
+            "document-files-detail",
+            kwargs={"document_pk": self.other_document.pk, "pk": other_file.pk},
+        )
+
+        # --- Act
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_blob_is_deleted_with_its_last_reference(self):
+        # --- Arrange
+        first = self.upload(self.user, self.document, CONTENT)
+        second = self.upload(self.other_user, self.other_document, CONTENT)
+        name = first.file.name
+
+        # --- Act / Assert
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.document.delete()
+
+        self.assertFalse(FileBlob.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_blob_released_while_stored_again_is_recreated(self):
+        # --- Arrange
+        first = self.upload(self.user, self.document, CONTENT)
+        filter_blobs = FileBlob.objects.filter
+        released = []
+
+        def release_after_lookup(*args, **kwargs):
+            queryset = filter_blobs(*args, **kwargs)
+            if "sha256" not in kwargs or released:
+                return queryset
+            # The last reference goes away between the lookup and the upload
+            # taking its own.
+            blob = queryset.first()
+            first.delete()
+            released.append(blob)
+
+            return mock.Mock(first=lambda: blob)
+
+        # --- Act
+        with mock.patch.object(FileBlob.objects, "filter", release_after_lookup):
+            second = self.upload(self.other_user, self.other_document, CONTENT)
+
+        # --- Assert
+        blob = FileBlob.objects.get()
+        self.assertNotEqual(blob.pk, released[0].pk)
+        self.assertEqual(blob.ref_count, 1)
+        self.assertEqual(second.blob_id, blob.pk)
+
+    def test_content_stored_again_before_the_release_commits_is_kept(self):
+        # --- Arrange
+        first = self.upload(self.user, self.document, CONTENT)
+
+        # --- Act
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            second = self.upload(self.other_user, self.other_document, CONTENT)
+
+        # --- Assert
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+        with second.file.open("rb") as handle:
+            self.assertEqual(handle.read(), CONTENT)
+
+    def test_failed_save_leaves_no_stored_bytes(self):
+        # --- Arrange
+        document_file = DocumentFile(
+            document=self.document,
+            uploaded_by_id=None,
+            file=SimpleUploadedFile("invoice.pdf", CONTENT),
+        )
+
+        # --- Act
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError):
+                document_file.save()
+
+        # --- Assert
+        self.assertFalse(FileBlob.objects.exists())
+        self.assertFalse(default_storage.exists(document_file.file.name))
+
+    def test_command_migrates_legacy_files(self):
+        # --- Arrange
+        legacy_names = []
+        for index, document in enumerate([self.document, self.other_document]):
+            name = default_storage.save(
+                f"documents/{document.owner_id}/legacy-{index}.pdf",
+                ContentFile(CONTENT),
+            )
+            DocumentFile.objects.create(
+                document=document, uploaded_by=document.owner, file=name
+            )
+            legacy_names.append(name)
+
+        stdout = StringIO()
+
+        # --- Act
+        call_command("deduplicate_files", stdout=stdout)
+
+        # --- Assert
+        blob = FileBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertFalse(DocumentFile.objects.filter(blob__isnull=True).exists())
+        self.assertTrue(default_storage.exists(blob.file.name))
+        for name in legacy_names:
+            self.assertFalse(default_storage.exists(name))
+        self.assertIn(f"{len(CONTENT)} bytes reclaimed", stdout.getvalue())
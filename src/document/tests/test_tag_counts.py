@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentTag, Tag, UserTagCount
+
+User = get_user_model()
+
+
+class TagCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.finance = Tag.objects.create(name="finance")
+        self.travel = Tag.objects.create(name="travel")
+        self.documents = [
+            Document.objects.create(title=f"Document {index}", owner=self.user)
+            for index in range(3)
+        ]
+
+    def counts(self, user=None) -> dict[str, int]:
+        return dict(
+            UserTagCount.objects.filter(user=user or self.user).values_list(
+                "tag__name", "count"
+            )
+        )
+
+    def test_add_tag_increments_the_owner_count(self):
+        # --- Act
+        for document in self.documents[:2]:
+            document.add_tag(self.finance, added_by=self.user)
+        self.documents[0].add_tag(self.travel, added_by=self.user)
+
+        # --- Assert
+        self.assertEqual(self.counts(), {"finance": 2, "travel": 1})
+        self.assertEqual(self.counts(self.other_user), {})
+
+    def test_bulk_tag_counts_added_and_removed_links(self):
+        # --- Arrange
+        self.documents[0].add_tag(self.finance, added_by=self.user)
+        document_ids = [document.pk for document in self.documents]
+
+        # --- Act
+        self.client.post(
+            reverse("document-bulk-tag"),
+            {"document_ids": document_ids, "add": ["travel"], "remove": ["finance"]},
+            format="json",
+        )
+
+        # --- Assert
+        self.assertEqual(self.counts(), {"finance": 0, "travel": 3})
+
+    def test_deleting_links_and_documents_decrements(self):
+        # --- Arrange
+        for document in self.documents:
+            document.add_tag(self.finance, added_by=self.user)
+            document.add_tag(self.travel, added_by=self.user)
+
+        # --- Act
+        DocumentTag.objects.get(document=self.documents[0], tag=self.travel).delete()
+        self.client.delete(
+            reverse("document-detail", kwargs={"pk": self.documents[1].pk})
+        )
+        Document.objects.filter(pk=self.documents[2].pk).delete()
+
+        # --- Assert
+        self.assertEqual(self.counts(), {"finance": 1, "travel": 0})
+
+    def test_deleting_a_tag_deletes_its_counts(self):
+        # --- Arrange
+        self.documents[0].add_tag(self.finance, added_by=self.user)
+        self.documents[0].add_tag(self.travel, added_by=self.user)
+
+        # --- Act
+        self.finance.delete()
+
+        # --- Assert
+        self.assertEqual(self.counts(), {"travel": 1})
+
+    def test_facets_list_the_user_tags_by_count(self):
+        # --- Arrange
+        self.documents[0].add_tag(self.travel, added_by=self.user)
+        for document in self.documents[:2]:
+            document.add_tag(self.finance, added_by=self.user)
+        other_document = Document.objects.create(title="Other", owner=self.other_user)
+        other_document.add_tag(Tag.objects.create(name="private"), self.other_user)
+        DocumentTag.objects.get(document=self.documents[0], tag=self.travel).delete()
+        self.documents[2].add_tag(self.travel, added_by=self.user)
+
+        # --- Act
+        response = self.client.get(reverse("tag-facets"))
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {"id": self.finance.pk, "name": "finance", "count": 2},
+                {"id": self.travel.pk, "name": "travel", "count": 1},
+            ],
+        )
+
+    def test_rebuild_command_repairs_drift(self):
+        # --- Arrange
+        for document in self.documents:
+            document.add_tag(self.finance, added_by=self.user)
+        UserTagCount.objects.filter(user=self.user).update(count=7)
+        UserTagCount.objects.create(user=self.other_user, tag=self.travel, count=2)
+        stdout = StringIO()
+
+        # --- Act
+        call_command("rebuild_tag_counts", stdout=stdout)
+
+        # --- Assert
+        self.assertEqual(self.counts(), {"finance": 3})
+        self.assertEqual(self.counts(self.other_user), {})
+        self.assertIn("Wrote 1 tag count(s); 2 were out of date.", stdout.getvalue())
+
+    def test_rebuild_command_can_target_users(self):
+        # --- Arrange
+        self.documents[0].add_tag(self.finance, added_by=self.user)
+        UserTagCount.objects.all().delete()
+
+        # --- Act
+        call_command("rebuild_tag_counts", user=[self.other_user.pk], stdout=StringIO())
+
+        # --- Assert
+        self.assertEqual(self.counts(), {})
@@ -0,0 +1,217 @@
+import sqlite3
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from document.models import Document, DocumentTag, Tag, UserTagCount
+
+User = get_user_model()
+
+
+class BulkTagTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.url = reverse("document-bulk-tag")
+        self.documents = [
+            Document.objects.create(title=f"Document {index}", owner=self.user)
+            for index in range(3)
+        ]
+        self.finance = Tag.objects.create(name="finance")
+        self.documents[0].add_tag(self.finance, added_by=self.user)
+
+    def tag_names(self, document: Document) -> set[str]:
+        return set(document.tags.values_list("name", flat=True))
+
+    def test_add_creates_missing_tags_and_skips_existing_links(self):
+        # --- Arrange
+        document_ids = [document.pk for document in self.documents]
+
+        # --- Act
+        response = self.client.post(
+            self.url,
+            {"document_ids": document_ids, "add": ["finance", "2024"]},
+            format="json",
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"][:2],
+            [
+                {
+                    "id": document_ids[0],
+                    "status": "ok",
+                    "added": ["2024"],
+                    "removed": [],
+                },
+                {
+                    "id": document_ids[1],
+                    "status": "ok",
+                    "added": ["finance", "2024"],
+                    "removed": [],
+                },
+            ],
+        )
+        for document in self.documents:
+            self.assertEqual(self.tag_names(document), {"finance", "2024"})
+        self.assertEqual(Tag.objects.filter(name="2024").count(), 1)
+
+    def test_add_and_remove_in_one_request(self):
+        # --- Arrange
+        document = self.documents[0]
+
+        # --- Act
+        response = self.client.post(
+            self.url,
+            {"document_ids": [document.pk], "add": ["taxes"], "remove": ["finance"]},
+            format="json",
+        )
+
+        # --- Assert
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "id": document.pk,
+                    "status": "ok",
+                    "added": ["taxes"],
+                    "removed": ["finance"],
+                }
+            ],
+        )
+        self.assertEqual(self.tag_names(document), {"taxes"})
+
+    def test_links_created_concurrently_are_not_counted(self):
+        # --- Arrange
+        document = self.documents[1]
+        bulk_create = DocumentTag.objects.bulk_create
+
+        def create_concurrent_link_first(links, **kwargs):
+            # Committed by another request after the existing links were read.
+            bulk_create(
+                [DocumentTag(document=document, tag=self.finance, added_by=self.user)]
+            )
+            return bulk_create(links, **kwargs)
+
+        # --- Act
+        with mock.patch.object(
+            DocumentTag.objects, "bulk_create", create_concurrent_link_first
+        ):
+            response = self.client.post(
+                self.url,
+                {"document_ids": [document.pk], "add": ["finance"]},
+                format="json",
+            )
+
+        # --- Assert
+        self.assertEqual(response.json()["results"][0]["added"], [])
+        # The link of setUp: the concurrent writer counts its own.
+        self.assertEqual(
+            UserTagCount.objects.get(user=self.user, tag=self.finance).count, 1
+        )
+
+    @skipUnless(connection.vendor == "sqlite", "Lowers an SQLite limit.")
+    def test_removing_more_links_than_query_parameters(self):
+        # --- Arrange
+        connection.ensure_connection()
+        limit = sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER
+        default = connection.connection.setlimit(limit, 999)
+        self.addCleanup(connection.connection.setlimit, limit, default)
+        documents = Document.objects.bulk_create(
+            Document(title=f"Bulk {index}", owner=self.user) for index in range(300)
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"tag-{index}") for index in range(4))
+        DocumentTag.objects.bulk_create(
+            DocumentTag(document=document, tag=tag, added_by=self.user)
+            for document in documents
+            for tag in tags
+        )
+
+        # --- Act
+        response = self.client.post(
+            self.url,
+            {
+                "document_ids": [document.pk for document in documents],
+                "remove": [tag.name for tag in tags],
+            },
+            format="json",
+        )
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(DocumentTag.objects.filter(tag__in=tags).exists())
+
+    def test_other_users_documents_are_reported_not_found(self):
+        # --- Arrange
+        foreign = Document.objects.create(title="Not mine", owner=self.other_user)
+
+        # --- Act
+        response = self.client.post(
+            self.url,
+            {"document_ids": [foreign.pk, self.documents[1].pk], "add": ["finance"]},
+            format="json",
+        )
+
+        # --- Assert
+        results = response.json()["results"]
+        self.assertEqual(results[0], {"id": foreign.pk, "status": "not_found"})
+        self.assertEqual(results[1]["status"], "ok")
+        self.assertFalse(DocumentTag.objects.filter(document=foreign).exists())
+
+    def test_removing_unknown_tags_does_not_create_them(self):
+        # --- Act
+        response = self.client.post(
+            self.url,
+            {"document_ids": [self.documents[0].pk], "remove": ["unknown"]},
+            format="json",
+        )
+
+        # --- Assert
+        self.assertEqual(response.json()["results"][0]["removed"], [])
+        self.assertFalse(Tag.objects.filter(name="unknown").exists())
+
+    def test_bulk_tag_validation(self):
+        # --- Arrange
+        document_id = self.documents[0].pk
+        payloads = [
+            {"document_ids": [], "add": ["a"]},
+            {"document_ids": [document_id]},
+            {"document_ids": [document_id], "add": ["a"], "remove": ["a"]},
+        ]
+
+        for payload in payloads:
+            # --- Act
+            response = self.client.post(self.url, payload, format="json")
+
+            # --- Assert
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_tag_query_count_does_not_grow_with_documents(self):
+        # --- Arrange
+        documents = [
+            Document.objects.create(title=f"Bulk {index}", owner=self.user)
+            for index in range(50)
+        ]
+        payload = {
+            "document_ids": [document.pk for document in documents],
+            "add": ["a", "b", "c"],
+        }
+
+        # --- Act / Assert
+        # Document ids, tag lookup then INSERT and SELECT of the missing ones,
+        # link SELECT, INSERT and SELECT of the inserted ones, tag count INSERT
+        # and UPDATE, plus the savepoint around them.
+        with self.assertNumQueries(11):
+            self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(
+            DocumentTag.objects.filter(document__in=documents).count(), 150
+        )
@@ -0,0 +1,201 @@
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from document import uploads, views
+from document.models import Document, DocumentFile, UploadSession
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+CONTENT = b"%PDF-1.4 " + b"x" * 90
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other_user = User.objects.create_user(username="bob", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Large scan", owner=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def create_session(self, size: int = len(CONTENT)) -> dict:
+        url = reverse("document-uploads-list", kwargs={"document_pk": self.document.pk})
+        response = self.client.post(url, {"filename": "scan.pdf", "size": size})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return response.json()
+
+    def put_chunk(
+        self,
+        session_id: str,
+        index: int,
+        start: int,
+        data: bytes,
+        total: int = len(CONTENT),
+    ):
+        url = reverse(
+            "document-uploads-chunk",
+            kwargs={"document_pk": self.document.pk, "pk": session_id, "index": index},
+        )
+
+        return self.client.put(
+            url,
+            data,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(data) - 1}/{total}",
+        )
+
+    def complete(self, session_id: str, **data):
+        url = reverse(
+            "document-uploads-complete",
+            kwargs={"document_pk": self.document.pk, "pk": session_id},
+        )
+
+        return self.client.post(url, data)
+
+    def test_chunks_are_assembled_into_a_document_file(self):
+        # --- Arrange
+        session = self.create_session()
+
+        # --- Act
+        self.put_chunk(session["id"], 0, 0, CONTENT[:40])
+        progress = self.put_chunk(session["id"], 1, 40, CONTENT[40:]).json()
+        response = self.complete(
+            session["id"], sha256=hashlib.sha256(CONTENT).hexdigest()
+        )
+
+        # --- Assert
+        self.assertEqual(progress["received_bytes"], len(CONTENT))
+        self.assertEqual(progress["chunk_count"], 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        document_file = DocumentFile.objects.get(pk=response.json()["id"])
+        self.assertEqual(document_file.document, self.document)
+        with document_file.file.open("rb") as handle:
+            self.assertEqual(handle.read(), CONTENT)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_retried_chunk_is_acknowledged_and_out_of_order_chunk_rejected(self):
+        # --- Arrange
+        session = self.create_session()
+        self.put_chunk(session["id"], 0, 0, CONTENT[:40])
+
+        # --- Act
+        retried = self.put_chunk(session["id"], 0, 0, CONTENT[:40])
+        skipped = self.put_chunk(session["id"], 2, 80, CONTENT[80:])
+
+        # --- Assert
+        self.assertEqual(retried.status_code, status.HTTP_200_OK)
+        self.assertEqual(retried.json()["received_bytes"], 40)
+        self.assertEqual(skipped.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(skipped.json()["chunk_count"], 1)
+
+    def test_chunk_is_received_before_the_session_is_locked(self):
+        # --- Arrange
+        session = self.create_session()
+        queries = CaptureQueriesContext(connection)
+        queries_when_spooled = []
+
+        def spool_chunk(stream, length):
+            queries_when_spooled.extend(query["sql"] for query in queries)
+            return uploads.spool_chunk(stream, length)
+
+        # --- Act
+        with mock.patch.object(views, "spool_chunk", spool_chunk), queries:
+            response = self.put_chunk(session["id"], 0, 0, CONTENT[:40])
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["received_bytes"], 40)
+        self.assertFalse(
+            [sql for sql in queries_when_spooled if "uploadsession" in sql]
+        )
+        self.assertTrue([sql for sql in queries if "uploadsession" in sql["sql"]])
+
+    def test_chunk_of_another_total_size_is_rejected(self):
+        # --- Arrange
+        session = self.create_session()
+
+        # --- Act
+        response = self.put_chunk(session["id"], 0, 0, CONTENT[:40], total=40)
+
+        # --- Assert
+        self.assertEqual(
+            response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(UploadSession.objects.get().received_bytes, 0)
+
+    def test_incomplete_upload_cannot_be_finalized(self):
+        # --- Arrange
+        session = self.create_session()
+        self.put_chunk(session["id"], 0, 0, CONTENT[:40])
+
+        # --- Act
+        response = self.complete(session["id"])
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(DocumentFile.objects.exists())
+
+    def test_checksum_mismatch_discards_upload(self):
+        # --- Arrange
+        session = self.create_session()
+        self.put_chunk(session["id"], 0, 0, CONTENT)
+
+        # --- Act
+        response = self.complete(session["id"], sha256="0" * 64)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(DocumentFile.objects.exists())
+
+    def test_session_denied_for_foreign_document(self):
+        # --- Arrange
+        other_document = Document.objects.create(title="Foreign", owner=self.other_user)
+        url = reverse(
+            "document-uploads-list", kwargs={"document_pk": other_document.pk}
+        )
+
+        # --- Act
+        response = self.client.post(url, {"filename": "x.pdf", "size": 10})
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_purge_removes_expired_sessions_and_parts(self):
+        # --- Arrange
+        session_id = self.create_session()["id"]
+        self.put_chunk(session_id, 0, 0, CONTENT[:40])
+
+        session = UploadSession.objects.get(pk=session_id)
+        session.expires_at = timezone.now() - timedelta(seconds=1)
+        session.save()
+
+        # --- Act
+        call_command("purge_upload_sessions", stdout=StringIO())
+
+        # --- Assert
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(session.part_path.exists())
@@ -0,0 +1,111 @@
+"""Helpers for the resumable upload protocol.
+
+A client creates an UploadSession, then PUTs numbered chunks with a
+``Content-Range: bytes <start>-<end>/<total>`` header. Chunks must arrive in
+order; the session reports how many bytes and chunks were received, so an
+interrupted client can resume from there. The request body is spooled to a
+temporary file in small blocks, never held in memory, before the session is
+locked: the lock is only held while the spooled chunk is appended.
+"""
+
+import re
+import tempfile
+from typing import BinaryIO
+
+from django.conf import settings
+from django.core.files import File
+
+from document.models import UploadSession
+
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    """Raised when a chunk does not fit the session's current state."""
+
+
+def parse_content_range(header: str | None) -> tuple[int, int, int | None]:
+    """Return ``(start, length, total)`` from a ``Content-Range`` request header.
+
+    ``total`` is None when the header leaves it unknown (``*``).
+    """
+    match = CONTENT_RANGE_PATTERN.match(header or "")
+    if match is None:
+        raise ChunkError("A 'Content-Range: bytes <start>-<end>/<total>' is required.")
+
+    start, end = int(match[1]), int(match[2])
+    if end < start:
+        raise ChunkError("Invalid Content-Range.")
+
+    total = None if match[3] == "*" else int(match[3])
+
+    return start, end - start + 1, total
+
+
+def spool_chunk(stream: BinaryIO, length: int) -> BinaryIO:
+    """Copy ``length`` bytes of ``stream`` to a temporary file, rewound.
+
+    The file is deleted once closed.
+    """
+    spool = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+
+    try:
+        written = 0
+        while written < length:
+            block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            spool.write(block)
+            written += len(block)
+
+        if written != length:
+            raise ChunkError(f"Expected {length} bytes, received {written}.")
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+
+    return spool
+
+
+def append_chunk(
+    session: UploadSession, stream: BinaryIO, start: int, length: int
+) -> None:
+    """Append ``length`` bytes read from ``stream`` to the session's part file.
+
+    ``stream`` is normally a chunk spooled by ``spool_chunk()``. On a short
+    read the part file is truncated back, so a failed chunk can simply be
+    retried.
+    """
+    if start + length > session.size:
+        raise ChunkError("Chunk goes past the declared upload size.")
+
+    session.part_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(session.part_path, "ab") as part:
+        # Drop whatever a previously interrupted attempt left past ``start``.
+        part.truncate(start)
+
+        written = 0
+        while written < length:
+            block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            part.write(block)
+            written += len(block)
+
+        if written != length:
+            part.truncate(start)
+            raise ChunkError(f"Expected {length} bytes, received {written}.")
+
+
+class PartFile(File):
+    """A completed part file, handed to storage as a temporary upload.
+
+    Exposing ``temporary_file_path`` lets FileSystemStorage move the part into
+    place instead of copying it.
+    """
+
+    def temporary_file_path(self) -> str:
+        return self.file.name
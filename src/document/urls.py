@@ -1,11 +1,14 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from document import asyncviews
+from document.negotiation import IgnoreAcceptNegotiation
 from document.views import (
     DocumentFileViewSet,
     DocumentNoteViewSet,
     DocumentViewSet,
     TagViewSet,
+    UploadSessionViewSet,
 )
 
 # Main router for documents and tags
@@ -34,6 +37,41 @@ urlpatterns = [
         ),
         name="document-files-detail",
     ),
+    path(
+        "documents/<int:document_pk>/files/<uuid:pk>/download/",
+        DocumentFileViewSet.as_view(
+            {"get": "download"}, content_negotiation_class=IgnoreAcceptNegotiation
+        ),
+        name="document-files-download",
+    ),
+    path(
+        "documents/<int:document_pk>/files/<uuid:pk>/preview/",
+        DocumentFileViewSet.as_view(
+            {"get": "preview"}, content_negotiation_class=IgnoreAcceptNegotiation
+        ),
+        name="document-files-preview",
+    ),
+    # Resumable upload endpoints
+    path(
+        "documents/<int:document_pk>/uploads/",
+        UploadSessionViewSet.as_view({"post": "create"}),
+        name="document-uploads-list",
+    ),
+    path(
+        "documents/<int:document_pk>/uploads/<uuid:pk>/",
+        UploadSessionViewSet.as_view({"get": "retrieve", "delete": "destroy"}),
+        name="document-uploads-detail",
+    ),
+    path(
+        "documents/<int:document_pk>/uploads/<uuid:pk>/chunks/<int:index>/",
+        UploadSessionViewSet.as_view({"put": "chunk"}),
+        name="document-uploads-chunk",
+    ),
+    path(
+        "documents/<int:document_pk>/uploads/<uuid:pk>/complete/",
+        UploadSessionViewSet.as_view({"post": "complete"}),
+        name="document-uploads-complete",
+    ),
     # Document notes endpoints
     path(
         "documents/<int:document_pk>/notes/",
@@ -52,4 +90,20 @@ urlpatterns = [
         ),
         name="document-notes-detail",
     ),
+    # Async (ASGI) transfer and read endpoints
+    path(
+        "async/documents/<int:pk>/",
+        asyncviews.document_detail,
+        name="async-document-detail",
+    ),
+    path(
+        "async/documents/<int:document_pk>/files/",
+        asyncviews.upload_file,
+        name="async-document-files-upload",
+    ),
+    path(
+        "async/documents/<int:document_pk>/files/<uuid:pk>/download/",
+        asyncviews.download_file,
+        name="async-document-files-download",
+    ),
 ]
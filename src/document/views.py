@@ -1,45 +1,376 @@
+from dataclasses import asdict
+from datetime import timedelta
+from functools import cached_property
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models.query import QuerySet
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import permissions, viewsets
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import generics, mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.response import Response
 
-from document.models import Document, DocumentFile, DocumentNote, Tag
+from document import export, previews, responsecache, similarity, tagcounts, tagging
+from document.admission import AdmissionControlMixin
+from document.autocomplete import autocomplete
+from document.conditional import ConditionalGetMixin, ValidatorPart
+from document.exceptions import (
+    PayloadTooLarge,
+    PreviewUnavailable,
+    RangeNotSatisfiable,
+)
+from document.fieldsets import Fieldset
+from document.models import (
+    Document,
+    DocumentFile,
+    DocumentNote,
+    DocumentTag,
+    Tag,
+    UploadSession,
+    UserTagCount,
+)
+from document.negotiation import IgnoreAcceptNegotiation
+from document.pagination import DocumentCursorPagination, SearchPagination
+from document.responsecache import CachedResponseMixin
+from document.search import SearchResults
 from document.serializers import (
+    BulkTagSerializer,
+    DocumentFileFilterSerializer,
     DocumentFileSerializer,
+    DocumentFilterSerializer,
+    DocumentListSerializer,
     DocumentNoteSerializer,
+    DocumentSearchQuerySerializer,
+    DocumentSearchResultSerializer,
     DocumentSerializer,
+    DocumentSimilarResultSerializer,
+    ExportQuerySerializer,
+    PreviewQuerySerializer,
+    SimilarQuerySerializer,
+    TagAutocompleteQuerySerializer,
     TagSerializer,
+    UploadCompleteSerializer,
+    UploadSessionSerializer,
+)
+from document.sendfile import serve_file
+from document.storage import sha256_file
+from document.uploads import (
+    ChunkError,
+    PartFile,
+    append_chunk,
+    parse_content_range,
+    spool_chunk,
 )
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request: Request) -> Response:
+        """Tags starting with ``prefix``, the user's most used first."""
+        query_serializer = TagAutocompleteQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        suggestions = autocomplete.suggest(
+            request.user.pk,
+            query_serializer.validated_data["prefix"],
+            query_serializer.validated_data["limit"],
+        )
+
+        return Response([asdict(suggestion) for suggestion in suggestions])
 
-class DocumentViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"])
+    def facets(self, request: Request) -> Response:
+        """The user's tags with the number of their documents carrying each."""
+        counts = (
+            UserTagCount.objects.filter(user=request.user, count__gt=0)
+            .select_related("tag")
+            .order_by("-count", "tag__name")
+        )
+
+        return Response(
+            [
+                {"id": count.tag_id, "name": count.tag.name, "count": count.count}
+                for count in counts
+            ]
+        )
+
+
+class DocumentViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DocumentCursorPagination
+
+    # Actions whose representation ?fields= and ?expand= shape.
+    fieldset_actions = ("list", "retrieve", "search", "similar")
+
+    @cached_property
+    def fieldset(self) -> Fieldset | None:
+        if self.action not in self.fieldset_actions:
+            return None
+
+        return Fieldset.from_query_params(
+            self.request.query_params, self.get_serializer_class()
+        )
+
+    @cached_property
+    def field_names(self) -> set[str]:
+        """Names of the fields of the response, all of them without a fieldset."""
+        fieldset = self.fieldset or Fieldset()
+
+        return set(fieldset.names(self.get_serializer_class()))
+
+    @cached_property
+    def ordering_fields(self) -> list[str]:
+        """Fields the list is paginated on, none for other actions."""
+        if self.action != "list":
+            return []
+
+        ordering = self.paginator.get_ordering(self.request, None, self)
+
+        return [name.lstrip("-") for name in ordering]
+
+    @cached_property
+    def filter_serializer(self) -> DocumentFilterSerializer | None:
+        """The validated filters of the list, None for other actions."""
+        if self.action != "list":
+            return None
+
+        # A plain dict: absent booleans are not False.
+        serializer = DocumentFilterSerializer(data=self.request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+
+        return serializer
+
+    def get_serializer_context(self) -> dict:
+        context = super().get_serializer_context()
+        context["fieldset"] = self.fieldset
+
+        return context
 
     def get_queryset(self) -> QuerySet[Document]:
-        return (
-            Document.objects.filter(owner=self.request.user)
-            .prefetch_related("tags", "files")
-            .select_related("owner")
+        queryset = Document.objects.filter(owner=self.request.user)
+        if self.filter_serializer is not None:
+            queryset = self.filter_serializer.filter_queryset(queryset)
+
+        if self.fieldset is None:
+            return queryset.with_details()
+
+        names = self.field_names
+        if self.fieldset.fields is not None:
+            # The cursor of the next page is read from the ordering fields.
+            loaded = names | set(self.ordering_fields)
+            columns = [field.name for field in Document._meta.concrete_fields]
+            queryset = queryset.only(*(name for name in columns if name in loaded))
+        elif self.action == "retrieve":
+            queryset = queryset.select_related("owner")
+
+        relations = [name for name in ("tags", "files", "notes") if name in names]
+        if "tag_ids" in names and "tags" not in relations:
+            relations.append("tags")
+
+        if self.action in ("list", "search", "similar"):
+            queryset = queryset.with_counts(
+                files="file_count" in names, notes="note_count" in names
+            )
+
+        return queryset.with_relations(*relations)
+
+    def get_validator_parts(self) -> list[ValidatorPart]:
+        owner = self.request.user
+        names = self.field_names
+
+        if self.action == "retrieve":
+            document_id = self.kwargs["pk"]
+            documents = Document.objects.filter(pk=document_id, owner=owner)
+            related = {"document_id": document_id, "document__owner": owner}
+        else:
+            documents = Document.objects.filter(owner=owner)
+            related = {"document__owner": owner}
+
+        # Only the tables of the requested fields and of the filters.
+        filters = (
+            self.filter_serializer.validated_data if self.filter_serializer else {}
         )
+        parts = [(documents, "updated_at")]
+        if names & {"notes", "note_count"} or "has_notes" in filters:
+            parts.append((DocumentNote.objects.filter(**related), "updated_at"))
+        if names & {"files", "file_count"} or "has_files" in filters:
+            parts.append((DocumentFile.objects.filter(**related), "updated_at"))
+        if names & {"tags", "tag_ids"} or "tags" in filters:
+            parts.append((DocumentTag.objects.filter(**related), "added_at"))
+        if "tags" in names:
+            # The nested representation embeds tag names.
+            tags = Tag.objects.filter(
+                **{
+                    f"document_tags__{lookup}": value
+                    for lookup, value in related.items()
+                }
+            )
+            parts.append((tags, "updated_at"))
+
+        return parts
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return DocumentListSerializer
+        if self.action == "search":
+            return DocumentSearchResultSerializer
+        if self.action == "similar":
+            return DocumentSimilarResultSerializer
+
+        return super().get_serializer_class()
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    def perform_destroy(self, instance: Document):
+        # One tag count update for all of the document's links.
+        with tagcounts.batch():
+            instance.delete()
+
+    @action(detail=False, methods=["post"], url_path="bulk-tag")
+    def bulk_tag(self, request: Request) -> Response:
+        """Add and/or remove tags on many documents in one transaction."""
+        serializer = BulkTagSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        document_ids: list[int] = serializer.validated_data["document_ids"]
+
+        changes = tagging.bulk_tag(
+            Document.objects.filter(owner=request.user, pk__in=document_ids),
+            added_by=request.user,
+            add=serializer.validated_data["add"],
+            remove=serializer.validated_data["remove"],
+        )
+
+        results = []
+        for document_id in document_ids:
+            if document_id in changes:
+                document_changes = changes[document_id]
+                results.append(
+                    {
+                        "id": document_id,
+                        "status": "ok",
+                        "added": document_changes.added,
+                        "removed": document_changes.removed,
+                    }
+                )
+            else:
+                results.append({"id": document_id, "status": "not_found"})
 
-class DocumentFileViewSet(viewsets.ModelViewSet):
+        return Response({"results": results})
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="cache-stats",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def cache_stats(self, request: Request) -> Response:
+        """Hit and miss counts of the list and detail response cache."""
+        return Response(responsecache.get_stats())
+
+    @action(
+        detail=False,
+        methods=["get"],
+        content_negotiation_class=IgnoreAcceptNegotiation,
+    )
+    def export(self, request: Request) -> HttpResponse:
+        """Stream a zip or tar of every file of the user, plus a manifest."""
+        query_serializer = ExportQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        archive: str = query_serializer.validated_data["archive"]
+
+        response = StreamingHttpResponse(
+            export.stream_export(request.user, archive),
+            content_type=export.CONTENT_TYPES[archive],
+        )
+        filename = f"documents-{timezone.localdate().isoformat()}.{archive}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+        return response
+
+    @action(detail=False, methods=["get"], pagination_class=SearchPagination)
+    def search(self, request: Request) -> Response:
+        """Ranked full-text search over titles, descriptions and notes."""
+        query_serializer = DocumentSearchQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        results = SearchResults(
+            self.get_queryset(),
+            owner_id=request.user.pk,
+            query=query_serializer.validated_data["q"],
+        )
+        page = self.paginate_queryset(results)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request: Request, pk=None) -> Response:
+        """The user's documents closest to this one in content, best first."""
+        query_serializer = SimilarQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        # Without the representation's counts and prefetches (404 for bad ids).
+        document = generics.get_object_or_404(
+            Document.objects.filter(owner=request.user).only("id", "owner"), pk=pk
+        )
+        hits = similarity.similar_documents(
+            document, query_serializer.validated_data["limit"]
+        )
+
+        documents = self.get_queryset().in_bulk(
+            [document_id for document_id, _ in hits]
+        )
+        results = []
+        for document_id, score in hits:
+            if document_id in documents:
+                similar = documents[document_id]
+                similar.score = score
+                results.append(similar)
+
+        serializer = self.get_serializer(results, many=True)
+
+        return Response({"results": serializer.data})
+
+
+class DocumentFileViewSet(AdmissionControlMixin, viewsets.ModelViewSet):
     serializer_class = DocumentFileSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    # ``file`` is the only writable field: an update replaces the content,
+    # which is queued for extraction like a new file.
+    admission_actions = {"create": True, "update": True, "partial_update": True}
 
     def get_queryset(self) -> QuerySet[DocumentFile]:
-        return DocumentFile.objects.filter(document__owner=self.request.user)
+        queryset = DocumentFile.objects.filter(
+            document_id=self.kwargs["document_pk"],
+            document__owner=self.request.user,
+        )
+
+        if self.action == "download":
+            return queryset.select_related("document", "blob")
+
+        if self.action == "list":
+            filter_serializer = DocumentFileFilterSerializer(
+                data=self.request.query_params
+            )
+            filter_serializer.is_valid(raise_exception=True)
+            return queryset.filter(**filter_serializer.get_filters())
+
+        # The delete and save signals need the document's owner.
+        return queryset.select_related("document")
 
     def perform_create(self, serializer):
         document = get_object_or_404(
@@ -47,13 +378,181 @@ class DocumentFileViewSet(viewsets.ModelViewSet):
         )
         serializer.save(uploaded_by=self.request.user, document=document)
 
+    def download(self, request: Request, *args, **kwargs) -> HttpResponse:
+        """Stream the file bytes, with Range and conditional GET support."""
+        return serve_file(request, self.get_object())
+
+    def preview(self, request: Request, *args, **kwargs) -> HttpResponse:
+        """Serve a JPEG thumbnail, rendering and caching it on a miss."""
+        query_serializer = PreviewQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        size: int = query_serializer.validated_data.get(
+            "size", settings.DOCUMENT_PREVIEW_DEFAULT_SIZE
+        )
+
+        document_file = self.get_object()
+
+        # A preview depends on the file's content, not on the file: its
+        # content can be replaced.
+        key = previews.preview_key(document_file.sha256, str(document_file.pk))
+        etag = quote_etag(f"{document_file.sha256}-{size}")
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
 
-class DocumentNoteViewSet(viewsets.ModelViewSet):
+        try:
+            preview = previews.open_preview(
+                previews.get_preview_cache(),
+                settings.DOCUMENT_PREVIEW_RENDERER,
+                key,
+                document_file.file.path,
+                size,
+            )
+        except (previews.PreviewError, ValueError, NotImplementedError) as exc:
+            raise PreviewUnavailable(str(exc) or None)
+
+        response = FileResponse(preview, content_type=previews.PREVIEW_CONTENT_TYPE)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=86400"
+
+        return response
+
+
+class UploadSessionViewSet(
+    AdmissionControlMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Resumable, chunked uploads (see ``document.uploads``)."""
+
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    admission_actions = {"chunk": False, "complete": True}
+
+    def get_queryset(self) -> QuerySet[UploadSession]:
+        return UploadSession.objects.filter(
+            document_id=self.kwargs["document_pk"],
+            document__owner=self.request.user,
+            expires_at__gt=timezone.now(),
+        )
+
+    def perform_create(self, serializer):
+        document = get_object_or_404(
+            Document, pk=self.kwargs["document_pk"], owner=self.request.user
+        )
+        serializer.save(
+            document=document,
+            created_by=self.request.user,
+            expires_at=timezone.now()
+            + timedelta(seconds=settings.DOCUMENT_UPLOAD_SESSION_TTL),
+        )
+
+    def chunk(self, request: Request, *args, **kwargs) -> Response:
+        """Append chunk number ``index`` at the offset given by Content-Range."""
+        index: int = kwargs["index"]
+
+        try:
+            start, length, total = parse_content_range(
+                request.headers.get("Content-Range")
+            )
+        except ChunkError as exc:
+            raise ValidationError({"detail": str(exc)})
+
+        if length > settings.DOCUMENT_UPLOAD_MAX_CHUNK_SIZE:
+            raise PayloadTooLarge()
+
+        # Received before locking the session: a slow client must not hold
+        # the lock while its chunk trickles in.
+        try:
+            chunk = spool_chunk(request.stream, length)
+        except ChunkError as exc:
+            raise ValidationError({"detail": str(exc)})
+
+        with chunk, transaction.atomic():
+            session = get_object_or_404(
+                self.get_queryset().select_for_update(), pk=kwargs["pk"]
+            )
+
+            if total is not None and total != session.size:
+                raise RangeNotSatisfiable(
+                    f"The upload is {session.size} bytes, not {total}."
+                )
+
+            # A retried chunk that was already stored is acknowledged as is.
+            if index < session.chunk_count:
+                return Response(self.get_serializer(session).data)
+
+            if index != session.chunk_count or start != session.received_bytes:
+                return self.conflict(session, "Chunks must be sent in order.")
+
+            try:
+                append_chunk(session, chunk, start, length)
+            except ChunkError as exc:
+                raise ValidationError({"detail": str(exc)})
+
+            session.received_bytes += length
+            session.chunk_count += 1
+            session.refresh_expiry()
+            session.save(update_fields=["received_bytes", "chunk_count", "expires_at"])
+
+        return Response(self.get_serializer(session).data)
+
+    def complete(self, request: Request, *args, **kwargs) -> Response:
+        """Turn a fully received session into a DocumentFile."""
+        session = self.get_object()
+        if not session.is_complete:
+            return self.conflict(session, "The upload is not complete.")
+
+        serializer = UploadCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        expected_digest = serializer.validated_data.get("sha256")
+
+        with open(session.part_path, "rb") as handle:
+            part = PartFile(handle, name=session.filename)
+            part.sha256 = sha256_file(part)
+
+            if expected_digest and expected_digest.lower() != part.sha256:
+                session.delete()
+                raise ValidationError(
+                    {"sha256": "Checksum mismatch, the upload was discarded."}
+                )
+
+            document_file = DocumentFile(
+                document=session.document, uploaded_by=request.user, file=part
+            )
+            document_file.save()
+
+        session.delete()
+
+        return Response(
+            DocumentFileSerializer(
+                document_file, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    def conflict(self, session: UploadSession, detail: str) -> Response:
+        """409 carrying the session's progress, so the client can resume."""
+        return Response(
+            {"detail": detail, **self.get_serializer(session).data},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+
+class DocumentNoteViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = DocumentNoteSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self) -> QuerySet[DocumentNote]:
-        return DocumentNote.objects.filter(document__owner=self.request.user)
+        queryset = DocumentNote.objects.filter(document__owner=self.request.user)
+
+        if self.action == "list":
+            return queryset
+
+        # The delete and save signals need the document's owner.
+        return queryset.select_related("document")
 
     def perform_create(self, serializer):
         document = get_object_or_404(
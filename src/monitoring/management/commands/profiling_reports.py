@@ -0,0 +1,61 @@
+import shutil
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "List the saved request profiles, newest first, or print the report of "
+        "one of them (see monitoring.profiling)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "report",
+            nargs="?",
+            help="Id of the report to print, as sent in X-Profile-Id.",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="Copy the raw cProfile data of the report to this file.",
+        )
+
+    def handle(self, *args, **options):
+        report_id = options["report"]
+        if report_id is None:
+            if options["output"] is not None:
+                raise CommandError("--output needs a report id.")
+            self.list_reports()
+            return
+
+        text = profiling.report_path(report_id, ".txt")
+        if text is None:
+            raise CommandError(f"Unknown report {report_id!r}.")
+
+        if options["output"] is None:
+            self.stdout.write(text.read_text())
+            return
+
+        shutil.copyfile(profiling.report_path(report_id, ".prof"), options["output"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote the profile to {options['output']}.")
+        )
+
+    def list_reports(self) -> None:
+        reports = profiling.list_reports()
+        if not reports:
+            self.stdout.write("No reports.")
+            return
+
+        for report in reports:
+            self.stdout.write(
+                f"{report['id']}  {report['status']}  "
+                f"{report['duration_ms']:>9.1f} ms  "
+                f"{report['queries']:>4} queries  "
+                f"{report['method']} {report['path']}  ({report['user']})"
+            )
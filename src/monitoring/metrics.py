@@ -0,0 +1,333 @@
+"""Request metrics, recorded per URL name and method.
+
+Values live in per-process files (see ``monitoring.store``) and are rendered
+in the Prometheus text format by ``/metrics``. Recording a request takes a
+dictionary lookup and a few float additions per metric, a couple of
+microseconds in all; series names and bucket bounds are only formatted when
+the metrics are scraped.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+
+from monitoring.store import FILE_SUFFIX, MetricsFile, read_directory
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.size = 1
+
+    def samples(self, values: list[float]) -> list[tuple[str, dict, float]]:
+        return [(self.name, {}, values[0])]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # A count per bucket, the +Inf one included, then the sum.
+        self.size = len(buckets) + 2
+
+    def observe(self, values: memoryview, index: int, value: float) -> None:
+        values[index + bisect_left(self.buckets, value)] += 1
+        values[index + len(self.buckets) + 1] += value
+
+    def samples(self, values: list[float]) -> list[tuple[str, dict, float]]:
+        samples = []
+        count = 0
+        for bound, bucket_count in zip([*self.buckets, float("inf")], values):
+            count += bucket_count
+            samples.append((f"{self.name}_bucket", {"le": format_value(bound)}, count))
+
+        samples.append((f"{self.name}_sum", {}, values[-1]))
+        samples.append((f"{self.name}_count", {}, count))
+
+        return samples
+
+
+ROUTE = ("route", "method")
+
+REQUEST_DURATION = Histogram(
+    "django_http_request_duration_seconds",
+    "Time until the response is returned, its body excluded when streamed.",
+    ROUTE,
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "Responses by status code.",
+    (*ROUTE, "status"),
+)
+RESPONSE_SIZE = Histogram(
+    "django_http_response_size_bytes",
+    "Response body size, for responses of known length.",
+    ROUTE,
+    tuple(4.0**exponent for exponent in range(4, 14)),
+)
+DB_QUERIES = Histogram(
+    "django_db_queries_per_request",
+    "Database queries made by a request.",
+    ROUTE,
+    (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_DURATION = Histogram(
+    "django_db_query_duration_seconds_per_request",
+    "Time a request spent in database queries.",
+    ROUTE,
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+UPLOAD_BYTES = Counter(
+    "django_http_upload_bytes_total",
+    "Request body bytes received.",
+    ROUTE,
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "django_http_upload_throughput_bytes_per_second",
+    "Request body size over request duration, for bodies of at least 64 KiB.",
+    ROUTE,
+    tuple(4.0**exponent for exponent in range(8, 16)),
+)
+CACHE_RESPONSES = Counter(
+    "django_http_cache_responses_total",
+    "Responses served from the response cache (hit) or built (miss).",
+    (*ROUTE, "result"),
+)
+
+METRICS = [
+    REQUEST_DURATION,
+    REQUESTS,
+    RESPONSE_SIZE,
+    DB_QUERIES,
+    DB_DURATION,
+    UPLOAD_BYTES,
+    UPLOAD_THROUGHPUT,
+    CACHE_RESPONSES,
+]
+
+# Labelled by route and method only, in the order record_request() unpacks.
+ROUTE_METRICS = [
+    REQUEST_DURATION,
+    RESPONSE_SIZE,
+    DB_QUERIES,
+    DB_DURATION,
+    UPLOAD_BYTES,
+    UPLOAD_THROUGHPUT,
+]
+
+METHODS = frozenset(["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+
+# Smaller bodies are received in one read: their "throughput" is noise.
+UPLOAD_THROUGHPUT_MIN_BYTES = 64 * 1024
+
+# Set by views answering from a cache (see document.responsecache).
+CACHE_HEADER = "X-Cache"
+CACHE_RESULTS = {"HIT": "hit", "MISS": "miss"}
+
+
+class QueryStats:
+    """Database queries of the current request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Copied into the threads running sync code of async requests.
+current_queries: ContextVar[QueryStats | None] = ContextVar(
+    "current_queries", default=None
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing queries made during a request."""
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += perf_counter() - start
+
+
+class Series:
+    """Slot indexes of the series of the current process, created on first use.
+
+    Callers hold the file's lock, and look ``values`` up after any index: a
+    new series may remap the file.
+    """
+
+    def __init__(self, file: MetricsFile):
+        self.file = file
+        self.indexes: dict[tuple, int] = {}
+        self.route_indexes: dict[tuple[str, str], tuple[int, ...]] = {}
+
+    def index(self, metric, labels: tuple[str, ...]) -> int:
+        key = (metric.name, labels)
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.file.allocate(json.dumps([metric.name, *labels]), metric.size)
+            self.indexes[key] = index
+
+        return index
+
+    def route(self, labels: tuple[str, str]) -> tuple[int, ...]:
+        """Indexes of the ``ROUTE_METRICS`` of a route and method."""
+        indexes = self.route_indexes.get(labels)
+        if indexes is None:
+            indexes = tuple(self.index(metric, labels) for metric in ROUTE_METRICS)
+            self.route_indexes[labels] = indexes
+
+        return indexes
+
+
+_series: Series | None = None
+_series_lock = threading.Lock()
+
+
+def get_series() -> Series:
+    """The series of this process."""
+    global _series
+
+    if _series is None:
+        with _series_lock:
+            if _series is None:
+                directory = settings.MONITORING_METRICS_DIR
+                path = (
+                    Path(directory) / f"{os.getpid()}{FILE_SUFFIX}"
+                    if directory
+                    else None
+                )
+                _series = Series(MetricsFile(path))
+
+    return _series
+
+
+def forget_series() -> None:
+    global _series
+
+    _series = None
+
+
+# A forked worker records to a file of its own.
+os.register_at_fork(after_in_child=forget_series)
+
+
+def record_request(
+    route: str,
+    method: str,
+    status: int,
+    duration: float,
+    response_size: int | None,
+    upload_size: int,
+    queries: QueryStats,
+    cache_result: str | None,
+) -> None:
+    if method not in METHODS:
+        method = "OTHER"
+
+    series = get_series()
+
+    with series.file.lock:
+        (
+            duration_index,
+            size_index,
+            queries_index,
+            query_time_index,
+            upload_index,
+            throughput_index,
+        ) = series.route((route, method))
+        status_index = series.index(REQUESTS, (route, method, str(status)))
+        if cache_result is not None:
+            cache_index = series.index(CACHE_RESPONSES, (route, method, cache_result))
+        values = series.file.values
+
+        REQUEST_DURATION.observe(values, duration_index, duration)
+        values[status_index] += 1
+        if response_size is not None:
+            RESPONSE_SIZE.observe(values, size_index, response_size)
+        DB_QUERIES.observe(values, queries_index, queries.count)
+        DB_DURATION.observe(values, query_time_index, queries.seconds)
+
+        if upload_size:
+            values[upload_index] += upload_size
+            if upload_size >= UPLOAD_THROUGHPUT_MIN_BYTES:
+                UPLOAD_THROUGHPUT.observe(
+                    values, throughput_index, upload_size / duration
+                )
+
+        if cache_result is not None:
+            values[cache_index] += 1
+
+
+def collect() -> dict[str, list[float]]:
+    """The values of every series: of all processes with a metrics directory."""
+    directory = settings.MONITORING_METRICS_DIR
+    if directory:
+        return read_directory(Path(directory))
+
+    return get_series().file.read()
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value))
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels.items()
+    )
+
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+def render(entries: dict[str, list[float]]) -> str:
+    """Entries of ``collect()`` in the Prometheus text exposition format."""
+    series_by_metric: dict[str, list[tuple[tuple[str, ...], list[float]]]] = {}
+    for key, values in entries.items():
+        name, *labels = json.loads(key)
+        series_by_metric.setdefault(name, []).append((tuple(labels), values))
+
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+
+        for labels, values in sorted(series_by_metric.get(metric.name, [])):
+            for name, extra_labels, value in metric.samples(values):
+                sample_labels = {**dict(zip(metric.labels, labels)), **extra_labels}
+                lines.append(
+                    f"{name}{{{format_labels(sample_labels)}}} {format_value(value)}"
+                )
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,162 @@
+import cProfile
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from authapi.authentication import ApiTokenAuthentication
+from monitoring import profiling
+from monitoring.metrics import (
+    CACHE_HEADER,
+    CACHE_RESULTS,
+    QueryStats,
+    current_queries,
+    record_request,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Record the latency, size and database work of each request.
+
+    Requests are labelled with the name of the URL pattern they resolved to,
+    so keep it first in ``MIDDLEWARE`` to time everything after it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = QueryStats()
+        token = current_queries.set(queries)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+
+        self.record(request, response, perf_counter() - start, queries)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        queries = QueryStats()
+        token = current_queries.set(queries)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+
+        self.record(request, response, perf_counter() - start, queries)
+
+        return response
+
+    def record(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        duration: float,
+        queries: QueryStats,
+    ) -> None:
+        match = request.resolver_match
+        try:
+            upload_size = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            upload_size = 0
+
+        if response.streaming:
+            length = response.get("Content-Length")
+            response_size = int(length) if length else None
+        else:
+            response_size = len(response.content)
+
+        record_request(
+            route=match.view_name if match else UNMATCHED_ROUTE,
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            response_size=response_size,
+            upload_size=upload_size,
+            queries=queries,
+            cache_result=CACHE_RESULTS.get(response.get(CACHE_HEADER)),
+        )
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it (see ``monitoring.profiling``).
+
+    Not loaded at all unless ``MONITORING_PROFILING_ENABLED``. It reads the
+    session user, so it goes after ``AuthenticationMiddleware``; requests of
+    other clients, and those without the header, pass through untouched.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MONITORING_PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.header = "HTTP_" + profiling.PROFILE_HEADER.upper().replace("-", "_")
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if request.META.get(self.header) != "1" or not self.is_allowed(request):
+            return self.get_response(request)
+        if not profiling.PROFILER_LOCK.acquire(blocking=False):
+            # Another request of the process is being profiled.
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            profiling.PROFILER_LOCK.release()
+
+    def profile(self, request: HttpRequest) -> HttpResponse:
+        profile = cProfile.Profile()
+        capture = profiling.QueryCapture()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(capture))
+
+            start = perf_counter()
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            duration = perf_counter() - start
+
+        response[profiling.REPORT_ID_HEADER] = profiling.save_report(
+            request, response, duration, profile, capture.queries
+        )
+
+        return response
+
+    def is_allowed(self, request: HttpRequest) -> bool:
+        if request.user.is_staff:
+            return True
+
+        try:
+            result = ApiTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        if result is None:
+            return False
+
+        user, token = result
+        return (
+            user.is_staff
+            or token.prefix in settings.MONITORING_PROFILING_TOKEN_PREFIXES
+        )
@@ -0,0 +1,206 @@
+"""Opt-in profiling of single requests.
+
+With ``MONITORING_PROFILING_ENABLED``, a staff user or a client with an API
+token listed in ``MONITORING_PROFILING_TOKEN_PREFIXES`` can send
+``X-Profile: 1`` to have a request run under cProfile with its SQL captured
+(see ``monitoring.middleware.ProfilingMiddleware``). The response carries the
+``X-Profile-Id`` of the report written to ``MONITORING_PROFILING_DIR``:
+
+- ``<id>.json``: the request, status, timings and query counts;
+- ``<id>.txt``: the queries, slowest first with the EXPLAIN of the first
+  ``MONITORING_PROFILING_EXPLAIN_QUERIES`` SELECTs, and the profile;
+- ``<id>.prof``: the raw profile, for ``pstats`` or snakeviz.
+
+Only the last ``MONITORING_PROFILING_MAX_REPORTS`` reports are kept. List and
+read them with ``manage.py profiling_reports``.
+
+A process profiles one request at a time: since Python 3.12 a second cProfile
+cannot be enabled while one is active. A request asking for a profile while
+another one is profiled is served without (and without ``X-Profile-Id``).
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+
+PROFILE_HEADER = "X-Profile"
+REPORT_ID_HEADER = "X-Profile-Id"
+
+# Functions of the profile printed in the text report.
+PROFILE_LINES = 60
+
+# Held while a request of the process is profiled.
+PROFILER_LOCK = threading.Lock()
+
+
+@dataclass
+class CapturedQuery:
+    alias: str
+    sql: str
+    params: object
+    many: bool
+    seconds: float
+
+    @property
+    def is_select(self) -> bool:
+        return not self.many and self.sql.lstrip()[:6].upper() == "SELECT"
+
+
+class QueryCapture:
+    """Database execute wrapper keeping every query with its duration."""
+
+    def __init__(self):
+        self.queries: list[CapturedQuery] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                CapturedQuery(
+                    context["connection"].alias,
+                    sql,
+                    params,
+                    many,
+                    perf_counter() - start,
+                )
+            )
+
+
+def explain(query: CapturedQuery) -> str:
+    """The plan of a captured SELECT, in the database's own format."""
+    connection = connections[query.alias]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {query.sql}", query.params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f"(EXPLAIN failed: {exc})"
+
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+def new_report_id() -> str:
+    # Sorts by creation time.
+    return f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def get_directory() -> Path:
+    return Path(settings.MONITORING_PROFILING_DIR)
+
+
+def save_report(
+    request: HttpRequest,
+    response: HttpResponse,
+    duration: float,
+    profile: cProfile.Profile,
+    queries: list[CapturedQuery],
+) -> str:
+    """Write the report files of a profiled request and return its id."""
+    directory = get_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    report_id = new_report_id()
+
+    summary = {
+        "id": report_id,
+        "created_at": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "user": str(request.user) if hasattr(request, "user") else "",
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "queries": len(queries),
+        "query_ms": round(sum(query.seconds for query in queries) * 1000, 3),
+    }
+
+    profile.dump_stats(directory / f"{report_id}.prof")
+    (directory / f"{report_id}.txt").write_text(
+        format_report(summary, profile, queries)
+    )
+    # Last: listing only shows reports whose files are all written.
+    (directory / f"{report_id}.json").write_text(json.dumps(summary, indent=2))
+
+    prune(directory, settings.MONITORING_PROFILING_MAX_REPORTS)
+
+    return report_id
+
+
+def format_report(
+    summary: dict, profile: cProfile.Profile, queries: list[CapturedQuery]
+) -> str:
+    lines = [
+        f"{summary['method']} {summary['path']}",
+        f"User: {summary['user']}",
+        f"Status: {summary['status']}",
+        f"Duration: {summary['duration_ms']} ms",
+        f"SQL: {summary['queries']} queries in {summary['query_ms']} ms",
+        "",
+        "Queries, slowest first",
+        "",
+    ]
+
+    explained = 0
+    for number, query in enumerate(
+        sorted(queries, key=lambda query: query.seconds, reverse=True), start=1
+    ):
+        lines.append(
+            f"{number}. {query.seconds * 1000:.3f} ms [{query.alias}] {query.sql}"
+        )
+        lines.append(f"   params: {query.params!r}")
+        if (
+            query.is_select
+            and explained < settings.MONITORING_PROFILING_EXPLAIN_QUERIES
+        ):
+            explained += 1
+            lines.append("   plan:")
+            lines.extend(f"     {line}" for line in explain(query).splitlines())
+        lines.append("")
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_LINES)
+    lines.extend(["Profile, by cumulative time", stream.getvalue()])
+
+    return "\n".join(lines)
+
+
+def list_reports() -> list[dict]:
+    """Summaries of the saved reports, newest first."""
+    reports = []
+    for path in sorted(get_directory().glob("*.json"), reverse=True):
+        try:
+            reports.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Pruned meanwhile.
+            continue
+
+    return reports
+
+
+def report_path(report_id: str, suffix: str) -> Path | None:
+    """A file of a saved report, or None for an unknown id."""
+    path = get_directory() / f"{report_id}{suffix}"
+    if Path(report_id).name != report_id or not path.is_file():
+        return None
+
+    return path
+
+
+def prune(directory: Path, keep: int) -> None:
+    """Remove all but the ``keep`` newest reports."""
+    for path in sorted(directory.glob("*.json"), reverse=True)[keep:]:
+        for suffix in (".json", ".txt", ".prof"):
+            path.with_suffix(suffix).unlink(missing_ok=True)
@@ -0,0 +1,138 @@
+"""Per-process metric values in memory-mapped files.
+
+Each worker process writes its metric values to its own file in
+``MONITORING_METRICS_DIR``, so recording a value is a float addition in shared
+memory: no lock across processes, no system call. ``/metrics`` reads every
+file of the directory and sums them.
+
+A file is a used-size header followed by entries, each the key of a series
+and its float slots, appended as new series appear:
+
+    [used: Q] ([key length: I][slot count: I][key, 8-byte aligned][slots: d])*
+
+An entry is written before the used size grows over it, so readers never see
+a partial one. Without a directory, the file is anonymous memory and only the
+current process is reported.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+USED = struct.Struct("=Q")
+ENTRY = struct.Struct("=II")
+SLOT_SIZE = 8
+
+INITIAL_SIZE = 64 * 1024
+
+FILE_SUFFIX = ".metrics"
+
+
+def align(size: int) -> int:
+    return (size + SLOT_SIZE - 1) & ~(SLOT_SIZE - 1)
+
+
+class MetricsFile:
+    """Named runs of float slots, in a file or anonymous memory.
+
+    ``values`` is a memoryview of the whole mapping as floats: callers add to
+    ``values[index + i]`` for the ``index`` returned by ``allocate()``, while
+    holding ``lock``, which also guards growing the mapping.
+    """
+
+    def __init__(self, path: Path | None = None, size: int = INITIAL_SIZE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.used = USED.size
+        self.fd = None
+        if path is not None:
+            # A previous process with the same pid is gone: start over.
+            self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+
+        self.buffer = None
+        self.values = None
+        self.remap(size)
+
+    def remap(self, size: int) -> None:
+        if self.fd is None:
+            buffer = mmap.mmap(-1, size)
+            if self.buffer is not None:
+                buffer[: self.used] = self.buffer[: self.used]
+        else:
+            os.ftruncate(self.fd, size)
+            buffer = mmap.mmap(self.fd, size)
+
+        if self.buffer is not None:
+            self.values.release()
+            self.buffer.close()
+
+        self.buffer = buffer
+        self.values = memoryview(buffer).cast("d")
+        USED.pack_into(buffer, 0, self.used)
+
+    def allocate(self, key: str, count: int) -> int:
+        """Append ``count`` zeroed slots named ``key``; return the first's index."""
+        encoded = key.encode()
+        start = self.used + ENTRY.size + align(len(encoded))
+        end = start + count * SLOT_SIZE
+
+        if end > len(self.buffer):
+            self.remap(max(2 * len(self.buffer), align(end)))
+
+        ENTRY.pack_into(self.buffer, self.used, len(encoded), count)
+        key_start = self.used + ENTRY.size
+        self.buffer[key_start : key_start + len(encoded)] = encoded
+        self.used = end
+        USED.pack_into(self.buffer, 0, end)
+
+        return start // SLOT_SIZE
+
+    def read(self) -> dict[str, list[float]]:
+        with self.lock:
+            return parse(self.buffer)
+
+    def close(self) -> None:
+        self.values.release()
+        self.buffer.close()
+        if self.fd is not None:
+            os.close(self.fd)
+
+
+def parse(buffer) -> dict[str, list[float]]:
+    """The slots of each key of a file's contents."""
+    entries = {}
+    (used,) = USED.unpack_from(buffer, 0)
+    position = USED.size
+
+    while position < used:
+        key_length, count = ENTRY.unpack_from(buffer, position)
+        key_start = position + ENTRY.size
+        key = bytes(buffer[key_start : key_start + key_length]).decode()
+        start = key_start + align(key_length)
+        entries[key] = list(struct.unpack_from(f"={count}d", buffer, start))
+        position = start + count * SLOT_SIZE
+
+    return entries
+
+
+def read_directory(directory: Path) -> dict[str, list[float]]:
+    """The slots of each key, summed over the files of every process."""
+    totals: dict[str, list[float]] = {}
+
+    for path in sorted(directory.glob(f"*{FILE_SUFFIX}")):
+        try:
+            entries = parse(path.read_bytes())
+        except (OSError, struct.error):
+            # Removed, or still being created.
+            continue
+
+        for key, values in entries.items():
+            total = totals.get(key)
+            if total is None:
+                totals[key] = values
+            else:
+                totals[key] = [a + b for a, b in zip(total, values)]
+
+    return totals
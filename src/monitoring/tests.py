@@ -0,0 +1,413 @@
+import pstats
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from authapi.models import ApiToken
+from document.models import Document
+from monitoring import metrics, profiling
+from monitoring.middleware import ProfilingMiddleware
+from monitoring.store import MetricsFile, read_directory
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def parse_samples(text: str) -> dict[str, float]:
+    """Samples by their name and labels, as written in the exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    return samples
+
+
+def scrape(client) -> dict[str, float]:
+    return parse_samples(client.get(reverse("metrics")).content.decode())
+
+
+def sample(name: str, **labels: str) -> str:
+    return name + "{" + metrics.format_labels(labels) + "}"
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, MONITORING_METRICS_ALLOWED_IPS=["127.0.0.1"]
+)
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.document = Document.objects.create(title="Lease", owner=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+        super().tearDown()
+
+    def delta(self, before: dict, after: dict, key: str) -> float:
+        return after.get(key, 0) - before.get(key, 0)
+
+    def test_requests_are_recorded_by_route_and_method(self):
+        # --- Arrange
+        route = {"route": "document-list", "method": "GET"}
+        before = scrape(self.client)
+
+        # --- Act
+        self.client.get(reverse("document-list"))
+        self.client.get(reverse("document-list"))
+        after = scrape(self.client)
+
+        # --- Assert
+        self.assertEqual(
+            self.delta(
+                before,
+                after,
+                sample("django_http_request_duration_seconds_count", **route),
+            ),
+            2,
+        )
+        self.assertEqual(
+            self.delta(
+                before,
+                after,
+                sample("django_http_requests_total", **route, status="200"),
+            ),
+            2,
+        )
+        self.assertGreater(
+            self.delta(
+                before, after, sample("django_db_queries_per_request_sum", **route)
+            ),
+            0,
+        )
+        self.assertGreater(
+            self.delta(
+                before, after, sample("django_http_response_size_bytes_sum", **route)
+            ),
+            0,
+        )
+        for result in ("miss", "hit"):
+            self.assertEqual(
+                self.delta(
+                    before,
+                    after,
+                    sample("django_http_cache_responses_total", **route, result=result),
+                ),
+                1,
+            )
+
+    def test_upload_bytes(self):
+        # --- Arrange
+        route = {"route": "document-files-list", "method": "POST"}
+        url = reverse("document-files-list", kwargs={"document_pk": self.document.pk})
+        content = b"%PDF-1.4 " + b"x" * 100 * 1024
+        before = scrape(self.client)
+
+        # --- Act
+        self.client.post(url, {"file": SimpleUploadedFile("scan.pdf", content)})
+        after = scrape(self.client)
+
+        # --- Assert
+        self.assertGreater(
+            self.delta(
+                before, after, sample("django_http_upload_bytes_total", **route)
+            ),
+            len(content),
+        )
+        self.assertEqual(
+            self.delta(
+                before,
+                after,
+                sample("django_http_upload_throughput_bytes_per_second_count", **route),
+            ),
+            1,
+        )
+
+    def test_unmatched_urls_share_a_route(self):
+        # --- Arrange
+        key = sample(
+            "django_http_requests_total",
+            route="<unmatched>",
+            method="GET",
+            status="404",
+        )
+        before = scrape(self.client)
+
+        # --- Act
+        self.client.get("/nope/1/")
+        self.client.get("/nope/2/")
+        after = scrape(self.client)
+
+        # --- Assert
+        self.assertEqual(self.delta(before, after, key), 2)
+
+    async def test_async_views_count_their_queries(self):
+        # --- Arrange
+        _, key = await sync_to_async(ApiToken.issue)(self.user, "scanner")
+        url = reverse("async-document-detail", kwargs={"pk": self.document.pk})
+        route = {"route": "async-document-detail", "method": "GET"}
+        before = parse_samples(metrics.render(metrics.collect()))
+
+        # --- Act
+        await self.async_client.get(url, headers={"Authorization": f"Token {key}"})
+        after = parse_samples(metrics.render(metrics.collect()))
+
+        # --- Assert
+        self.assertEqual(
+            self.delta(
+                before,
+                after,
+                sample("django_http_requests_total", **route, status="200"),
+            ),
+            1,
+        )
+        # Token, then document with its details, run in sync_to_async threads.
+        self.assertGreaterEqual(
+            self.delta(
+                before, after, sample("django_db_queries_per_request_sum", **route)
+            ),
+            2,
+        )
+
+    def test_metrics_need_an_allowed_address_or_staff(self):
+        # --- Arrange
+        url = reverse("metrics")
+
+        # --- Act
+        remote = self.client.get(url, REMOTE_ADDR="203.0.113.7")
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        staff = self.client.get(url, REMOTE_ADDR="203.0.113.7")
+        local = APIClient().get(url)
+        with override_settings(MONITORING_METRICS_ALLOWED_IPS=[]):
+            proxied = APIClient().get(url)
+
+        # --- Assert
+        self.assertEqual(remote.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(staff.status_code, status.HTTP_200_OK)
+        self.assertEqual(local.status_code, status.HTTP_200_OK)
+        self.assertTrue(local["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertEqual(proxied.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MetricsStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_files_of_all_processes_are_summed(self):
+        # --- Arrange
+        files = [MetricsFile(self.directory / f"{pid}.metrics") for pid in (101, 102)]
+        for amount, file in enumerate(files, start=1):
+            index = file.allocate("shared", 2)
+            file.values[index] += amount
+            file.values[index + 1] += 10 * amount
+        files[1].values[files[1].allocate("second-only", 1)] += 5
+
+        # --- Act
+        entries = read_directory(self.directory)
+
+        # --- Assert
+        self.assertEqual(entries, {"shared": [3.0, 30.0], "second-only": [5.0]})
+        for file in files:
+            file.close()
+
+    def test_growing_keeps_the_values(self):
+        # --- Arrange
+        file = MetricsFile(self.directory / "1.metrics", size=64)
+        first = file.allocate("first", 1)
+        file.values[first] += 7
+
+        # --- Act
+        indexes = [file.allocate(f"series-{n}", 4) for n in range(100)]
+        file.values[indexes[-1]] += 1
+
+        # --- Assert
+        entries = read_directory(self.directory)
+        self.assertEqual(entries["first"], [7.0])
+        self.assertEqual(entries["series-99"], [1.0, 0.0, 0.0, 0.0])
+        self.assertEqual(len(entries), 101)
+        file.close()
+
+    def test_render_histogram(self):
+        # --- Arrange
+        file = MetricsFile()
+        histogram = metrics.DB_QUERIES
+        index = file.allocate(
+            '["django_db_queries_per_request", "document-list", "GET"]',
+            histogram.size,
+        )
+        for count in (0, 2, 2, 100):
+            histogram.observe(file.values, index, count)
+
+        # --- Act
+        rendered = metrics.render(file.read())
+
+        # --- Assert
+        route = {"route": "document-list", "method": "GET"}
+        for le, count in (("0.0", 1), ("2.0", 3), ("89.0", 3), ("+Inf", 4)):
+            self.assertIn(
+                sample("django_db_queries_per_request_bucket", **route, le=le)
+                + f" {float(count)!r}",
+                rendered,
+            )
+        self.assertIn(
+            sample("django_db_queries_per_request_sum", **route) + " 104.0", rendered
+        )
+        self.assertIn("# TYPE django_db_queries_per_request histogram", rendered)
+        file.close()
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MONITORING_PROFILING_ENABLED=True,
+            MONITORING_PROFILING_DIR=self.directory,
+            MONITORING_PROFILING_MAX_REPORTS=2,
+        )
+        self.settings_override.enable()
+
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.staff = User.objects.create_user(
+            username="admin", password="pass1234", is_staff=True
+        )
+        Document.objects.create(title="Lease", owner=self.user)
+        self.url = reverse("document-list")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+        super().tearDown()
+
+    def profiled_get(self, client: APIClient, **headers):
+        return client.get(self.url, headers={"X-Profile": "1", **headers})
+
+    def test_request_is_not_profiled_while_another_is(self):
+        # --- Arrange
+        client = APIClient()
+        client.force_login(self.staff)
+
+        # --- Act
+        with profiling.PROFILER_LOCK:
+            busy = self.profiled_get(client)
+        response = self.profiled_get(client)
+
+        # --- Assert
+        self.assertEqual(busy.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", busy)
+        self.assertIn("X-Profile-Id", response)
+
+    def test_disabled_middleware_is_not_loaded(self):
+        # --- Arrange
+        get_response = lambda request: HttpResponse()  # noqa: E731
+
+        # --- Act / Assert
+        with override_settings(MONITORING_PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(get_response)
+
+    def test_staff_request_is_profiled(self):
+        # --- Arrange
+        client = APIClient()
+        client.force_login(self.staff)
+
+        # --- Act
+        response = self.profiled_get(client)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report_id = response["X-Profile-Id"]
+        [summary] = profiling.list_reports()
+        self.assertEqual(summary["id"], report_id)
+        self.assertEqual(summary["path"], self.url)
+        self.assertGreater(summary["queries"], 0)
+
+        report = profiling.report_path(report_id, ".txt").read_text()
+        self.assertIn("SELECT", report)
+        self.assertIn("plan:", report)
+        self.assertIn("cumulative", report)
+
+    def test_other_clients_are_not_profiled(self):
+        # --- Arrange
+        client = APIClient()
+        client.force_login(self.user)
+
+        # --- Act
+        response = self.profiled_get(client)
+
+        # --- Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(profiling.list_reports(), [])
+
+    def test_allowlisted_token_is_profiled(self):
+        # --- Arrange
+        token, key = ApiToken.issue(self.user, "support")
+        _, other_key = ApiToken.issue(self.user, "scanner")
+        client = APIClient()
+
+        # --- Act
+        with override_settings(MONITORING_PROFILING_TOKEN_PREFIXES=[token.prefix]):
+            allowed = self.profiled_get(client, Authorization=f"Token {key}")
+            other = self.profiled_get(client, Authorization=f"Token {other_key}")
+
+        # --- Assert
+        self.assertIn("X-Profile-Id", allowed)
+        self.assertNotIn("X-Profile-Id", other)
+
+    def test_only_the_newest_reports_are_kept(self):
+        # --- Arrange
+        client = APIClient()
+        client.force_login(self.staff)
+
+        # --- Act
+        report_ids = [self.profiled_get(client)["X-Profile-Id"] for _ in range(3)]
+
+        # --- Assert
+        kept = [report["id"] for report in profiling.list_reports()]
+        self.assertEqual(kept, report_ids[:0:-1])
+        self.assertIsNone(profiling.report_path(report_ids[0], ".prof"))
+
+    def test_command_lists_prints_and_exports_reports(self):
+        # --- Arrange
+        client = APIClient()
+        client.force_login(self.staff)
+        report_id = self.profiled_get(client)["X-Profile-Id"]
+        output = Path(self.directory) / "export.prof"
+
+        # --- Act
+        listing, report, export = StringIO(), StringIO(), StringIO()
+        call_command("profiling_reports", stdout=listing)
+        call_command("profiling_reports", report_id, stdout=report)
+        call_command(
+            "profiling_reports", report_id, f"--output={output}", stdout=export
+        )
+
+        # --- Assert
+        self.assertIn(f"{report_id}  200", listing.getvalue())
+        self.assertIn(f"GET {self.url}", report.getvalue())
+        self.assertGreater(pstats.Stats(str(output)).total_calls, 0)
+        with self.assertRaises(CommandError):
+            call_command("profiling_reports", "../../etc/passwd")
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from monitoring.metrics import collect, render
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Request metrics of every worker, for Prometheus to scrape."""
+    allowed = (
+        request.META.get("REMOTE_ADDR") in settings.MONITORING_METRICS_ALLOWED_IPS
+        or request.user.is_staff
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)